@@ -0,0 +1,106 @@
+"""
+Mide el tiempo de importación de data_sheet_divider, que es lo que se espera
+antes de que aparezca la ventana.
+
+Ejecuta varias veces `python -X importtime -c "import data_sheet_divider"` en
+procesos nuevos y muestra la mediana del tiempo acumulado de cada importación
+directa del módulo. Falla (código de salida 1) si se importa alguno de los módulos
+que deben cargarse de forma diferida (pandas, openpyxl, numpy) o si el total
+supera --umbral segundos.
+
+Uso:
+    python benchmarks/bench_arranque.py --repeticiones 5 --umbral 0.6
+
+Para el ejecutable empaquetado, definir DSD_ARRANQUE=arranque.json antes de
+abrirlo: al mostrarse la ventana se guardan los tiempos hasta el primer cuadro
+y los de importación de pandas y openpyxl en segundo plano.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+from collections import defaultdict
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Módulos pesados que no deben importarse al abrir la interfaz
+DIFERIDOS = ("pandas", "openpyxl", "numpy")
+
+
+def medir_importacion():
+    """
+    Devuelve ({módulo: segundos acumulados}, paquetes diferidos importados) de
+    una importación en un proceso nuevo. Los módulos son las importaciones
+    directas de data_sheet_divider, más el total bajo su propio nombre.
+    """
+    proceso = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import data_sheet_divider"],
+        cwd=RAIZ, capture_output=True, text=True, check=True,
+    )
+    tiempos = {}
+    hijos = {}
+    diferidos = set()
+    for linea in proceso.stderr.splitlines():
+        if not linea.startswith("import time:") or linea.count("|") != 2:
+            continue
+        _, acumulado, nombre = linea.split("|")
+        if not acumulado.strip().isdigit():
+            continue  # encabezado
+        # -X importtime sangra dos espacios por nivel y lista cada módulo después de sus dependencias
+        nivel = (len(nombre) - len(nombre.lstrip()) - 1) // 2
+        nombre = nombre.strip()
+        if nombre.split(".")[0] in DIFERIDOS:
+            diferidos.add(nombre.split(".")[0])
+        if nivel == 1:
+            hijos[nombre] = int(acumulado) / 1e6
+        elif nivel == 0:
+            if nombre == "data_sheet_divider":
+                tiempos = dict(hijos)
+                tiempos[nombre] = int(acumulado) / 1e6
+            hijos = {}
+    return tiempos, diferidos
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeticiones", type=int, default=5)
+    parser.add_argument("--top", type=int, default=10, help="Cantidad de módulos a mostrar")
+    parser.add_argument("--umbral", type=float, default=None,
+                        help="Segundos máximos para importar data_sheet_divider")
+    parser.add_argument("--json", dest="salida_json", help="Archivo donde guardar el resultado")
+    args = parser.parse_args()
+
+    corridas = defaultdict(list)
+    diferidos = set()
+    for _ in range(args.repeticiones):
+        tiempos, importados = medir_importacion()
+        diferidos |= importados
+        for modulo, segundos in tiempos.items():
+            corridas[modulo].append(segundos)
+
+    diferidos = sorted(diferidos)
+    medianas = {m: statistics.median(v) for m, v in corridas.items()}
+    total = medianas.pop("data_sheet_divider", None)
+
+    print(f"Importar data_sheet_divider: {total:.3f} s (mediana de {args.repeticiones})")
+    for modulo, segundos in sorted(medianas.items(), key=lambda item: -item[1])[:args.top]:
+        print(f"  {modulo:<30}{segundos:>8.3f} s")
+
+    if args.salida_json:
+        with open(args.salida_json, "w", encoding="utf-8") as fh:
+            json.dump({"total_s": total, "modulos_s": medianas, "diferidos_importados": diferidos}, fh, indent=2)
+
+    fallo = False
+    if diferidos:
+        print(f"Se importan al arrancar módulos que deberían ser diferidos: {', '.join(diferidos)}")
+        fallo = True
+    if args.umbral is not None and total > args.umbral:
+        print(f"La importación supera el umbral de {args.umbral:.3f} s")
+        fallo = True
+    sys.exit(1 if fallo else 0)
+
+
+if __name__ == "__main__":
+    main()
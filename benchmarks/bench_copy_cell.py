@@ -0,0 +1,87 @@
+"""
+Mide el costo por celda de copiar estilos con _copy_cell.
+
+Compara la copia atributo por atributo (la implementación anterior) con la
+copia usando la caché de estilos por libro destino. Se genera en memoria una
+hoja con pocas decenas de estilos distintos repartidos en muchas celdas, que es
+el caso típico de las hojas que se dividen.
+
+Uso:
+    python benchmarks/bench_copy_cell.py [--filas 20000] [--columnas 10] [--estilos 30]
+"""
+import argparse
+import os
+import sys
+import time
+from copy import copy
+
+import openpyxl
+from openpyxl.styles import Font, PatternFill, Border, Side
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import data_sheet_divider  # noqa: E402
+
+
+def _copy_cell_sin_cache(src_cell, ws_dst, dst_row):
+    """Implementación anterior de _copy_cell, sin caché de estilos."""
+    dst_cell = ws_dst.cell(row=dst_row, column=src_cell.column, value=src_cell.value)
+    if src_cell.has_style:
+        dst_cell.font = copy(src_cell.font)
+        dst_cell.fill = copy(src_cell.fill)
+        dst_cell.border = copy(src_cell.border)
+        dst_cell.alignment = copy(src_cell.alignment)
+        dst_cell.number_format = src_cell.number_format
+        dst_cell.protection = copy(src_cell.protection)
+
+
+def generar_hoja(filas, columnas, estilos):
+    """Crea una hoja en memoria con `estilos` combinaciones de formato distintas."""
+    wb = openpyxl.Workbook()
+    ws = wb.active
+    lado = Side(style="thin")
+    formatos = [
+        (
+            Font(bold=i % 2 == 0, italic=i % 3 == 0, size=9 + i % 5),
+            PatternFill("solid", fgColor=f"FF{(i * 37) % 256:02X}{(i * 91) % 256:02X}{(i * 53) % 256:02X}"),
+            Border(left=lado, bottom=lado) if i % 4 == 0 else Border(),
+        )
+        for i in range(estilos)
+    ]
+    for r in range(1, filas + 1):
+        for c in range(1, columnas + 1):
+            cell = ws.cell(row=r, column=c, value=r * c)
+            cell.font, cell.fill, cell.border = formatos[(r + c) % estilos]
+    return ws
+
+
+def medir(copiar, ws_src):
+    wb_dst = openpyxl.Workbook()
+    ws_dst = wb_dst.active
+    celdas = 0
+    inicio = time.perf_counter()
+    for row in ws_src.iter_rows():
+        for cell in row:
+            copiar(cell, ws_dst, dst_row=cell.row)
+            celdas += 1
+    return (time.perf_counter() - inicio) / celdas
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--filas", type=int, default=20000)
+    parser.add_argument("--columnas", type=int, default=10)
+    parser.add_argument("--estilos", type=int, default=30)
+    args = parser.parse_args()
+
+    ws_src = generar_hoja(args.filas, args.columnas, args.estilos)
+    antes = medir(_copy_cell_sin_cache, ws_src)
+    despues = medir(data_sheet_divider._copy_cell, ws_src)
+
+    print(f"Celdas: {args.filas * args.columnas}  Estilos distintos: {args.estilos}")
+    print(f"Sin caché de estilos: {antes * 1e6:8.2f} µs/celda")
+    print(f"Con caché de estilos: {despues * 1e6:8.2f} µs/celda")
+    print(f"Aceleración:          {antes / despues:8.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,174 @@
+"""
+Mide el tiempo y la memoria de cada etapa de la división y guarda el resultado en JSON.
+
+Etapas medidas por separado:
+    listar_hojas, listar_columnas, carga, agrupacion, copia (_copy_cell hacia
+    el libro combinado), guardado, exportar_ventanas_xlsx
+y, de punta a punta, dividir_excel con cada motor.
+
+Por defecto se genera un libro sintético (ver generar_libro.py) en una
+carpeta temporal; con --libro se mide un archivo existente.
+
+Uso:
+    python benchmarks/bench_etapas.py --filas 50000 --claves 100 --sesgo 1.1 --json actual.json
+    python benchmarks/bench_etapas.py --filas 50000 --claves 100 --sesgo 1.1 --comparar actual.json
+
+Con --comparar se imprime la relación de tiempos contra una corrida anterior
+y el código de salida es 1 si alguna etapa es más lenta que --umbral veces.
+"""
+import argparse
+import contextlib
+import gc
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import openpyxl
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import data_sheet_divider as dsd  # noqa: E402
+from generar_libro import COLUMNA_CLAVE, agregar_argumentos, generar_libro, parametros_desde_args  # noqa: E402
+
+
+def medir(nombre, funcion, trazar_memoria):
+    """Ejecuta funcion y devuelve (resultado, medición de la etapa)."""
+    gc.collect()
+    if trazar_memoria:
+        tracemalloc.start()
+    inicio = time.perf_counter()
+    inicio_cpu = time.process_time()
+    with contextlib.redirect_stdout(open(os.devnull, "w")):
+        resultado = funcion()
+    medicion = {
+        "etapa": nombre,
+        "segundos": round(time.perf_counter() - inicio, 4),
+        "cpu_segundos": round(time.process_time() - inicio_cpu, 4),
+        "rss_max_proceso_mb": dsd._rss_max_proceso_mb(),
+    }
+    if trazar_memoria:
+        medicion["memoria_pico_mb"] = round(tracemalloc.get_traced_memory()[1] / (1024 * 1024), 1)
+        tracemalloc.stop()
+    return resultado, medicion
+
+
+def correr_etapas(ruta, hoja, columna, carpeta, trazar_memoria, motores):
+    mediciones = []
+
+    def etapa(nombre, funcion):
+        resultado, medicion = medir(nombre, funcion, trazar_memoria)
+        mediciones.append(medicion)
+        return resultado
+
+    dsd._cache_libros.limpiar()
+    etapa("listar_hojas", lambda: dsd.listar_hojas_excel(ruta))
+    encabezados = etapa("listar_columnas", lambda: dsd.leer_encabezados_hoja(ruta, hoja))
+    col_idx = encabezados.index(columna) + 1
+
+    wb_src = etapa("carga", lambda: openpyxl.load_workbook(ruta, data_only=True))
+    ws_src = wb_src[hoja]
+    groups = etapa("agrupacion", lambda: dsd._agrupar_filas(ws_src, col_idx))
+    mediciones[-1]["grupos"] = len(groups)
+    mediciones[-1]["filas"] = sum(len(filas) for filas in groups.values())
+
+    def copiar():
+        header_row = ws_src[1]
+        wb_out = openpyxl.Workbook()
+        wb_out.remove(wb_out.active)
+        for valor, sheet_name in zip(groups, dsd._nombres_hojas_unicos(groups)):
+            dsd._escribir_grupo(ws_src, header_row, groups[valor], wb_out.create_sheet(title=sheet_name))
+        return wb_out
+
+    wb_out = etapa("copia", copiar)
+    mediciones[-1]["celdas"] = sum(ws.max_row * ws.max_column for ws in wb_out.worksheets)
+
+    ruta_combinado = os.path.join(carpeta, "combinado.xlsx")
+    etapa("guardado", lambda: wb_out.save(ruta_combinado))
+    del wb_out, wb_src, ws_src
+    etapa("exportar_ventanas_xlsx", lambda: dsd.exportar_ventanas_xlsx(ruta_combinado, carpeta))
+
+    for motor in motores:
+        dsd._cache_libros.limpiar()
+        etapa(f"dividir_{motor}", lambda: dsd.dividir_excel(
+            ruta, hoja, columna, f"Resultados_{motor}", motor=motor, directorio_salida=carpeta
+        ))
+    return mediciones
+
+
+def comparar(actual, anterior, umbral):
+    """Imprime la relación de tiempos por etapa y devuelve las etapas más lentas que umbral."""
+    previas = {m["etapa"]: m for m in anterior["etapas"]}
+    regresiones = []
+    print(f"{'etapa':<26}{'antes (s)':>12}{'ahora (s)':>12}{'relación':>10}")
+    for medicion in actual["etapas"]:
+        previa = previas.get(medicion["etapa"])
+        if previa is None or not previa["segundos"]:
+            continue
+        relacion = medicion["segundos"] / previa["segundos"]
+        marca = "  <-- regresión" if relacion > umbral else ""
+        print(f"{medicion['etapa']:<26}{previa['segundos']:>12.3f}{medicion['segundos']:>12.3f}{relacion:>9.2f}x{marca}")
+        if relacion > umbral:
+            regresiones.append(medicion["etapa"])
+    return regresiones
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    agregar_argumentos(parser)
+    parser.add_argument("--libro", help="Medir este .xlsx en lugar de generar uno")
+    parser.add_argument("--hoja", default="Datos")
+    parser.add_argument("--columna", default=COLUMNA_CLAVE)
+    parser.add_argument("--motores", default="completo,streaming,valores",
+                        help="Motores a medir de punta a punta, separados por coma (vacío = ninguno)")
+    parser.add_argument("--memoria", action="store_true",
+                        help="Medir el pico de memoria de Python por etapa con tracemalloc (más lento)")
+    parser.add_argument("--json", dest="salida_json", help="Archivo donde guardar el resultado")
+    parser.add_argument("--comparar", help="Resultado JSON anterior contra el que comparar")
+    parser.add_argument("--umbral", type=float, default=1.25,
+                        help="Relación de tiempo a partir de la cual una etapa cuenta como regresión")
+    args = parser.parse_args()
+
+    motores = [m for m in args.motores.split(",") if m]
+    with tempfile.TemporaryDirectory(prefix="bench_divisor_") as carpeta:
+        if args.libro:
+            ruta = os.path.abspath(args.libro)
+            parametros = {"libro": ruta}
+        else:
+            ruta = os.path.join(carpeta, "sintetico.xlsx")
+            inicio = time.perf_counter()
+            parametros = generar_libro(ruta, **parametros_desde_args(args))
+            parametros["segundos_generacion"] = round(time.perf_counter() - inicio, 2)
+        parametros["tamano_mb"] = round(os.path.getsize(ruta) / (1024 * 1024), 2)
+
+        etapas = correr_etapas(ruta, args.hoja, args.columna, carpeta, args.memoria, motores)
+
+    resultado = {
+        "fecha": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "entorno": {
+            "python": platform.python_version(),
+            "openpyxl": openpyxl.__version__,
+            "plataforma": platform.platform(),
+        },
+        "parametros": parametros,
+        "etapas": etapas,
+    }
+
+    texto = json.dumps(resultado, ensure_ascii=False, indent=2)
+    if args.salida_json:
+        with open(args.salida_json, "w", encoding="utf-8") as fh:
+            fh.write(texto + "\n")
+    else:
+        print(texto)
+
+    if args.comparar:
+        with open(args.comparar, encoding="utf-8") as fh:
+            anterior = json.load(fh)
+        if comparar(resultado, anterior, args.umbral):
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
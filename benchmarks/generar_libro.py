@@ -0,0 +1,167 @@
+"""
+Genera libros .xlsx sintéticos para medir el rendimiento del divisor.
+
+La primera hoja ("Datos") tiene una columna "Clave" con los valores por los
+que se divide y columnas de texto, números y fechas. Se puede ajustar:
+
+- filas y columnas de la hoja
+- cantidad de valores distintos de la clave y su sesgo (distribución Zipf;
+  0 reparte las filas de forma uniforme, valores mayores concentran las filas
+  en pocas claves)
+- densidad de estilos: fracción de celdas de datos con formato, tomado de una
+  paleta de pocas decenas de estilos
+- cantidad de tablas de Excel (bloques contiguos de columnas) y de rangos
+  de celdas combinadas (en la última columna, fuera de las tablas)
+
+Uso:
+    python benchmarks/generar_libro.py salida.xlsx --filas 100000 --columnas 20 --claves 50 --sesgo 1.1
+"""
+import argparse
+import datetime
+import random
+
+import openpyxl
+from openpyxl.styles import Alignment, Border, Font, PatternFill, Side
+from openpyxl.utils import get_column_letter
+from openpyxl.worksheet.table import Table, TableStyleInfo
+
+COLUMNA_CLAVE = "Clave"
+
+
+def _paleta_estilos(cantidad):
+    lado = Side(style="thin")
+    return [
+        (
+            Font(bold=i % 2 == 0, italic=i % 3 == 0, size=9 + i % 4),
+            PatternFill("solid", fgColor=f"FF{(i * 37) % 256:02X}{(i * 91) % 256:02X}{(i * 53) % 256:02X}"),
+            Border(bottom=lado) if i % 4 == 0 else Border(),
+            Alignment(horizontal="center") if i % 5 == 0 else Alignment(),
+        )
+        for i in range(cantidad)
+    ]
+
+
+def _pesos_claves(claves, sesgo):
+    """Pesos Zipf para cada clave: 1 / rango^sesgo."""
+    return [1.0 / (rango ** sesgo) for rango in range(1, claves + 1)]
+
+
+def generar_libro(ruta, filas=10000, columnas=10, claves=20, sesgo=0.0, densidad_estilos=0.2,
+                  tablas=1, combinadas=0, semilla=1, estilos=24):
+    """
+    Escribe un libro sintético en ruta y devuelve un diccionario con sus parámetros.
+
+    La columna de la clave siempre es la primera y se llama COLUMNA_CLAVE.
+    """
+    rnd = random.Random(semilla)
+    wb = openpyxl.Workbook()
+    ws = wb.active
+    ws.title = "Datos"
+
+    encabezados = [COLUMNA_CLAVE] + [f"Campo_{i}" for i in range(1, columnas)]
+    ws.append(encabezados)
+    for cell in ws[1]:
+        cell.font = Font(bold=True, color="FFFFFFFF")
+        cell.fill = PatternFill("solid", fgColor="FF305496")
+
+    valores_clave = [f"Grupo {i:04d}" for i in range(claves)]
+    pesos = _pesos_claves(claves, sesgo)
+    paleta = _paleta_estilos(estilos)
+    fecha_base = datetime.datetime(2024, 1, 1)
+
+    for r in range(2, filas + 2):
+        fila = [rnd.choices(valores_clave, weights=pesos)[0]]
+        for c in range(1, columnas):
+            tipo = c % 3
+            if tipo == 0:
+                fila.append(f"texto {r}-{c}")
+            elif tipo == 1:
+                fila.append(round(rnd.random() * 1000, 2))
+            else:
+                fila.append(fecha_base + datetime.timedelta(days=rnd.randrange(365)))
+        ws.append(fila)
+        if densidad_estilos > 0:
+            # ws[r] recalcula max_column recorriendo toda la hoja: se accede a las celdas por índice
+            for c in range(1, columnas + 1):
+                cell = ws.cell(row=r, column=c)
+                if rnd.random() < densidad_estilos:
+                    cell.font, cell.fill, cell.border, cell.alignment = rnd.choice(paleta)
+
+    for c in range(1, columnas + 1):
+        ws.column_dimensions[get_column_letter(c)].width = 12 + c % 6
+
+    # Las tablas no pueden solaparse con celdas combinadas: si hay combinadas, la última columna queda libre
+    columnas_tablas = columnas - 1 if combinadas and columnas > 1 else columnas
+    tablas = min(tablas, columnas_tablas)
+    if tablas:
+        ancho = columnas_tablas // tablas
+        for t in range(tablas):
+            inicio = t * ancho + 1
+            fin = columnas_tablas if t == tablas - 1 else inicio + ancho - 1
+            tabla = Table(displayName=f"Tabla{t + 1}",
+                          ref=f"{get_column_letter(inicio)}1:{get_column_letter(fin)}{filas + 1}")
+            tabla.tableStyleInfo = TableStyleInfo(name="TableStyleMedium2", showRowStripes=True)
+            ws.add_table(tabla)
+
+    if combinadas:
+        letra = get_column_letter(columnas)
+        paso = max(filas // combinadas, 2)
+        for i in range(combinadas):
+            r = 2 + i * paso
+            if r + 1 > filas + 1:
+                break
+            ws.merge_cells(f"{letra}{r}:{letra}{r + 1}")
+
+    # Hojas extra para que el listado de hojas tenga algo que recorrer
+    wb.create_sheet("Resumen").append(["Generado", datetime.datetime.now()])
+    wb.create_sheet("Vacia")
+    wb.save(ruta)
+
+    return {
+        "filas": filas,
+        "columnas": columnas,
+        "claves": claves,
+        "sesgo": sesgo,
+        "densidad_estilos": densidad_estilos,
+        "tablas": tablas,
+        "combinadas": combinadas,
+        "semilla": semilla,
+    }
+
+
+def agregar_argumentos(parser):
+    """Agrega al parser las opciones del generador (compartidas con bench_etapas.py)."""
+    parser.add_argument("--filas", type=int, default=10000)
+    parser.add_argument("--columnas", type=int, default=10)
+    parser.add_argument("--claves", type=int, default=20, help="Cantidad de valores distintos de la clave")
+    parser.add_argument("--sesgo", type=float, default=0.0, help="Exponente Zipf de la distribución de claves")
+    parser.add_argument("--densidad-estilos", type=float, default=0.2,
+                        help="Fracción de celdas de datos con formato (0 a 1)")
+    parser.add_argument("--tablas", type=int, default=1, help="Cantidad de tablas de Excel")
+    parser.add_argument("--combinadas", type=int, default=0, help="Cantidad de rangos de celdas combinadas")
+    parser.add_argument("--semilla", type=int, default=1)
+
+
+def parametros_desde_args(args):
+    return {
+        "filas": args.filas,
+        "columnas": args.columnas,
+        "claves": args.claves,
+        "sesgo": args.sesgo,
+        "densidad_estilos": args.densidad_estilos,
+        "tablas": args.tablas,
+        "combinadas": args.combinadas,
+        "semilla": args.semilla,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("salida", help="Ruta del .xlsx a generar")
+    agregar_argumentos(parser)
+    args = parser.parse_args()
+    print(generar_libro(args.salida, **parametros_desde_args(args)))
+
+
+if __name__ == "__main__":
+    main()
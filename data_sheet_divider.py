@@ -1,144 +1,2990 @@
 # Combined_script.py
+import argparse
+import contextlib
+import cProfile
+import hashlib
+import importlib.util
+import itertools
+import json
+import math
+import numbers
 import os
-import pandas as pd
 import re
 import datetime
+import functools
+import posixpath
+import threading
+import time
+import warnings
+import multiprocessing
+import sys
+import weakref
+import zipfile
+from xml.etree import ElementTree
+from array import array
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from copy import copy
-from collections import defaultdict
+from collections import Counter, OrderedDict, defaultdict
 from dotenv import load_dotenv
 import flet as ft
-import openpyxl
-from openpyxl.worksheet.table import Table, TableStyleInfo
-from openpyxl.utils import get_column_letter, range_boundaries
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+# Tiempos del arranque: importaciones de pandas y openpyxl y primer cuadro de la ventana
+_ARRANQUE = {"importaciones_s": {}}
+
+
+class _ImportacionDiferida:
+    """
+    Marcador de un nombre global del módulo (pd, openpyxl, Table...) que se
+    importa recién la primera vez que se usa. Al resolverse, la función de
+    importación reemplaza el marcador por el objeto real, así que los usos
+    siguientes no pasan por aquí.
+    """
+
+    def __init__(self, nombre, importar):
+        self._nombre = nombre
+        self._importar = importar
+
+    def _resolver(self):
+        self._importar()
+        return globals()[self._nombre]
+
+    def __getattr__(self, atributo):
+        return getattr(self._resolver(), atributo)
+
+    def __call__(self, *args, **kwargs):
+        return self._resolver()(*args, **kwargs)
+
+
+# pandas y openpyxl tardan en importarse y la interfaz no los necesita para abrirse.
+# Las importaciones van dentro de funciones (y no por nombre con importlib) para que
+# PyInstaller las siga detectando al empaquetar. El bloqueo evita que la precarga
+# y un hilo de la interfaz importen el mismo paquete a la vez (Python lo
+# detecta como un bloqueo mutuo y lanza _DeadlockError).
+_BLOQUEO_IMPORTACIONES = threading.Lock()
+
+
+def _importar_pandas():
+    """Importa pandas en el espacio de nombres del módulo, si no se importó antes."""
+    global pd
+    with _BLOQUEO_IMPORTACIONES:
+        if not isinstance(pd, _ImportacionDiferida):
+            return
+        inicio = time.perf_counter()
+        import pandas as pd
+        _ARRANQUE["importaciones_s"]["pandas"] = round(time.perf_counter() - inicio, 4)
+
+
+def _importar_openpyxl():
+    """Importa openpyxl y los nombres que se usan de él, si no se importaron antes."""
+    global openpyxl, WriteOnlyCell, Table, TableStyleInfo, get_column_letter, range_boundaries, coordinate_to_tuple
+    with _BLOQUEO_IMPORTACIONES:
+        if not isinstance(openpyxl, _ImportacionDiferida):
+            return
+        inicio = time.perf_counter()
+        from openpyxl.cell import WriteOnlyCell
+        from openpyxl.worksheet.table import Table, TableStyleInfo
+        from openpyxl.utils import get_column_letter, range_boundaries, coordinate_to_tuple
+        # openpyxl se asigna al final: es la marca de que todo lo anterior ya está disponible
+        import openpyxl
+        _ARRANQUE["importaciones_s"]["openpyxl"] = round(time.perf_counter() - inicio, 4)
+
+
+pd = _ImportacionDiferida("pd", _importar_pandas)
+openpyxl = _ImportacionDiferida("openpyxl", _importar_openpyxl)
+WriteOnlyCell = _ImportacionDiferida("WriteOnlyCell", _importar_openpyxl)
+Table = _ImportacionDiferida("Table", _importar_openpyxl)
+TableStyleInfo = _ImportacionDiferida("TableStyleInfo", _importar_openpyxl)
+get_column_letter = _ImportacionDiferida("get_column_letter", _importar_openpyxl)
+range_boundaries = _ImportacionDiferida("range_boundaries", _importar_openpyxl)
+coordinate_to_tuple = _ImportacionDiferida("coordinate_to_tuple", _importar_openpyxl)
 
 # Cargar variables de entorno desde el archivo .env
 load_dotenv()
 
-def _copy_cell(src_cell, ws_dst, dst_row):
-    """Copia una celda con su valor y estilo completo a la fila dst_row de ws_dst."""
-    dst_cell = ws_dst.cell(row=dst_row, column=src_cell.column, value=src_cell.value)
+# Presupuesto de memoria (MB) para la caché de libros parseados
+CACHE_LIBROS_MB = int(os.getenv("DSD_CACHE_MB", "1024"))
+
+# Procesos para escribir los archivos individuales en paralelo (1 = secuencial, 0 = todos los núcleos)
+EXPORT_WORKERS = int(os.getenv("DSD_WORKERS", "1")) or (os.cpu_count() or 1)
+
+# Si está activo, cada división guarda un perfil de cProfile junto a su reporte
+PERFIL_ACTIVO = os.getenv("DSD_PERFIL", "0") not in ("", "0")
+
+# Si se define, al abrir la interfaz se guardan en este JSON los tiempos de arranque
+ARCHIVO_ARRANQUE = os.getenv("DSD_ARRANQUE") or None
+
+# Cada cuántas filas el modo streaming reporta avance y revisa la cancelación
+FILAS_ENTRE_AVISOS = 500
+
+# Grupos que el modo streaming escribe a la vez (0 = según el límite de archivos abiertos)
+GRUPOS_ABIERTOS_STREAMING = int(os.getenv("DSD_GRUPOS_ABIERTOS", "0"))
+
+# Factor aproximado entre el tamaño del .xlsx en disco y el libro cargado por openpyxl
+FACTOR_MEMORIA_LIBRO = 40
+
+# Manifiesto con el hash de cada grupo exportado, guardado dentro de la carpeta de resultados,
+# uno por libro de origen ({} es su nombre sin extensión) para que varios libros puedan compartirla.
+# Subir la versión si cambia la forma de escribir los archivos, para que se regeneren todos.
+MANIFIESTO_DIVISION = "manifiesto-{}.json"
+VERSION_MANIFIESTO = 1
+
+# Nombre del grupo que reúne los valores no seleccionados (ver dividir_excel)
+NOMBRE_GRUPO_OTROS = "Otros"
+
+# Filas por hoja que admite Excel (incluido el encabezado)
+LIMITE_FILAS_EXCEL = 1048576
+
+# Cantidad máxima de valores distintos que se listan en la vista previa de la interfaz
+MAX_VALORES_VISTA = 1000
+
+# Vista previa paginada de la hoja: filas por página, páginas ya leídas que se
+# conservan y tamaño de los bloques en que se descomprime el XML
+FILAS_POR_PAGINA_VISTA = 100
+PAGINAS_EN_CACHE_VISTA = 8
+BYTES_LECTURA_VISTA = 256 * 1024
+
+# Formatos de salida del motor de solo valores
+FORMATOS_VALORES = ("xlsx", "csv", "parquet")
+
+
+class _CacheLibros:
+    """
+    Caché LRU en proceso de libros parseados y metadatos de hojas.
+
+    Cada entrada se indexa por la ruta absoluta del archivo más un tipo de dato
+    (hojas, encabezados, libro) y guarda la firma (mtime, tamaño) del archivo en
+    el momento de cargarla. Si el archivo cambia en disco todas sus entradas se
+    invalidan. Cuando el costo estimado supera el presupuesto se desalojan las
+    entradas usadas hace más tiempo.
+    """
+
+    def __init__(self, presupuesto_bytes):
+        self.presupuesto_bytes = presupuesto_bytes
+        self._entradas = OrderedDict()  # (ruta, tipo) -> (firma, valor, costo)
+        self._uso = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _firma(ruta):
+        st = os.stat(ruta)
+        return st.st_mtime_ns, st.st_size
+
+    def _quitar(self, clave):
+        _firma, _valor, costo = self._entradas.pop(clave)
+        self._uso -= costo
+
+    def obtener(self, file_path, tipo, cargar, costo=0):
+        """
+        Devuelve el valor cacheado para (file_path, tipo) o lo carga con cargar().
+
+        Args:
+            file_path: Archivo del que depende el valor
+            tipo: Tupla que identifica el dato dentro del archivo
+            cargar: Función sin argumentos que produce el valor
+            costo: Memoria estimada del valor en bytes
+        """
+        ruta = os.path.abspath(file_path)
+        firma = self._firma(ruta)
+        clave = (ruta, tipo)
+        with self._lock:
+            entrada = self._entradas.get(clave)
+            if entrada is not None and entrada[0] == firma:
+                self._entradas.move_to_end(clave)
+                return entrada[1]
+            # El archivo cambió en disco: descartar todo lo cacheado de esa ruta
+            for otra in [k for k, v in self._entradas.items() if k[0] == ruta and v[0] != firma]:
+                self._quitar(otra)
+
+        valor = cargar()
+
+        if costo > self.presupuesto_bytes:
+            return valor
+        with self._lock:
+            if clave in self._entradas:
+                self._quitar(clave)
+            self._entradas[clave] = (firma, valor, costo)
+            self._uso += costo
+            while self._uso > self.presupuesto_bytes and self._entradas:
+                self._quitar(next(iter(self._entradas)))
+        return valor
+
+    def limpiar(self):
+        with self._lock:
+            self._entradas.clear()
+            self._uso = 0
+
+
+_cache_libros = _CacheLibros(CACHE_LIBROS_MB * 1024 * 1024)
+
+# Estilos ya resueltos por libro destino: {wb_destino: {(wb_origen, estilo_origen): StyleArray}}
+_estilos_por_libro = weakref.WeakKeyDictionary()
+
+
+@functools.lru_cache(maxsize=None)
+def _pico_memoria_windows():
+    """
+    Devuelve una función sin argumentos que da el pico de memoria del proceso
+    en MB (None si falla). La estructura y las funciones de la API se buscan
+    una sola vez: _rss_max_proceso_mb se llama en cada etapa de cada grupo.
+    """
+    import ctypes
+    from ctypes import wintypes
+
+    class PROCESS_MEMORY_COUNTERS(ctypes.Structure):
+        _fields_ = [
+            ("cb", wintypes.DWORD),
+            ("PageFaultCount", wintypes.DWORD),
+            ("PeakWorkingSetSize", ctypes.c_size_t),
+            ("WorkingSetSize", ctypes.c_size_t),
+            ("QuotaPeakPagedPoolUsage", ctypes.c_size_t),
+            ("QuotaPagedPoolUsage", ctypes.c_size_t),
+            ("QuotaPeakNonPagedPoolUsage", ctypes.c_size_t),
+            ("QuotaNonPagedPoolUsage", ctypes.c_size_t),
+            ("PagefileUsage", ctypes.c_size_t),
+            ("PeakPagefileUsage", ctypes.c_size_t),
+        ]
+
+    obtener = ctypes.windll.psapi.GetProcessMemoryInfo
+    proceso = ctypes.windll.kernel32.GetCurrentProcess()
+    tamano = ctypes.sizeof(PROCESS_MEMORY_COUNTERS)
+
+    def pico_mb():
+        contadores = PROCESS_MEMORY_COUNTERS(cb=tamano)
+        if obtener(proceso, ctypes.byref(contadores), tamano):
+            return round(contadores.PeakWorkingSetSize / (1024 * 1024), 1)
+        return None
+
+    return pico_mb
+
+
+def _rss_max_proceso_mb():
+    """
+    Máximo de memoria residente del proceso desde que arrancó, en MB (None si
+    no se puede medir). Incluye las divisiones anteriores del mismo proceso.
+    """
+    if resource is not None:
+        pico = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # Linux informa KB; macOS, bytes
+        return round(pico / (1024 * 1024) if sys.platform == "darwin" else pico / 1024, 1)
+    if sys.platform == "win32":
+        return _pico_memoria_windows()()
+    return None
+
+
+def _segundos_desde_inicio_proceso():
+    """Segundos transcurridos desde que el sistema creó este proceso (None si no se puede medir)."""
+    try:
+        if sys.platform == "win32":
+            import ctypes
+            from ctypes import wintypes
+
+            creacion, salida, kernel, usuario, ahora = (wintypes.FILETIME() for _ in range(5))
+            kernel32 = ctypes.windll.kernel32
+            if not kernel32.GetProcessTimes(kernel32.GetCurrentProcess(), ctypes.byref(creacion),
+                                            ctypes.byref(salida), ctypes.byref(kernel), ctypes.byref(usuario)):
+                return None
+            kernel32.GetSystemTimeAsFileTime(ctypes.byref(ahora))
+
+            def centenas_de_ns(ft_):
+                return (ft_.dwHighDateTime << 32) | ft_.dwLowDateTime
+
+            return round((centenas_de_ns(ahora) - centenas_de_ns(creacion)) / 1e7, 3)
+        if os.path.exists("/proc/self/stat"):
+            # El campo 22 de stat es el inicio del proceso en ticks desde el arranque del sistema
+            with open("/proc/self/stat") as fh:
+                campos = fh.read().rsplit(")", 1)[1].split()
+            with open("/proc/uptime") as fh:
+                uptime = float(fh.read().split()[0])
+            return round(uptime - int(campos[19]) / os.sysconf("SC_CLK_TCK"), 3)
+    except (OSError, ValueError, AttributeError):
+        pass
+    return None
+
+
+def _registrar_primer_cuadro():
+    """Registra cuánto tardó la ventana en mostrarse desde el inicio del proceso."""
+    _ARRANQUE["primer_cuadro_desde_proceso_s"] = _segundos_desde_inicio_proceso()
+
+
+def _precargar_dependencias():
+    """
+    Importa openpyxl y pandas en segundo plano, con la ventana ya visible, para
+    que la primera lectura o división no tenga que esperarlos. Con DSD_ARRANQUE
+    guarda después la medición del arranque.
+    """
+    inicio = time.perf_counter()
+    try:
+        _importar_openpyxl()
+        _importar_pandas()
+    except ImportError as e:
+        print(f"No se pudieron precargar las dependencias: {str(e)}")
+    _ARRANQUE["precarga_s"] = round(time.perf_counter() - inicio, 4)
+
+    if ARCHIVO_ARRANQUE:
+        medicion = dict(_ARRANQUE, python=sys.version.split()[0], empaquetado=bool(getattr(sys, "frozen", False)))
+        try:
+            with open(ARCHIVO_ARRANQUE, "w", encoding="utf-8") as fh:
+                json.dump(medicion, fh, ensure_ascii=False, indent=2)
+        except OSError as e:
+            print(f"No se pudo guardar la medición de arranque: {str(e)}")
+
+
+class _Medidor:
+    """
+    Acumula, por etapa, tiempo de reloj, tiempo de CPU del hilo que ejecuta la
+    división, máximo de RSS del proceso al cerrar la etapa (desde que arrancó,
+    no solo de esa etapa) y contadores (filas,
+    celdas, grupos, archivos...). Una etapa puede abrirse varias veces (por
+    ejemplo, una por grupo) y sus valores se suman.
+    """
+
+    def __init__(self):
+        self.etapas = OrderedDict()
+
+    def _datos(self, nombre):
+        datos = self.etapas.get(nombre)
+        if datos is None:
+            datos = self.etapas[nombre] = {"segundos": 0.0, "cpu_segundos": 0.0, "veces": 0, "rss_max_proceso_mb": None}
+        return datos
+
+    @contextlib.contextmanager
+    def etapa(self, nombre):
+        datos = self._datos(nombre)
+        inicio = time.perf_counter()
+        inicio_cpu = time.thread_time()
+        try:
+            yield datos
+        finally:
+            datos["segundos"] += time.perf_counter() - inicio
+            datos["cpu_segundos"] += time.thread_time() - inicio_cpu
+            datos["veces"] += 1
+            datos["rss_max_proceso_mb"] = _rss_max_proceso_mb()
+
+    def contar(self, nombre, **contadores):
+        datos = self._datos(nombre)
+        for clave, valor in contadores.items():
+            datos[clave] = datos.get(clave, 0) + valor
+
+    def reporte(self):
+        """Lista de etapas en orden de aparición, con los tiempos redondeados."""
+        return [
+            dict(datos, etapa=nombre, segundos=round(datos["segundos"], 4), cpu_segundos=round(datos["cpu_segundos"], 4))
+            for nombre, datos in self.etapas.items()
+        ]
+
+
+class ProcesoCancelado(Exception):
+    """El usuario canceló la división antes de terminar."""
+
+
+class _Progreso:
+    """
+    Estado de avance de una división, notificado a un callback con una
+    frecuencia máxima para no saturar la interfaz.
+
+    Cada evento es un diccionario con: etapa, filas_leidas, filas_total,
+    grupos_escritos, grupos_total, bytes_escritos, fraccion (0 a 1 o None),
+    eta_segundos (estimado a partir del avance de la etapa actual o None) y,
+    al dividir por varias columnas, particion y particiones_total.
+    """
+
+    def __init__(self, callback=None, cancelar=None, intervalo=0.25):
+        self.callback = callback
+        self.cancelar = cancelar
+        self.intervalo = intervalo
+        self.estado = {
+            "etapa": None,
+            "filas_leidas": 0,
+            "filas_total": None,
+            "grupos_escritos": 0,
+            "grupos_total": None,
+            "bytes_escritos": 0,
+            "fraccion": None,
+            "eta_segundos": None,
+            "particion": None,
+            "particiones_total": None,
+        }
+        self.archivos = []  # rutas escritas, en orden
+        self.carpetas = []  # carpetas creadas por esta división, de afuera hacia adentro
+        self.sin_cambios = []  # rutas conservadas de la corrida anterior
+        self.eliminados = []  # rutas de grupos que ya no existen, borradas
+        self.errores = []  # grupos que no se pudieron escribir: {"grupo", "error"}
+        self.medidor = _Medidor()
+        self._trabajo_total = None
+        self._trabajo_hecho = 0
+        self._inicio_etapa = time.monotonic()
+        self._ultimo_aviso = 0.0
+
+    def etapa(self, nombre, trabajo_total=None, **datos):
+        """Inicia una etapa; trabajo_total son las unidades de trabajo que la completan."""
+        self.estado["etapa"] = nombre
+        self.estado.update(datos)
+        self._trabajo_total = trabajo_total
+        self._trabajo_hecho = 0
+        self._inicio_etapa = time.monotonic()
+        self._avisar(forzar=True)
+
+    def avanzar(self, trabajo=0, **incrementos):
+        """Suma unidades de trabajo y contadores (filas_leidas, grupos_escritos, bytes_escritos...)."""
+        self._trabajo_hecho += trabajo
+        for clave, valor in incrementos.items():
+            self.estado[clave] += valor
+        self._avisar()
+
+    def archivo_escrito(self, ruta, trabajo=0, **incrementos):
+        """Registra un archivo terminado y suma su tamaño a bytes_escritos."""
+        self.archivos.append(ruta)
+        self.avanzar(trabajo, bytes_escritos=os.path.getsize(ruta), **incrementos)
+
+    def crear_carpeta(self, ruta):
+        """Crea la carpeta ruta y las intermedias que falten, y registra las que no existían."""
+        nuevas = []
+        actual = os.path.abspath(ruta)
+        while not os.path.isdir(actual) and os.path.dirname(actual) != actual:
+            nuevas.append(actual)
+            actual = os.path.dirname(actual)
+        os.makedirs(ruta, exist_ok=True)
+        self.carpetas.extend(reversed(nuevas))
+
+    def archivo_sin_cambios(self, ruta, trabajo=0, **incrementos):
+        """Registra un archivo que se conserva porque su contenido no cambió."""
+        self.sin_cambios.append(ruta)
+        self.avanzar(trabajo, **incrementos)
+
+    def error_grupo(self, grupo, mensaje):
+        """Registra un grupo que falló (la división sigue con los demás) y lo informa por consola."""
+        print(mensaje)
+        self.errores.append({"grupo": str(grupo), "error": mensaje})
+
+    def comprobar_cancelacion(self):
+        if self.cancelar is not None and self.cancelar.is_set():
+            raise ProcesoCancelado()
+
+    def _avisar(self, forzar=False):
+        if self.callback is None:
+            return
+        ahora = time.monotonic()
+        if not forzar and ahora - self._ultimo_aviso < self.intervalo:
+            return
+        self._ultimo_aviso = ahora
+
+        fraccion = None
+        eta = None
+        if self._trabajo_total:
+            fraccion = min(1.0, self._trabajo_hecho / self._trabajo_total)
+            if fraccion > 0:
+                eta = (ahora - self._inicio_etapa) * (1 - fraccion) / fraccion
+        self.estado["fraccion"] = fraccion
+        self.estado["eta_segundos"] = eta
+        self.callback(dict(self.estado))
+
+
+def _copy_style(src_cell, dst_cell):
+    """
+    Copia el estilo completo de src_cell a dst_cell.
+
+    La primera vez que un estilo de origen llega a un libro destino se copia
+    atributo por atributo (lo que lo registra en las tablas de estilos del
+    destino) y se guarda el StyleArray resultante. Las siguientes celdas con el
+    mismo estilo reciben una copia de ese arreglo en un solo paso.
+    """
+    wb_dst = dst_cell.parent.parent
+    estilos = _estilos_por_libro.get(wb_dst)
+    if estilos is None:
+        estilos = _estilos_por_libro[wb_dst] = {}
+
+    # Las celdas de solo lectura exponen el índice del estilo; las normales, su StyleArray
+    style_id = getattr(src_cell, '_style_id', None)
+    clave = (src_cell.parent.parent, style_id if style_id is not None else tuple(src_cell._style))
+
+    estilo = estilos.get(clave)
+    if estilo is not None:
+        dst_cell._style = copy(estilo)
+        return
+
+    dst_cell.font = copy(src_cell.font)
+    dst_cell.fill = copy(src_cell.fill)
+    dst_cell.border = copy(src_cell.border)
+    dst_cell.alignment = copy(src_cell.alignment)
+    dst_cell.number_format = src_cell.number_format
+    dst_cell.protection = copy(src_cell.protection)
+    estilos[clave] = copy(dst_cell._style)
+
+
+def _copy_cell(src_cell, ws_dst, dst_row, dst_col=None):
+    """
+    Copia una celda con su valor y estilo completo a la fila dst_row de ws_dst,
+    en la misma columna o en dst_col si se indica.
+    """
+    dst_cell = ws_dst.cell(row=dst_row, column=dst_col or src_cell.column, value=src_cell.value)
     if src_cell.has_style:
-        dst_cell.font = copy(src_cell.font)
-        dst_cell.fill = copy(src_cell.fill)
-        dst_cell.border = copy(src_cell.border)
-        dst_cell.alignment = copy(src_cell.alignment)
-        dst_cell.number_format = src_cell.number_format
-        dst_cell.protection = copy(src_cell.protection)
+        _copy_style(src_cell, dst_cell)
+
+
+def _fila_solo_escritura(src_row, ws_dst):
+    """
+    Convierte una fila de origen (modo solo lectura) en la lista que se agrega a
+    una hoja de solo escritura: las celdas con estilo se construyen como
+    WriteOnlyCell con su formato y el resto se pasa como valor simple.
+    """
+    fila = []
+    for src_cell in src_row:
+        if src_cell is None:
+            # Columna proyectada que no existe en una fila corta
+            fila.append(None)
+        elif getattr(src_cell, 'has_style', False):
+            dst_cell = WriteOnlyCell(ws_dst, value=src_cell.value)
+            _copy_style(src_cell, dst_cell)
+            fila.append(dst_cell)
+        else:
+            fila.append(src_cell.value)
+    return fila
+
+
+def _proyectar_fila(fila, proyeccion):
+    """Celdas de fila en el orden de proyeccion (índices base 1); None si la fila es más corta."""
+    if proyeccion is None:
+        return fila
+    return tuple(fila[c - 1] if c <= len(fila) else None for c in proyeccion)
+
+
+def _proyectar_anchos(anchos, proyeccion):
+    """Convierte anchos {letra de columna de origen: ancho} a las columnas de salida de proyeccion."""
+    if proyeccion is None:
+        return anchos
+    proyectados = {}
+    for destino, origen in enumerate(proyeccion, start=1):
+        ancho = anchos.get(get_column_letter(origen))
+        if ancho is not None:
+            proyectados[get_column_letter(destino)] = ancho
+    return proyectados
+
+
+def _rangos_tabla(min_col, max_col, proyeccion):
+    """
+    Rangos (primera, última) de columnas de salida que ocupa una tabla de las
+    columnas min_col..max_col del origen. Sin proyección es el mismo rango; con
+    ella, cada tramo contiguo de columnas de la tabla que se exportan forma su
+    propia tabla y las tablas sin columnas exportadas desaparecen.
+    """
+    if proyeccion is None:
+        return [(min_col, max_col)]
+    rangos = []
+    for destino, origen in enumerate(proyeccion, start=1):
+        if min_col <= origen <= max_col:
+            if rangos and rangos[-1][1] == destino - 1:
+                rangos[-1] = (rangos[-1][0], destino)
+            else:
+                rangos.append((destino, destino))
+    return rangos
+
+
+def _add_tables(src_tables, ws_dst, new_row_count, display_name_prefix="T", encabezados=None, proyeccion=None):
+    """
+    Recrea las tablas src_tables (p. ej. ws_src.tables.values()) en ws_dst con el
+    rango ajustado a new_row_count filas.
+    Los nombres de las tablas se derivan de display_name_prefix y se numeran
+    si ya están en uso en el workbook destino.
+    encabezados es necesario en hojas de solo escritura, donde openpyxl no puede
+    leer la fila de encabezado para nombrar las columnas de la tabla.
+    proyeccion son las columnas de origen exportadas, en orden (ver
+    _rangos_tabla); encabezados ya debe estar en ese orden.
+    """
+    rangos = []
+    for src_table in src_tables:
+        min_col, _min_row, max_col, _max_row = range_boundaries(src_table.ref)
+        rangos.extend((src_table, rango) for rango in _rangos_tabla(min_col, max_col, proyeccion))
+
+    for i, (src_table, (min_col, max_col)) in enumerate(rangos):
+        new_ref = f"{get_column_letter(min_col)}1:{get_column_letter(max_col)}{new_row_count}"
+
+        safe_prefix = re.sub(r'[^A-Za-z0-9_]', '_', display_name_prefix)[:28]
+        display_name = f"{safe_prefix}_{i}" if i > 0 else safe_prefix
+        # El recorte puede dejar dos hojas con el mismo prefijo (p. ej. las partes
+        # "<valor largo> (2)" y "(3)"): se numera hasta que el nombre esté libre
+        if ws_dst.parent._duplicate_name(display_name):
+            numero = 2
+            while ws_dst.parent._duplicate_name(f"{display_name}_{numero}"):
+                numero += 1
+            display_name = f"{display_name}_{numero}"
+
+        new_table = Table(displayName=display_name, ref=new_ref)
+        if src_table.tableStyleInfo:
+            new_table.tableStyleInfo = TableStyleInfo(
+                name=src_table.tableStyleInfo.name,
+                showFirstColumn=src_table.tableStyleInfo.showFirstColumn,
+                showLastColumn=src_table.tableStyleInfo.showLastColumn,
+                showRowStripes=src_table.tableStyleInfo.showRowStripes,
+                showColumnStripes=src_table.tableStyleInfo.showColumnStripes,
+            )
+        if encabezados is not None:
+            new_table._initialise_columns()
+            for col in new_table.tableColumns:
+                if col.id <= len(encabezados) and encabezados[col.id - 1] is not None:
+                    col.name = str(encabezados[col.id - 1])
+        with warnings.catch_warnings():
+            if encabezados is not None:
+                # openpyxl avisa en solo escritura que faltan las columnas, aunque ya se agregaron
+                warnings.simplefilter("ignore", UserWarning)
+            ws_dst.add_table(new_table)
+
+
+def _copy_sheet(ws_src, ws_dst):
+    """Copia todas las celdas, anchos de columna, altos de fila y celdas combinadas de ws_src a ws_dst."""
+    for row in ws_src.iter_rows():
+        for cell in row:
+            _copy_cell(cell, ws_dst, dst_row=cell.row)
+
+    for col_letter, col_dim in ws_src.column_dimensions.items():
+        ws_dst.column_dimensions[col_letter].width = col_dim.width
+
+    for row_idx, row_dim in ws_src.row_dimensions.items():
+        ws_dst.row_dimensions[row_idx].height = row_dim.height
+
+    for merged_range in ws_src.merged_cells.ranges:
+        ws_dst.merge_cells(str(merged_range))
+
+    # Copiar tablas con el mismo rango (copia completa de la hoja)
+    total_rows = ws_src.max_row
+    _add_tables(ws_src.tables.values(), ws_dst, new_row_count=total_rows, display_name_prefix=ws_dst.title)
+
+
+class _Parte:
+    """
+    Clave de la parte número numero (2 en adelante) de un grupo dividido por
+    tamaño. La primera parte conserva la clave del grupo; las siguientes se
+    nombran "<valor> (2)", "<valor> (3)", etc.
+    """
+    __slots__ = ("valor", "numero")
+
+    def __init__(self, valor, numero):
+        self.valor = valor
+        self.numero = numero
+
+    @property
+    def sufijo(self):
+        return f" ({self.numero})"
+
+    def __eq__(self, otra):
+        return isinstance(otra, _Parte) and (self.valor, self.numero) == (otra.valor, otra.numero)
+
+    def __hash__(self):
+        return hash((_Parte, self.valor, self.numero))
+
+    def __repr__(self):
+        return f"{sanitize_sheet_name(self.valor)}{self.sufijo}"
+
+    __str__ = __repr__
+
+
+def _filas_por_parte(max_filas=None, max_mb=None, bytes_por_fila=None, limite_excel=True):
+    """
+    Filas de datos por archivo de salida: el menor entre max_filas, las que
+    entran en max_mb según bytes_por_fila (estimado, ver
+    _estimar_bytes_por_fila) y, si limite_excel, las que admite una hoja.
+    None si no hay límite.
+    """
+    limites = []
+    if limite_excel:
+        limites.append(LIMITE_FILAS_EXCEL - 1)
+    if max_filas:
+        limites.append(max_filas)
+    if max_mb and bytes_por_fila:
+        limites.append(max(1, int(max_mb * 1024 * 1024 / bytes_por_fila)))
+    return min(limites) if limites else None
+
+
+def _estimar_bytes_por_fila(archivo_excel, total_filas, fraccion_columnas=1.0):
+    """
+    Tamaño medio de una fila en el archivo de origen, que sirve de estimación
+    para los .xlsx de salida (comprimidos igual que el origen). fraccion_columnas
+    es la parte de las columnas que se exportan.
+    """
+    if not total_filas:
+        return None
+    return os.path.getsize(archivo_excel) / total_filas * fraccion_columnas
+
+
+def _partes_grupos(groups, filas_por_parte):
+    """
+    Divide los grupos con más de filas_por_parte filas en partes consecutivas
+    (ver _Parte). Cada parte se escribe como un grupo más: su propia hoja en el
+    combinado y su propio archivo individual, con encabezado y tablas.
+    """
+    if not filas_por_parte or all(len(filas) <= filas_por_parte for filas in groups.values()):
+        return groups
+    partes = {}
+    for valor, filas in groups.items():
+        for numero, inicio in enumerate(range(0, len(filas), filas_por_parte), start=1):
+            partes[valor if numero == 1 else _Parte(valor, numero)] = filas[inicio:inicio + filas_por_parte]
+    return partes
+
+
+def sanitize_sheet_name(name):
+    """
+    Sanitiza el nombre de una hoja de Excel para evitar caracteres no válidos.
+    Excel no permite: [ ] * ? : / \
+    También limita la longitud a 31 caracteres.
+    """
+    if name is None:
+        return "Sin_nombre"
+
+    # Las partes de un grupo conservan su número aunque el nombre se recorte
+    if isinstance(name, _Parte):
+        return sanitize_sheet_name(name.valor)[:31 - len(name.sufijo)] + name.sufijo
+
+    # Las claves compuestas se nombran "valor1 - valor2"
+    if isinstance(name, tuple):
+        name = " - ".join("Sin_nombre" if v is None else str(v) for v in name)
+
+    # Convertir a string si no lo es
+    name = str(name)
+
+    # Reemplazar caracteres no válidos con guiones bajos
+    invalid_chars = r'[\[\]\*\?:/\\]'
+    sanitized = re.sub(invalid_chars, '_', name)
+
+    # Eliminar caracteres no imprimibles
+    sanitized = ''.join(c for c in sanitized if c.isprintable())
+
+    # Si está vacío después de sanitizar, usar un nombre predeterminado
+    if not sanitized or sanitized.isspace():
+        sanitized = "Hoja_Sin_Nombre"
+
+    # Limitar a 31 caracteres (límite de Excel)
+    return sanitized[:31]
 
 
-def _add_tables(ws_src, ws_dst, new_row_count, display_name_prefix="T"):
+def exportar_ventanas_xlsx(file_path, carpeta_principal):
+    """
+    Exporta cada hoja del archivo Excel a un archivo individual
+    dentro de una subcarpeta de la carpeta principal proporcionada.
+    
+    Args:
+        file_path: Ruta al archivo Excel que contiene las hojas a exportar
+        carpeta_principal: Carpeta principal donde se creará la subcarpeta para los archivos individuales
+    
+    Returns:
+        Ruta a la subcarpeta donde se guardaron los archivos individuales
     """
-    Recrea las tablas de ws_src en ws_dst con el rango ajustado a new_row_count filas.
-    display_name_prefix debe ser único dentro del workbook destino.
+    # Cargar el archivo xlsx preservando estilos
+    wb_combined = openpyxl.load_workbook(file_path, data_only=True)
+
+    # Obtener el nombre del archivo sin la extensión
+    file_name = os.path.splitext(os.path.basename(file_path))[0]
+
+    # Crear una subcarpeta para almacenar los archivos individuales dentro de la carpeta principal
+    folder_name = f"Separados-{file_name}"
+    full_folder_path = os.path.join(carpeta_principal, folder_name)
+    os.makedirs(full_folder_path, exist_ok=True)
+
+    # Iterar sobre todas las hojas en el archivo xlsx
+    for sheet_name in wb_combined.sheetnames:
+        try:
+            # Generar el nombre de archivo exportado
+            export_file_name = f"{file_name}-{sheet_name}.xlsx"
+            export_file_path = os.path.join(full_folder_path, export_file_name)
+
+            # Crear un workbook individual y copiar la hoja con formato
+            wb_individual = openpyxl.Workbook()
+            wb_individual.remove(wb_individual.active)
+            ws_dst = wb_individual.create_sheet(title=sheet_name)
+            _copy_sheet(wb_combined[sheet_name], ws_dst)
+            wb_individual.save(export_file_path)
+        except Exception as e:
+            print(f"Error al exportar la hoja {sheet_name}: {str(e)}")
+            continue
+
+    print(f"Se han exportado las ventanas por xlsx separados en la carpeta: {full_folder_path}")
+    return full_folder_path
+
+
+class _CeldaVacia:
+    """Celda que no existe en la hoja de origen: sin valor ni estilo."""
+    __slots__ = ()
+    value = None
+    has_style = False
+    _style = None
+
+
+_CELDA_VACIA = _CeldaVacia()
+
+
+def _celdas_fila(ws_src, fila, columnas):
+    """
+    Celdas de la fila fila de ws_src en columnas, con _CELDA_VACIA donde no
+    hay celda. A diferencia de ws_src.cell() e iter_rows(), no crea celdas: la
+    hoja puede ser la del libro compartido de la caché (ver cargar_libro).
+    """
+    celdas = ws_src._cells
+    return tuple(celdas.get((fila, c), _CELDA_VACIA) for c in columnas)
+
+
+def _valores_columna(ws_src, columna):
+    """Valores de la columna columna de ws_src desde la fila 2, sin crear celdas (ver _celdas_fila)."""
+    celdas = ws_src._cells
+    return [celdas.get((r, columna), _CELDA_VACIA).value for r in range(2, ws_src.max_row + 1)]
+
+
+def _leer_filas(ws_src, filas, header_row, proyeccion=None):
+    """
+    Devuelve las filas de ws_src (tuplas de celdas) para los números de fila
+    dados, en orden, con todas las columnas o solo las de proyeccion.
+    """
+    # El ancho sale del encabezado: ws_src.max_column recorre todas las celdas
+    # de la hoja y esto se llama una vez por grupo
+    columnas = proyeccion or range(1, len(header_row) + 1)
+    for r in filas:
+        yield _celdas_fila(ws_src, r, columnas)
+
+
+def _escribir_grupo(ws_src, header_row, filas, ws_dst, medidor=None, proyeccion=None):
+    """
+    Escribe el encabezado y las filas de un grupo en ws_dst, con anchos de
+    columna y tablas del original. filas son los números de fila del grupo en
+    ws_src; las celdas se leen por índice al momento de copiarlas. Con
+    proyeccion (índices base 1 de las columnas de origen, en el orden de
+    salida) solo se leen y copian esas columnas.
+    """
+    if medidor is None:
+        medidor = _Medidor()
+    filas_grupo = _leer_filas(ws_src, filas, header_row, proyeccion)
+    header_row = _proyectar_fila(header_row, proyeccion)
+
+    with medidor.etapa("copia"):
+        # Copiar fila de encabezado con formato
+        for dst_col, cell in enumerate(header_row, start=1):
+            _copy_cell(cell, ws_dst, dst_row=1, dst_col=dst_col)
+
+        # Copiar filas de datos del grupo con formato
+        for dst_row, src_row in enumerate(filas_grupo, start=2):
+            for dst_col, cell in enumerate(src_row, start=1):
+                _copy_cell(cell, ws_dst, dst_row=dst_row, dst_col=dst_col)
+
+        # Copiar anchos de columna del original
+        anchos = {col_letter: col_dim.width for col_letter, col_dim in ws_src.column_dimensions.items()}
+        for col_letter, width in _proyectar_anchos(anchos, proyeccion).items():
+            ws_dst.column_dimensions[col_letter].width = width
+    medidor.contar("copia", filas=len(filas), celdas=(1 + len(filas)) * len(header_row))
+
+    # Recrear tablas del original con rango ajustado a las filas del grupo
+    with medidor.etapa("tablas"):
+        new_row_count = 1 + len(filas)  # encabezado + filas del grupo
+        _add_tables(ws_src.tables.values(), ws_dst, new_row_count=new_row_count, display_name_prefix=ws_dst.title,
+                    proyeccion=proyeccion)
+    medidor.contar("tablas", tablas=len(ws_src.tables))
+
+
+def _nombre_hoja_unico(valor, used_sheet_names):
+    """Devuelve un nombre de hoja válido para valor, registrándolo en used_sheet_names."""
+    # Sanitizar el nombre de la hoja
+    sheet_name = sanitize_sheet_name(valor)
+
+    # Manejar duplicados agregando un número
+    if sheet_name in used_sheet_names:
+        used_sheet_names[sheet_name] += 1
+        sheet_name = f"{sheet_name}_{used_sheet_names[sheet_name]}"
+    else:
+        used_sheet_names[sheet_name] = 0
+    return sheet_name
+
+
+def _nombres_hojas_unicos(valores):
+    """Devuelve un nombre de hoja válido y único para cada valor, en el mismo orden."""
+    # Diccionario para llevar registro de nombres de hojas ya utilizados
+    used_sheet_names = {}
+    return [_nombre_hoja_unico(valor, used_sheet_names) for valor in valores]
+
+
+def _nombre_carpeta(valor):
+    """Nombre de carpeta válido en Windows para un valor (o lista de columnas)."""
+    nombre = re.sub(r'[<>:"/\\|?*]', '_', sanitize_sheet_name(valor)).strip(" .")
+    return nombre or "Sin_nombre"
+
+
+def _carpetas_particiones(carpeta_principal, particiones):
+    """
+    Carpeta de resultados de cada partición: la carpeta principal si hay una
+    sola o, si hay varias, una subcarpeta "Por <columnas>" para cada una.
+    """
+    if len(particiones) == 1:
+        return [carpeta_principal]
+    usados = {}
+    return [
+        os.path.join(carpeta_principal, _nombre_hoja_unico(_nombre_carpeta("Por " + "+".join(columnas)), usados))
+        for columnas in particiones
+    ]
+
+
+def _rutas_individuales(valores, sheet_names, full_folder_path, file_name, anidar=False, extension=".xlsx"):
+    """
+    Devuelve {valor: ruta del archivo individual}. Con anidar, cada clave
+    compuesta se guarda en una subcarpeta por nivel salvo el último:
+    Separados-x/<nivel 1>/<nivel 2>/x-<último nivel>.xlsx.
+    """
+    usados = defaultdict(dict)  # carpeta -> nombres ya usados en ella
+    return {
+        valor: _ruta_individual(valor, sheet_name, full_folder_path, file_name, usados, anidar, extension)
+        for valor, sheet_name in zip(valores, sheet_names)
+    }
+
+
+def _ruta_individual(valor, sheet_name, full_folder_path, file_name, usados, anidar=False, extension=".xlsx"):
+    """Ruta del archivo individual de un valor (ver _rutas_individuales); usados se comparte entre valores."""
+    clave = valor.valor if isinstance(valor, _Parte) else valor
+    if anidar and isinstance(clave, tuple) and len(clave) > 1:
+        carpeta = os.path.join(full_folder_path, *(_nombre_carpeta(v) for v in clave[:-1]))
+        ultimo = _Parte(clave[-1], valor.numero) if isinstance(valor, _Parte) else clave[-1]
+        return os.path.join(carpeta, f"{file_name}-{_nombre_hoja_unico(ultimo, usados[carpeta])}{extension}")
+    return os.path.join(full_folder_path, f"{file_name}-{sheet_name}{extension}")
+
+
+def _exportar_grupo_en_proceso(archivo_excel, hoja, sheet_name, filas, export_file_path, proyeccion=None, ancho=None):
+    """
+    Escribe el archivo individual de un grupo dentro de un proceso trabajador.
+
+    Recibe solo los números de fila del grupo; el libro de origen se carga una
+    vez por proceso a través de la caché de libros y se reutiliza para todos los
+    grupos que le toquen a ese trabajador. ancho es la cantidad de columnas
+    del encabezado; sin él se calcula recorriendo toda la hoja.
+
+    Returns:
+        None si se exportó correctamente o el mensaje de error.
+    """
+    try:
+        ws_src = cargar_libro(archivo_excel)[hoja]
+        wb_individual = openpyxl.Workbook()
+        wb_individual.remove(wb_individual.active)
+        ws_individual = wb_individual.create_sheet(title=sheet_name)
+        header_row = _celdas_fila(ws_src, 1, range(1, (ancho or ws_src.max_column) + 1))
+        _escribir_grupo(ws_src, header_row, filas, ws_individual, proyeccion=proyeccion)
+        wb_individual.save(export_file_path)
+    except Exception as e:
+        return str(e)
+    return None
+
+
+def _firma_archivo(ruta):
+    """Devuelve [mtime_ns, tamaño] del archivo o None si no existe."""
+    try:
+        return list(_CacheLibros._firma(ruta))
+    except OSError:
+        return None
+
+
+def _huella_formato(file_path, sheet_name, columna, proyeccion=None):
+    """
+    Huella de lo que comparten todos los grupos de una división: la tabla de
+    estilos del libro, los anchos de columna y las tablas de la hoja, la
+    columna por la que se divide y las columnas exportadas. Los hashes de
+    grupo solo se comparan entre corridas con la misma huella.
+    """
+    h = hashlib.blake2b(digest_size=16)
+    h.update(repr((VERSION_MANIFIESTO, sheet_name, columna)).encode())
+    if proyeccion is not None:
+        h.update(repr(tuple(proyeccion)).encode())
+    with zipfile.ZipFile(file_path) as zf:
+        rels = _leer_relaciones(zf, _ruta_workbook_xml(zf))
+        for tipo, ruta in rels.values():
+            if tipo.endswith('/styles'):
+                h.update(zf.read(ruta))
+    anchos, tablas = leer_formato_hoja(file_path, sheet_name)
+    h.update(repr(sorted(anchos.items())).encode())
+    for tabla in tablas:
+        h.update(ElementTree.tostring(tabla.to_tree()))
+    return h.hexdigest()
+
+
+def _hash_grupo(ws_src, header_row, filas, proyeccion=None):
+    """
+    Hash del contenido de un grupo: valores y estilos del encabezado y de cada
+    fila, en orden y solo en las columnas exportadas. Los estilos entran por
+    su índice en el libro de origen, que es estable mientras no cambie la
+    huella de formato.
+    """
+    h = hashlib.blake2b(digest_size=16)
+    filas_grupo = _leer_filas(ws_src, filas, header_row, proyeccion)
+    for fila in itertools.chain((_proyectar_fila(header_row, proyeccion),), filas_grupo):
+        h.update(repr([c.value for c in fila]).encode())
+        # Las celdas combinadas (MergedCell) pueden no tener estilo propio
+        h.update(b"".join(c._style.tobytes() if c._style is not None else b"-" for c in fila))
+    return h.hexdigest()
+
+
+def _ruta_manifiesto(carpeta_principal, file_name):
+    """Ruta del manifiesto del libro file_name (sin extensión) en carpeta_principal."""
+    return os.path.join(carpeta_principal, MANIFIESTO_DIVISION.format(file_name))
+
+
+def _leer_manifiesto(carpeta_principal, file_name):
+    """
+    Devuelve el manifiesto de la corrida anterior del libro file_name en
+    carpeta_principal (vacío si no hay o está dañado).
+    """
+    try:
+        with open(_ruta_manifiesto(carpeta_principal, file_name), encoding="utf-8") as fh:
+            manifiesto = json.load(fh)
+        if isinstance(manifiesto.get("grupos"), dict):
+            return manifiesto
+    except (OSError, ValueError, AttributeError):
+        pass
+    return {"grupos": {}}
+
+
+def _dentro_de_carpeta(ruta, carpeta):
+    """True si ruta queda dentro de carpeta (sin ser ella) una vez resueltos '..' y enlaces."""
+    ruta, carpeta = os.path.realpath(ruta), os.path.realpath(carpeta)
+    try:
+        return ruta != carpeta and os.path.commonpath([ruta, carpeta]) == carpeta
+    except ValueError:
+        # Rutas en unidades distintas (Windows)
+        return False
+
+
+def _escribir_manifiesto(carpeta_principal, file_name, manifiesto):
+    """Guarda el manifiesto del libro file_name reemplazando el anterior de forma atómica."""
+    ruta = _ruta_manifiesto(carpeta_principal, file_name)
+    temporal = ruta + ".tmp"
+    with open(temporal, "w", encoding="utf-8") as fh:
+        json.dump(manifiesto, fh, ensure_ascii=False, indent=1, default=str)
+    os.replace(temporal, ruta)
+
+
+def exportar_grupos_xlsx(ws_src, header_row, groups, ruta_resultado, carpeta_principal,
+                         origen=None, workers=1, progreso=None, huella=None, anidar=False, proyeccion=None):
+    """
+    Escribe en una sola pasada el archivo combinado (una hoja por grupo) y un
+    archivo individual por grupo, a partir del índice de grupos en memoria.
+
+    Reemplaza el flujo de guardar el combinado y volver a cargarlo con
+    exportar_ventanas_xlsx: cada grupo se copia directamente desde la hoja de
+    origen a ambos destinos, sin releer nada del disco.
+
+    Con workers > 1 los archivos individuales se escriben en paralelo en un
+    pool de procesos mientras el proceso principal arma el combinado. A cada
+    trabajador se le envía solo la lista de números de fila del grupo.
+
+    Con huella la exportación es incremental: se calcula un hash por grupo y se
+    compara con el manifiesto (MANIFIESTO_DIVISION) de la corrida anterior del
+    mismo libro en carpeta_principal. Los archivos individuales cuyo hash no
+    cambió y que siguen intactos en disco se conservan, el combinado solo se
+    reescribe si cambió algún grupo y se borran los archivos de grupos que ya
+    no existen, solo dentro de la subcarpeta Separados-<libro>.
+
+    Args:
+        ws_src: Hoja de origen (para anchos de columna y tablas)
+        header_row: Celdas de la fila de encabezado
+        groups: Diccionario valor -> array('I') de números de fila, en orden de aparición
+        ruta_resultado: Ruta del archivo combinado a generar
+        carpeta_principal: Carpeta donde se creará la subcarpeta de archivos individuales
+        origen: Tupla (archivo_excel, hoja) de origen; necesaria para el modo paralelo
+        workers: Cantidad de procesos para los archivos individuales (1 = secuencial)
+        progreso: _Progreso opcional para reportar avance y atender la cancelación,
+            que se comprueba entre grupos
+        huella: Huella de formato del origen (ver _huella_formato); None
+            reescribe todo y no guarda manifiesto
+        anidar: Guardar los archivos de claves compuestas en subcarpetas por
+            nivel (ver _rutas_individuales)
+        proyeccion: Índices (base 1) de las columnas de origen a exportar, en
+            el orden de salida; None exporta todas
+
+    Returns:
+        Ruta a la subcarpeta donde se guardaron los archivos individuales
+    """
+    if progreso is None:
+        progreso = _Progreso()
+    medidor = progreso.medidor
+
+    file_name = os.path.splitext(os.path.basename(ruta_resultado))[0]
+    full_folder_path = os.path.join(carpeta_principal, f"Separados-{file_name}")
+    progreso.crear_carpeta(full_folder_path)
+
+    seen_values = list(groups)
+    sheet_names = _nombres_hojas_unicos(seen_values)
+    export_paths = _rutas_individuales(seen_values, sheet_names, full_folder_path, file_name, anidar)
+    for carpeta in {os.path.dirname(ruta) for ruta in export_paths.values()}:
+        progreso.crear_carpeta(carpeta)
+
+    # Comparar cada grupo con el manifiesto de la corrida anterior
+    incremental = huella is not None
+    previo = _leer_manifiesto(carpeta_principal, file_name) if incremental else {"grupos": {}}
+    hashes = {}
+    sin_cambios = set()
+    reescribir_combinado = True
+    if incremental:
+        with medidor.etapa("hashes"):
+            for valor in seen_values:
+                hashes[valor] = _hash_grupo(ws_src, header_row, groups[valor], proyeccion)
+        medidor.contar("hashes", grupos=len(seen_values))
+        hash_combinado = hashlib.blake2b(
+            repr([(sheet_name, hashes[valor]) for valor, sheet_name in zip(seen_values, sheet_names)]).encode(),
+            digest_size=16,
+        ).hexdigest()
+        if previo.get("huella") == huella:
+            for valor in seen_values:
+                ruta = export_paths[valor]
+                entrada = previo["grupos"].get(os.path.relpath(ruta, carpeta_principal))
+                if entrada and entrada.get("hash") == hashes[valor] and entrada.get("firma") == _firma_archivo(ruta):
+                    sin_cambios.add(valor)
+            combinado = previo.get("combinado") or {}
+            reescribir_combinado = not (
+                combinado.get("archivo") == os.path.basename(ruta_resultado)
+                and combinado.get("hash") == hash_combinado
+                and combinado.get("firma") == _firma_archivo(ruta_resultado)
+            )
+
+    a_escribir = [valor for valor in seen_values if valor not in sin_cambios]
+    paralelo = workers > 1 and origen is not None and len(a_escribir) > 1
+
+    # Cada fila se escribe dos veces: en el combinado y en el archivo individual
+    total_filas = sum(len(filas) for filas in groups.values())
+    progreso.etapa("escribiendo", trabajo_total=2 * total_filas, grupos_total=len(seen_values))
+
+    exportados = set()  # valores cuyo archivo individual quedó al día
+    hubo_errores = False
+
+    pool = None
+    pendientes = {}
+    if paralelo:
+        archivo_excel, hoja = origen
+        pool = ProcessPoolExecutor(max_workers=min(workers, len(a_escribir)))
+        for corregimiento, sheet_name in zip(seen_values, sheet_names):
+            if corregimiento in sin_cambios:
+                continue
+            export_file_path = export_paths[corregimiento]
+            futuro = pool.submit(
+                _exportar_grupo_en_proceso, archivo_excel, hoja, sheet_name, groups[corregimiento], export_file_path,
+                proyeccion, len(header_row)
+            )
+            pendientes[futuro] = (corregimiento, sheet_name, export_file_path)
+
+    try:
+        wb_out = None
+        if reescribir_combinado:
+            wb_out = openpyxl.Workbook()
+            wb_out.remove(wb_out.active)
+
+        for corregimiento, sheet_name in zip(seen_values, sheet_names):
+            progreso.comprobar_cancelacion()
+            filas = groups[corregimiento]
+            try:
+                if wb_out is not None:
+                    ws_out = wb_out.create_sheet(title=sheet_name)
+                    _escribir_grupo(ws_src, header_row, filas, ws_out, medidor, proyeccion)
+            except Exception as e:
+                progreso.error_grupo(corregimiento, f"Error al procesar el valor '{corregimiento}': {str(e)}")
+                hubo_errores = True
+                continue
+            finally:
+                progreso.avanzar(len(filas))
+
+            export_file_path = export_paths[corregimiento]
+            if corregimiento in sin_cambios:
+                exportados.add(corregimiento)
+                progreso.archivo_sin_cambios(export_file_path, len(filas), grupos_escritos=1)
+                continue
+            if paralelo:
+                continue
+            try:
+                # Archivo individual del grupo, escrito desde el mismo índice en memoria
+                wb_individual = openpyxl.Workbook()
+                wb_individual.remove(wb_individual.active)
+                ws_individual = wb_individual.create_sheet(title=sheet_name)
+                _escribir_grupo(ws_src, header_row, filas, ws_individual, medidor, proyeccion)
+                with medidor.etapa("guardado"):
+                    wb_individual.save(export_file_path)
+                medidor.contar("guardado", archivos=1)
+                exportados.add(corregimiento)
+                progreso.archivo_escrito(export_file_path, len(filas), grupos_escritos=1)
+            except Exception as e:
+                progreso.error_grupo(sheet_name, f"Error al exportar la hoja {sheet_name}: {str(e)}")
+                continue
+
+        progreso.comprobar_cancelacion()
+        if wb_out is not None:
+            with medidor.etapa("guardado"):
+                wb_out.save(ruta_resultado)
+            medidor.contar("guardado", archivos=1)
+            progreso.archivo_escrito(ruta_resultado)
+        else:
+            progreso.archivo_sin_cambios(ruta_resultado)
+
+        # Lo que queda de espera corresponde a los archivos individuales aún en los trabajadores
+        with medidor.etapa("espera_trabajadores") if pendientes else contextlib.nullcontext():
+            for futuro in as_completed(pendientes):
+                progreso.comprobar_cancelacion()
+                corregimiento, sheet_name, export_file_path = pendientes[futuro]
+                filas = groups[corregimiento]
+                try:
+                    error = futuro.result()
+                except Exception as e:
+                    error = str(e)
+                if error is not None:
+                    progreso.error_grupo(sheet_name, f"Error al exportar la hoja {sheet_name}: {error}")
+                    progreso.avanzar(len(filas))
+                else:
+                    exportados.add(corregimiento)
+                    progreso.archivo_escrito(export_file_path, len(filas), grupos_escritos=1)
+    finally:
+        if pool is not None:
+            pool.shutdown(cancel_futures=True)
+            # Al cancelar, los trabajadores pueden haber terminado archivos que aún no se
+            # registraron: se agregan para que _eliminar_salida_parcial los borre
+            registrados = set(progreso.archivos)
+            for futuro, (_, _, export_file_path) in pendientes.items():
+                if (export_file_path not in registrados and futuro.done() and not futuro.cancelled()
+                        and futuro.exception() is None and futuro.result() is None):
+                    progreso.archivos.append(export_file_path)
+
+    if incremental:
+        # Borrar los archivos de grupos que ya no aparecen en el origen. Solo
+        # se borra dentro de Separados-<libro>: un manifiesto editado o ajeno
+        # no puede apuntar a archivos de otros libros ni de fuera de la carpeta.
+        vigentes = {os.path.relpath(ruta, carpeta_principal) for ruta in export_paths.values()}
+        for relativa in previo["grupos"]:
+            ruta = os.path.join(carpeta_principal, relativa)
+            if relativa in vigentes or not _dentro_de_carpeta(ruta, full_folder_path):
+                continue
+            if os.path.isfile(ruta):
+                os.remove(ruta)
+                progreso.eliminados.append(ruta)
+                # Quitar las subcarpetas de niveles que quedaron vacías
+                carpeta = os.path.dirname(ruta)
+                while carpeta != full_folder_path and carpeta.startswith(full_folder_path) and not os.listdir(carpeta):
+                    os.rmdir(carpeta)
+                    carpeta = os.path.dirname(carpeta)
+
+        manifiesto = {
+            "version": VERSION_MANIFIESTO,
+            "huella": huella,
+            "grupos": {
+                os.path.relpath(export_paths[valor], carpeta_principal): {
+                    "valor": valor,
+                    "filas": len(groups[valor]),
+                    "hash": hashes[valor],
+                    "firma": _firma_archivo(export_paths[valor]),
+                }
+                for valor in seen_values
+                if valor in exportados
+            },
+        }
+        # Si faltó alguna hoja en el combinado, no registrarlo para que se regenere la próxima vez
+        if not hubo_errores:
+            manifiesto["combinado"] = {
+                "archivo": os.path.basename(ruta_resultado),
+                "hash": hash_combinado,
+                "firma": _firma_archivo(ruta_resultado),
+            }
+        _escribir_manifiesto(carpeta_principal, file_name, manifiesto)
+
+    print(f"Se han exportado las ventanas por xlsx separados en la carpeta: {full_folder_path}")
+    return full_folder_path
+
+
+def _nombre_local(tag):
+    """Devuelve el nombre de una etiqueta XML sin su espacio de nombres."""
+    return tag.rsplit('}', 1)[-1]
+
+
+def _resolver_destino(base_xml, target):
+    """Resuelve el Target de una relación OOXML a una ruta dentro del zip."""
+    if target.startswith('/'):
+        return target.lstrip('/')
+    return posixpath.normpath(posixpath.join(posixpath.dirname(base_xml), target))
+
+
+def _leer_relaciones(zf, base_xml):
+    """Lee el archivo .rels asociado a base_xml y devuelve {Id: (Type, ruta)}."""
+    rels_path = posixpath.join(posixpath.dirname(base_xml), '_rels', posixpath.basename(base_xml) + '.rels')
+    if rels_path not in zf.namelist():
+        return {}
+    root = ElementTree.fromstring(zf.read(rels_path))
+    return {
+        rel.get('Id'): (rel.get('Type', ''), _resolver_destino(base_xml, rel.get('Target', '')))
+        for rel in root
+        if _nombre_local(rel.tag) == 'Relationship'
+    }
+
+
+def _ruta_workbook_xml(zf):
+    """Devuelve la ruta de workbook.xml dentro del zip según las relaciones del paquete."""
+    for tipo, ruta in _leer_relaciones(zf, '').values():
+        if tipo.endswith('/officeDocument'):
+            return ruta
+    return 'xl/workbook.xml'
+
+
+def _manifiesto_xlsx(zf):
+    """
+    Lee el manifiesto del libro (workbook.xml y sus relaciones) sin tocar las hojas.
+
+    Returns:
+        Tupla (hojas, ruta_shared_strings) donde hojas es una lista de pares
+        (nombre_hoja, ruta_xml_hoja) en el orden del libro.
+    """
+    workbook_xml = _ruta_workbook_xml(zf)
+    rels = _leer_relaciones(zf, workbook_xml)
+    shared_strings = next((ruta for tipo, ruta in rels.values() if tipo.endswith('/sharedStrings')), None)
+
+    hojas = []
+    root = ElementTree.fromstring(zf.read(workbook_xml))
+    for elem in root.iter():
+        if _nombre_local(elem.tag) != 'sheet':
+            continue
+        rel_id = next((v for k, v in elem.attrib.items() if _nombre_local(k) == 'id'), None)
+        hojas.append((elem.get('name'), rels.get(rel_id, ('', None))[1]))
+    return hojas, shared_strings
+
+
+def _texto_si(elem):
+    """Texto de un <si> de sharedStrings.xml: concatena el texto enriquecido e ignora la fonética (rPh)."""
+    partes = []
+    for hijo in elem:
+        nombre = _nombre_local(hijo.tag)
+        if nombre == 't':
+            partes.append(hijo.text or '')
+        elif nombre == 'r':
+            partes.extend(t.text or '' for t in hijo if _nombre_local(t.tag) == 't')
+    return ''.join(partes)
+
+
+def _leer_shared_strings(zf, ruta, indices):
+    """
+    Recorre sharedStrings.xml en streaming y devuelve {indice: texto} solo para
+    los índices pedidos, deteniéndose en cuanto tiene el mayor de ellos.
+    """
+    if not indices or ruta is None:
+        return {}
+    maximo = max(indices)
+    resultado = {}
+    with zf.open(ruta) as fh:
+        pos = 0
+        for _event, elem in ElementTree.iterparse(fh, events=('end',)):
+            if _nombre_local(elem.tag) != 'si':
+                continue
+            if pos in indices:
+                resultado[pos] = _texto_si(elem)
+            elem.clear()
+            if pos >= maximo:
+                break
+            pos += 1
+    return resultado
+
+
+def _valor_celda_xml(tipo, valor, texto_inline):
+    """Convierte el contenido crudo de una celda <c> al valor que devolvería openpyxl."""
+    if tipo == 'inlineStr':
+        return texto_inline
+    if valor is None:
+        return None
+    if tipo in ('str', 'e'):
+        return valor
+    if tipo == 'b':
+        return valor == '1'
+    try:
+        return float(valor) if any(ch in valor for ch in '.eE') else int(valor)
+    except ValueError:
+        return valor
+
+
+def _contenido_celda_xml(elem):
+    """Devuelve (tipo, valor, texto_inline) de una celda <c> tal como están en el XML."""
+    valor = None
+    texto_inline = None
+    for hijo in elem:
+        hijo_nombre = _nombre_local(hijo.tag)
+        if hijo_nombre == 'v':
+            valor = hijo.text
+        elif hijo_nombre == 'is':
+            texto_inline = ''.join(t.text or '' for t in hijo.iter() if _nombre_local(t.tag) == 't')
+    return elem.get('t', 'n'), valor, texto_inline
+
+
+def _estilos_fecha(zf, ruta_estilos):
+    """
+    Devuelve {índice de estilo: es_duración} para los estilos de celda (el
+    atributo s de <c>) con formato de fecha u hora, leídos de styles.xml con
+    las mismas reglas que usa openpyxl.
+    """
+    if ruta_estilos is None:
+        return {}
+    # Se importan aquí para no cargar openpyxl al arrancar
+    _importar_openpyxl()
+    from openpyxl.styles.numbers import BUILTIN_FORMATS, is_date_format, is_timedelta_format
+
+    formatos = dict(BUILTIN_FORMATS)
+    estilos = {}
+    for elem in ElementTree.fromstring(zf.read(ruta_estilos)):
+        nombre = _nombre_local(elem.tag)
+        if nombre == 'numFmts':
+            formatos.update((int(fmt.get('numFmtId')), fmt.get('formatCode', '')) for fmt in elem)
+        elif nombre == 'cellXfs':
+            for indice, xf in enumerate(elem):
+                codigo = formatos.get(int(xf.get('numFmtId', 0)), '')
+                if is_date_format(codigo):
+                    estilos[indice] = is_timedelta_format(codigo)
+    return estilos
+
+
+def _formatos_fecha_libro(zf):
+    """
+    Devuelve ({estilo: es_duración}, fecha_1904) del libro: lo necesario para
+    convertir las celdas numéricas con formato de fecha como lo hace openpyxl.
+    """
+    workbook_xml = _ruta_workbook_xml(zf)
+    ruta_estilos = next(
+        (ruta for tipo, ruta in _leer_relaciones(zf, workbook_xml).values() if tipo.endswith('/styles')), None
+    )
+    fecha_1904 = re.search(rb'date1904=["\'](1|true)["\']', zf.read(workbook_xml)) is not None
+    return _estilos_fecha(zf, ruta_estilos), fecha_1904
+
+
+def _valor_fecha_xml(valor, es_duracion, fecha_1904):
+    """Convierte el número de serie de una celda con formato de fecha; None si no es una fecha válida."""
+    # Se importa aquí para no cargar openpyxl al arrancar
+    _importar_openpyxl()
+    from openpyxl.utils.datetime import CALENDAR_MAC_1904, CALENDAR_WINDOWS_1900, from_excel
+    try:
+        return from_excel(float(valor), CALENDAR_MAC_1904 if fecha_1904 else CALENDAR_WINDOWS_1900,
+                          timedelta=es_duracion)
+    except (ValueError, OverflowError):
+        return None
+
+
+def _leer_primera_fila_xlsx(zf, ruta_hoja, ruta_shared_strings):
+    """
+    Lee únicamente la fila 1 de la hoja en streaming y devuelve sus valores no
+    vacíos. Las celdas con formato de fecha se convierten a fecha como en
+    openpyxl, así que el texto coincide con el que ven los motores de división.
+    """
+    celdas = []  # (tipo, valor, texto_inline, estilo)
+    with zf.open(ruta_hoja) as fh:
+        for event, elem in ElementTree.iterparse(fh, events=('start', 'end')):
+            nombre = _nombre_local(elem.tag)
+            if event == 'start':
+                # La cabecera debe ser la fila 1; si la primera fila es otra no hay encabezados
+                if nombre == 'row' and elem.get('r') not in (None, '1'):
+                    break
+                continue
+            if nombre == 'c':
+                celdas.append((*_contenido_celda_xml(elem), elem.get('s')))
+            elif nombre == 'row' or nombre == 'sheetData':
+                break
+
+    indices = {int(v) for t, v, _, _ in celdas if t == 's' and v is not None}
+    textos = _leer_shared_strings(zf, ruta_shared_strings, indices)
+    # Los estilos solo se leen si hay algún número con formato que podría ser una fecha
+    fechas, fecha_1904 = {}, False
+    if any(t == 'n' and v is not None and s is not None for t, v, _, s in celdas):
+        fechas, fecha_1904 = _formatos_fecha_libro(zf)
+    valores = []
+    for t, v, inline, estilo in celdas:
+        if t == 's' and v is not None:
+            valores.append(textos.get(int(v)))
+            continue
+        valor = None
+        if t == 'n' and v is not None and estilo is not None and int(estilo) in fechas:
+            valor = _valor_fecha_xml(v, fechas[int(estilo)], fecha_1904)
+        valores.append(valor if valor is not None else _valor_celda_xml(t, v, inline))
+    return [v for v in valores if v is not None]
+
+
+def _listar_hojas_sin_cache(file_path):
+    if zipfile.is_zipfile(file_path):
+        try:
+            with zipfile.ZipFile(file_path) as zf:
+                hojas, _ = _manifiesto_xlsx(zf)
+            return [nombre for nombre, _ruta in hojas]
+        except (KeyError, ElementTree.ParseError):
+            wb = openpyxl.load_workbook(file_path, read_only=True)
+            try:
+                return list(wb.sheetnames)
+            finally:
+                wb.close()
+    return list(pd.ExcelFile(file_path).sheet_names)
+
+
+def _leer_encabezados_sin_cache(file_path, sheet_name):
+    if zipfile.is_zipfile(file_path):
+        try:
+            with zipfile.ZipFile(file_path) as zf:
+                hojas, shared_strings = _manifiesto_xlsx(zf)
+                ruta_hoja = dict(hojas).get(sheet_name)
+                if ruta_hoja is None:
+                    raise ValueError(f"La hoja '{sheet_name}' no existe en el archivo")
+                valores = _leer_primera_fila_xlsx(zf, ruta_hoja, shared_strings)
+        except (KeyError, ElementTree.ParseError):
+            wb = openpyxl.load_workbook(file_path, read_only=True, data_only=True)
+            try:
+                fila = next(wb[sheet_name].iter_rows(min_row=1, max_row=1, values_only=True), ())
+            finally:
+                wb.close()
+            valores = [v for v in fila if v is not None]
+        return [str(v) for v in valores]
+    df = pd.read_excel(file_path, sheet_name=sheet_name, nrows=0)
+    return [str(c) for c in df.columns]
+
+
+def _leer_formato_hoja_sin_cache(file_path, sheet_name):
+    with zipfile.ZipFile(file_path) as zf:
+        hojas, _ = _manifiesto_xlsx(zf)
+        ruta_hoja = dict(hojas).get(sheet_name)
+        if ruta_hoja is None:
+            raise ValueError(f"La hoja '{sheet_name}' no existe en el archivo")
+
+        # Los anchos (<cols>) van antes de <sheetData>, así que no se leen las filas
+        anchos = {}
+        with zf.open(ruta_hoja) as fh:
+            for event, elem in ElementTree.iterparse(fh, events=('start', 'end')):
+                nombre = _nombre_local(elem.tag)
+                if event == 'start':
+                    if nombre == 'sheetData':
+                        break
+                    continue
+                if nombre == 'col' and elem.get('width') is not None:
+                    anchos[get_column_letter(int(elem.get('min')))] = float(elem.get('width'))
+
+        # Las tablas se encuentran en las relaciones de la hoja
+        tablas = [
+            Table.from_tree(ElementTree.fromstring(zf.read(ruta)))
+            for tipo, ruta in _leer_relaciones(zf, ruta_hoja).values()
+            if tipo.endswith('/table')
+        ]
+    return anchos, tablas
+
+
+def _valores_columna_solo_lectura(ws, col_idx):
+    """
+    Genera el valor de la columna col_idx en cada fila de datos (desde la 2)
+    de una hoja abierta en modo solo lectura, incluidas las filas vacías.
+    Con max_col openpyxl no construye las celdas de las demás columnas.
+    """
+    for (valor,) in ws.iter_rows(min_row=2, min_col=col_idx, max_col=col_idx, values_only=True):
+        yield valor
+
+
+def _contar_valores_sin_cache(file_path, sheet_name, columna):
+    wb = openpyxl.load_workbook(file_path, read_only=True, data_only=True)
+    try:
+        ws = wb[sheet_name]
+        encabezados = [c.value for c in next(ws.iter_rows(max_row=1), ())]
+        col_idx = _indices_particiones(encabezados, [(columna,)])[0][0]
+        # Counter conserva el orden en que aparece cada valor
+        return dict(Counter(_valores_columna_solo_lectura(ws, col_idx)))
+    finally:
+        wb.close()
+
+
+def leer_formato_hoja(file_path, sheet_name):
+    """
+    Devuelve (anchos, tablas) de la hoja sin cargar sus filas: anchos es un
+    diccionario letra de columna -> ancho y tablas la lista de Table definidas
+    en la hoja. Lo usa el modo streaming, donde openpyxl en solo lectura no
+    expone column_dimensions ni tablas.
+    """
+    return _cache_libros.obtener(
+        file_path, ('formato', sheet_name), lambda: _leer_formato_hoja_sin_cache(file_path, sheet_name)
+    )
+
+
+def listar_hojas_excel(file_path):
+    """
+    Devuelve los nombres de las hojas del archivo Excel.
+
+    Para .xlsx solo se lee el manifiesto del libro, por lo que el costo no
+    depende del tamaño de las hojas. Otros formatos se leen con pandas.
+    """
+    return list(_cache_libros.obtener(file_path, ('hojas',), lambda: _listar_hojas_sin_cache(file_path)))
+
+
+def leer_encabezados_hoja(file_path, sheet_name):
+    """
+    Devuelve los nombres de columna (fila 1) de la hoja indicada como texto.
+
+    Para .xlsx se lee en streaming solo la primera fila y las cadenas compartidas
+    que esta referencia, así que la latencia es constante sin importar cuántas
+    filas tenga la hoja.
+    """
+    return list(_cache_libros.obtener(
+        file_path, ('encabezados', sheet_name), lambda: _leer_encabezados_sin_cache(file_path, sheet_name)
+    ))
+
+
+def contar_valores_columna(file_path, sheet_name, columna):
+    """
+    Devuelve {valor: cantidad de filas} de la columna indicada, en orden de
+    aparición: los grupos que generaría una división por esa columna.
+
+    Solo se convierte la celda de esa columna en cada fila (ver
+    _valores_columna_solo_lectura) y la memoria no depende del tamaño de la
+    hoja. El resultado queda en la caché mientras el archivo no cambie en
+    disco y no debe modificarse.
+
+    Raises:
+        ColumnaNoEncontradaError: Si la columna no existe en el encabezado
+    """
+    return _cache_libros.obtener(
+        file_path, ('valores', sheet_name, columna), lambda: _contar_valores_sin_cache(file_path, sheet_name, columna)
+    )
+
+
+class _TextosCompartidos:
+    """
+    Lector incremental de sharedStrings.xml: lee hasta el índice pedido y en la
+    consulta siguiente continúa desde ahí, sin volver a empezar. Solo guarda
+    los textos hasta el mayor índice consultado.
+    """
+
+    def __init__(self, zf, ruta):
+        self._textos = []
+        self._fh = zf.open(ruta) if ruta is not None else None
+        self._elementos = ElementTree.iterparse(self._fh, events=('end',)) if self._fh is not None else None
+
+    def obtener(self, indice):
+        while indice >= len(self._textos) and self._elementos is not None:
+            for _event, elem in self._elementos:
+                if _nombre_local(elem.tag) == 'si':
+                    self._textos.append(_texto_si(elem))
+                    elem.clear()
+                    break
+            else:
+                self._elementos = None
+        return self._textos[indice] if indice < len(self._textos) else None
+
+    def cerrar(self):
+        if self._fh is not None:
+            self._fh.close()
+
+
+class _VistaPreviaHoja:
+    """
+    Páginas de filas de una hoja .xlsx leídas bajo demanda (ver abrir_vista_previa).
+
+    El XML de la hoja está comprimido dentro del zip y no se puede saltar a
+    una posición sin descomprimir todo lo anterior. Lo que más cuesta, sin
+    embargo, es interpretar el XML: el cursor solo busca en los bytes dónde
+    empieza cada <row> y anota la posición de cada página, e interpreta
+    únicamente las filas de la página pedida. Avanzar continúa desde donde
+    quedó el cursor; para volver a una página se usa una caché chica de
+    páginas y, si ya no está, su posición anotada (se descomprime hasta ahí
+    sin interpretar nada). La memoria no depende del tamaño de la hoja, salvo
+    los textos compartidos hasta el mayor índice que aparece en las páginas
+    vistas.
+    """
+
+    def __init__(self, file_path, sheet_name, filas_por_pagina=FILAS_POR_PAGINA_VISTA):
+        self.filas_por_pagina = filas_por_pagina
+        self._zf = zipfile.ZipFile(file_path)
+        self._fh = None
+        self._textos = None
+        self._bloqueo = threading.Lock()
+        try:
+            hojas, ruta_shared_strings = _manifiesto_xlsx(self._zf)
+            self._ruta_hoja = dict(hojas).get(sheet_name)
+            if self._ruta_hoja is None:
+                raise ValueError(f"La hoja '{sheet_name}' no existe en el archivo")
+            self._fechas, self._fecha_1904 = _formatos_fecha_libro(self._zf)
+            self._textos = _TextosCompartidos(self._zf, ruta_shared_strings)
+            self._paginas = OrderedDict()  # número de página -> filas (las más recientes al final)
+            self._abrir(0)
+            self._leer_inicio()
+        except Exception:
+            self.cerrar()
+            raise
+
+    def _abrir(self, posicion):
+        """Abre de nuevo el XML de la hoja y descomprime (sin interpretar) hasta posicion."""
+        if self._fh is not None:
+            self._fh.close()
+        self._fh = self._zf.open(self._ruta_hoja)
+        self._base = 0  # posición en el XML descomprimido del primer byte de _buffer
+        self._buffer = bytearray()
+        self._saltar(posicion)
+
+    def _saltar(self, posicion):
+        """
+        Vacía el buffer y descomprime sin guardar hasta posicion. No se usa
+        seek() porque descomprime en bloques de hasta 16 MB.
+        """
+        pendiente = posicion - self._base - len(self._buffer)
+        while pendiente > 0:
+            bloque = self._fh.read(min(pendiente, BYTES_LECTURA_VISTA))
+            if not bloque:
+                break
+            pendiente -= len(bloque)
+        self._base, self._buffer = posicion, bytearray()
+
+    def _leer(self):
+        """Agrega al buffer el siguiente bloque del XML. False si ya no queda nada."""
+        bloque = self._fh.read(BYTES_LECTURA_VISTA)
+        self._buffer += bloque
+        return bool(bloque)
+
+    def _ir_a(self, posicion):
+        """Deja en el buffer el XML desde posicion, descartando lo anterior."""
+        fin_buffer = self._base + len(self._buffer)
+        if posicion < self._base:
+            self._abrir(posicion)
+        elif posicion > fin_buffer:
+            self._saltar(posicion)
+        else:
+            del self._buffer[:posicion - self._base]
+            self._base = posicion
+
+    def _leer_inicio(self):
+        """Lee lo que hay antes de las filas (etiqueta raíz, dimensión) y la fila de encabezados."""
+        patron_datos = re.compile(rb'<((?:[\w.-]+:)?)sheetData\b[^>]*?(/?)>')
+        inicio_datos = patron_datos.search(self._buffer)
+        while inicio_datos is None:
+            if not self._leer():
+                raise ValueError("La hoja no tiene datos legibles")
+            inicio_datos = patron_datos.search(self._buffer)
+        prefijo = inicio_datos.group(1)
+        raiz = re.search(rb'<(' + re.escape(prefijo) + rb'worksheet)\b[^>]*>', self._buffer)
+        if raiz is None:
+            raise ValueError("La hoja no tiene datos legibles")
+        # Las filas de una página se interpretan dentro de una copia de la raíz, con sus espacios de nombres
+        self._envoltura = bytes(raiz.group(0)) + b'<' + prefijo + b'sheetData>'
+        self._cierre = b'</' + prefijo + b'sheetData></' + raiz.group(1) + b'>'
+        self._patron_fila = re.compile(
+            rb'<' + re.escape(prefijo) + rb'row[\s/>]|</' + re.escape(prefijo) + rb'sheetData>'
+        )
+        self._largo_patron = len(self._cierre)
+
+        # La dimensión declarada da una estimación del total de filas sin recorrer la hoja
+        dimension = re.search(rb'<(?:[\w.-]+:)?dimension\s+ref="[A-Z]*\d*:?[A-Z]*(\d+)"', self._buffer)
+        self.filas_estimadas = int(dimension.group(1)) if dimension else None
+        self.total_paginas = None
+        self._final = None
+        posicion = self._base + inicio_datos.end()
+        if inicio_datos.group(2):  # <sheetData/>: hoja sin filas
+            self._final = posicion
+
+        # La primera fila es el encabezado si es la fila 1
+        self.encabezados = []
+        primera = self._buscar(posicion)
+        if primera is not None:
+            segunda = self._buscar(primera + 1)
+            fin = segunda if segunda is not None else self._final
+            filas = self._interpretar(bytes(self._buffer[primera - self._base:fin - self._base]))
+            if filas and filas[0][0] in (1, None):
+                self.encabezados = filas[0][1]
+                primera = fin
+        self._posiciones = [primera if primera is not None else self._final]  # inicio de cada página
+
+    def _buscar(self, desde):
+        """
+        Posición del próximo <row> a partir de desde, o None si antes termina
+        <sheetData> (el final queda anotado en _final).
+        """
+        if self._final is not None and desde >= self._final:
+            return None
+        inicio = desde - self._base
+        while True:
+            encontrado = self._patron_fila.search(self._buffer, inicio)
+            if encontrado is not None:
+                if encontrado.group(0).startswith(b'</'):
+                    self._final = self._base + encontrado.start()
+                    return None
+                return self._base + encontrado.start()
+            # La etiqueta puede haber quedado cortada al final del bloque
+            inicio = max(inicio, len(self._buffer) - self._largo_patron)
+            if not self._leer():
+                self._final = self._base + len(self._buffer)
+                return None
+
+    def _fin_de_pagina(self, inicio):
+        """Posición de la fila que sigue a filas_por_pagina filas desde inicio, o None si la hoja termina antes."""
+        posicion = inicio
+        for _ in range(self.filas_por_pagina):
+            fila = self._buscar(posicion)
+            if fila is None:
+                return None
+            posicion = fila + 1
+        return self._buscar(posicion)
+
+    def _valor(self, elem):
+        tipo, valor, texto_inline = _contenido_celda_xml(elem)
+        if tipo == 's':
+            return self._textos.obtener(int(valor)) if valor is not None else None
+        if tipo == 'n' and valor is not None and elem.get('s') is not None:
+            es_duracion = self._fechas.get(int(elem.get('s')))
+            if es_duracion is not None:
+                fecha = _valor_fecha_xml(valor, es_duracion, self._fecha_1904)
+                if fecha is not None:
+                    return fecha
+        return _valor_celda_xml(tipo, valor, texto_inline)
+
+    def _interpretar(self, datos):
+        """Convierte el XML de unas filas en una lista de (número de fila, valores)."""
+        filas = []
+        for elem in ElementTree.fromstring(self._envoltura + datos + self._cierre).iter():
+            if _nombre_local(elem.tag) != 'row':
+                continue
+            valores = []
+            for celda in elem:
+                if _nombre_local(celda.tag) != 'c':
+                    continue
+                referencia = celda.get('r')
+                columna = coordinate_to_tuple(referencia)[1] if referencia else len(valores) + 1
+                valores.extend([None] * (columna - 1 - len(valores)))
+                valores.append(self._valor(celda))
+            numero = elem.get('r')
+            filas.append((int(numero) if numero else None, valores))
+        return filas
+
+    def pagina(self, numero):
+        """
+        Devuelve las filas de la página numero (desde 0) como lista de
+        (número de fila en la hoja, valores), sin el encabezado. Lista vacía si
+        la hoja no llega a esa página; en ese caso total_paginas queda con el
+        total real.
+        """
+        with self._bloqueo:
+            if numero in self._paginas:
+                self._paginas.move_to_end(numero)
+                return self._paginas[numero]
+
+            # Avanzar desde la última página conocida anotando dónde empieza cada una
+            actual = min(numero, len(self._posiciones) - 1)
+            inicio = self._posiciones[actual]
+            self._ir_a(inicio)
+            while actual < numero:
+                inicio = self._fin_de_pagina(inicio)
+                if inicio is None:
+                    self.total_paginas = len(self._posiciones)
+                    return []
+                self._posiciones.append(inicio)
+                self._ir_a(inicio)
+                actual += 1
+
+            fin = self._fin_de_pagina(inicio)
+            if fin is None:
+                hasta = self._final
+            else:
+                hasta = fin
+                if len(self._posiciones) == numero + 1:
+                    self._posiciones.append(fin)
+            filas = self._interpretar(bytes(self._buffer[inicio - self._base:hasta - self._base]))
+            if fin is None:
+                self.total_paginas = numero + 1 if filas else numero
+
+            self._paginas[numero] = filas
+            if len(self._paginas) > PAGINAS_EN_CACHE_VISTA:
+                self._paginas.popitem(last=False)
+            return filas
+
+    def cerrar(self):
+        if self._fh is not None:
+            self._fh.close()
+        if self._textos is not None:
+            self._textos.cerrar()
+        self._zf.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.cerrar()
+
+
+def abrir_vista_previa(file_path, sheet_name, filas_por_pagina=FILAS_POR_PAGINA_VISTA):
+    """
+    Abre una vista previa paginada de la hoja: pagina(n) devuelve las filas de
+    la página n, encabezados los valores de la fila 1 y filas_estimadas el
+    total de filas que declara la hoja (None si no lo declara).
+
+    Abrirla solo lee el manifiesto del libro, los estilos y el comienzo de la
+    hoja, así que cuesta lo mismo sin importar cuántas filas tenga. Las filas
+    se leen recién al pedir cada página (ver _VistaPreviaHoja). Hay que
+    cerrarla con cerrar() o usarla en un bloque with.
+
+    Raises:
+        ValueError: Si el archivo no es .xlsx o la hoja no existe
+    """
+    if not zipfile.is_zipfile(file_path):
+        raise ValueError("La vista previa solo está disponible para archivos .xlsx")
+    return _VistaPreviaHoja(file_path, sheet_name, filas_por_pagina)
+
+
+def cargar_libro(file_path):
+    """
+    Carga el libro completo con openpyxl (valores calculados y estilos) usando la
+    caché de libros, de modo que varias divisiones del mismo archivo lo parsean
+    una sola vez mientras no cambie en disco. El libro devuelto es compartido y
+    no debe modificarse.
+    """
+    costo = os.path.getsize(file_path) * FACTOR_MEMORIA_LIBRO
+    return _cache_libros.obtener(
+        file_path, ('libro',), lambda: openpyxl.load_workbook(file_path, data_only=True), costo=costo
+    )
+
+
+class ColumnaNoEncontradaError(ValueError):
+    """La columna elegida para dividir no existe en la fila de encabezado."""
+
+
+class SeleccionVaciaError(ValueError):
+    """Ninguna fila de la hoja tiene los valores seleccionados para exportar."""
+
+
+def _agrupar_filas(ws_src, col_idx):
+    """
+    Agrupa los números de fila de datos por valor único de la columna col_idx.
+
+    El dict conserva el orden de aparición de los valores. Solo se lee la
+    columna elegida y cada fila cuesta 4 bytes en el índice.
+    """
+    groups = {}
+    for row_idx, val in enumerate(_valores_columna(ws_src, col_idx), start=2):
+        filas = groups.get(val)
+        if filas is None:
+            filas = groups[val] = array('I')
+        filas.append(row_idx)
+    return groups
+
+
+def _normalizar_particiones(columna):
+    """
+    Convierte columna en la lista de particiones a generar, cada una como una
+    tupla de encabezados. columna puede ser un encabezado o una lista de
+    encabezados y de tuplas de encabezados (claves compuestas).
+    """
+    if isinstance(columna, str):
+        return [(columna,)]
+    particiones = []
+    for item in columna:
+        particion = (item,) if isinstance(item, str) else tuple(item)
+        if particion and particion not in particiones:
+            particiones.append(particion)
+    if not particiones:
+        raise ValueError("Se debe indicar al menos una columna para dividir")
+    return particiones
+
+
+class _GrupoOtros:
+    """Clave del grupo que reúne las filas de los valores no seleccionados."""
+
+    def __repr__(self):
+        return NOMBRE_GRUPO_OTROS
+
+    __str__ = __repr__
+
+
+GRUPO_OTROS = _GrupoOtros()
+
+# Clave de las filas que no se exportan
+_DESCARTAR = object()
+
+
+def _clasificador_valores(valores, agrupar_resto=False, como_texto=False):
+    """
+    Devuelve una función valor -> clave de grupo para la columna principal de
+    una división con selección de valores: el mismo valor si está entre
+    valores, GRUPO_OTROS para los demás si agrupar_resto o _DESCARTAR si la
+    fila no se exporta. Con como_texto los valores también se comparan por su
+    texto, para poder indicarlos desde la línea de comandos; sin él, 1 y "1"
+    son valores distintos, como en la hoja.
+    """
+    seleccion = set(valores)
+    textos = {str(v) for v in seleccion} if como_texto else set()
+    resto = GRUPO_OTROS if agrupar_resto else _DESCARTAR
+    claves = {}  # cada valor distinto se clasifica una sola vez
+
+    def clasificar(valor):
+        clave = claves.get(valor, claves)
+        if clave is claves:
+            clave = claves[valor] = valor if valor in seleccion or (textos and str(valor) in textos) else resto
+        return clave
+
+    return clasificar
+
+
+def _comprobar_filas_seleccionadas(seleccion):
+    """Lanza SeleccionVaciaError si la selección de valores dejó la división sin filas (seleccion vacía)."""
+    if not seleccion:
+        raise SeleccionVaciaError("Ninguna fila tiene los valores seleccionados")
+
+
+def _indices_particiones(encabezados, particiones):
+    """Devuelve, por partición, la tupla de índices (base 1) de sus columnas en encabezados."""
+    posiciones = {}
+    for i, nombre in enumerate(encabezados, start=1):
+        posiciones.setdefault(str(nombre), i)
+    indices = []
+    for particion in particiones:
+        faltante = next((c for c in particion if c not in posiciones), None)
+        if faltante is not None:
+            raise ColumnaNoEncontradaError(faltante)
+        indices.append(tuple(posiciones[c] for c in particion))
+    return indices
+
+
+def _indices_columnas_salida(encabezados, columnas_salida):
+    """Índices (base 1) de columnas_salida en encabezados, en ese orden; None si se exportan todas."""
+    if columnas_salida is None:
+        return None
+    return _indices_particiones(encabezados, [tuple(columnas_salida)])[0]
+
+
+def _agrupar_particiones(ws_src, indices, clasificar=None):
+    """
+    Agrupa en una sola lectura los números de fila de datos para varias
+    particiones. indices tiene, por partición, la tupla de índices de sus
+    columnas: con una columna la clave es su valor y con varias, la tupla de
+    valores. Devuelve un dict clave -> array('I') por partición, en orden.
+
+    Con clasificar (ver _clasificador_valores) el valor de la columna
+    principal, la primera de la primera partición, se reemplaza en las claves
+    por el que devuelve, y las filas descartadas no entran en ningún grupo.
+    """
+    if clasificar is None and len(indices) == 1 and len(indices[0]) == 1:
+        return [_agrupar_filas(ws_src, indices[0][0])]
+
+    # Se lee una vez cada columna usada por alguna partición
+    columnas = sorted({c for particion in indices for c in particion})
+    valores = [_valores_columna(ws_src, c) for c in columnas]
+    posiciones = [tuple(columnas.index(c) for c in particion) for particion in indices]
+    principal = columnas.index(indices[0][0])
+    indices_grupos = [{} for _ in indices]
+    for row_idx, fila in enumerate(zip(*valores), start=2):
+        if clasificar is not None:
+            clave = clasificar(fila[principal])
+            if clave is _DESCARTAR:
+                continue
+            fila = fila[:principal] + (clave,) + fila[principal + 1:]
+        for groups, pos in zip(indices_grupos, posiciones):
+            val = fila[pos[0]] if len(pos) == 1 else tuple(fila[i] for i in pos)
+            filas = groups.get(val)
+            if filas is None:
+                filas = groups[val] = array('I')
+            filas.append(row_idx)
+    return indices_grupos
+
+
+def _dividir_completo(archivo_excel, hoja, destinos, progreso, workers=1, incremental=True, anidar=False,
+                      columnas_salida=None, clasificar=None, max_filas=None, max_mb=None):
+    """
+    Divide la hoja cargando el libro completo en memoria (copia fiel de estilos).
+
+    destinos es la lista de particiones a generar como tuplas (columnas,
+    carpeta, ruta_resultado). El libro se carga y se recorre una sola vez para
+    todas ellas; luego cada partición se escribe en su carpeta. Con
+    incremental solo se reescriben los grupos que cambiaron desde la corrida
+    anterior en la misma carpeta (ver exportar_grupos_xlsx). Con
+    columnas_salida solo se copian esas columnas, en ese orden, y con
+    clasificar solo los grupos de los valores seleccionados (ver
+    _agrupar_particiones). Los grupos con más filas que max_filas, que
+    max_mb o que el límite de Excel se escriben en partes (ver _partes_grupos).
+
+    Returns:
+        Lista de (carpeta_archivos, cantidad_de_grupos, cantidad_de_partes) por partición.
+    """
+    medidor = progreso.medidor
+    progreso.etapa("cargando")
+    # Cargar la hoja seleccionada con openpyxl para preservar estilos (reutiliza la caché)
+    with medidor.etapa("carga"):
+        wb_src = cargar_libro(archivo_excel)
+        ws_src = wb_src[hoja]
+
+    # Obtener la fila de encabezado e identificar los índices de las columnas elegidas
+    header_row = _celdas_fila(ws_src, 1, range(1, ws_src.max_column + 1))
+    encabezados = [c.value for c in header_row]
+    indices = _indices_particiones(encabezados, [columnas for columnas, _, _ in destinos])
+    proyeccion = _indices_columnas_salida(encabezados, columnas_salida)
+
+    total_filas = max(ws_src.max_row - 1, 0)
+    fraccion_columnas = len(proyeccion) / len(header_row) if proyeccion else 1.0
+    filas_por_parte = _filas_por_parte(
+        max_filas, max_mb, _estimar_bytes_por_fila(archivo_excel, total_filas, fraccion_columnas)
+    )
+    medidor.contar("carga", filas=total_filas + 1, celdas=len(ws_src._cells))
+    progreso.etapa("agrupando", trabajo_total=total_filas, filas_total=total_filas)
+    with medidor.etapa("agrupacion"):
+        indices_grupos = _agrupar_particiones(ws_src, indices, clasificar)
+    if clasificar is not None:
+        _comprobar_filas_seleccionadas(indices_grupos[0])
+    medidor.contar("agrupacion", filas=total_filas, grupos=sum(len(groups) for groups in indices_grupos))
+    progreso.avanzar(total_filas, filas_leidas=total_filas)
+    progreso.comprobar_cancelacion()
+
+    divisiones = []
+    for numero, ((columnas, carpeta, ruta_resultado), groups) in enumerate(zip(destinos, indices_grupos), start=1):
+        progreso.estado.update(particion=numero, particiones_total=len(destinos))
+        progreso.crear_carpeta(carpeta)
+
+        huella = None
+        if incremental:
+            with medidor.etapa("hashes"):
+                huella = _huella_formato(archivo_excel, hoja, columnas, proyeccion)
+
+        # Escribir el archivo combinado y los archivos individuales en una sola pasada
+        partes = _partes_grupos(groups, filas_por_parte)
+        carpeta_archivos = exportar_grupos_xlsx(
+            ws_src, header_row, partes, ruta_resultado, carpeta,
+            origen=(archivo_excel, hoja), workers=workers, progreso=progreso, huella=huella, anidar=anidar,
+            proyeccion=proyeccion
+        )
+        divisiones.append((carpeta_archivos, len(groups), len(partes)))
+    return divisiones
+
+
+def _abrir_hoja_streaming(ws_dst, header_row, anchos):
+    """Prepara una hoja de solo escritura: anchos de columna y encabezado con formato."""
+    # En modo solo escritura los anchos deben fijarse antes de la primera fila
+    for col_letter, width in anchos.items():
+        ws_dst.column_dimensions[col_letter].width = width
+    ws_dst.append(_fila_solo_escritura(header_row, ws_dst))
+
+
+def _descartar_hojas_solo_escritura(hojas):
+    """Cierra las hojas de solo escritura que no se van a guardar y borra sus archivos temporales."""
+    for ws in hojas:
+        if ws._writer is None:
+            continue
+        try:
+            if not ws.closed:
+                ws.close()
+            ws._writer.cleanup()
+        except Exception:
+            pass
+
+
+def _grupos_abiertos_streaming():
+    """
+    Cantidad máxima de grupos que el modo streaming escribe a la vez. Cada
+    grupo abierto ocupa dos archivos temporales (su hoja en el combinado y la
+    de su archivo individual), así que se deriva del límite de archivos
+    abiertos del proceso, con margen para el resto. DSD_GRUPOS_ABIERTOS lo fija.
+    """
+    if GRUPOS_ABIERTOS_STREAMING:
+        return GRUPOS_ABIERTOS_STREAMING
+    limite = 512  # límite de archivos abiertos de la biblioteca de C en Windows
+    if resource is not None:
+        limite = resource.getrlimit(resource.RLIMIT_NOFILE)[0]
+        if limite == resource.RLIM_INFINITY:
+            limite = 4096
+    return max(8, (min(limite, 4096) - 64) // 2)
+
+
+def _abrir_salida_streaming(particion, clave, header_salida, anchos_salida, anidar, progreso):
+    """Crea la hoja del combinado y el archivo individual de la parte clave de un grupo."""
+    sheet_name = _nombre_hoja_unico(clave, particion["used_sheet_names"])
+    salida = {
+        "sheet_name": sheet_name,
+        "filas": 0,
+        "error": False,
+        "parte": clave.numero if isinstance(clave, _Parte) else 1,
+        "ruta": _ruta_individual(clave, sheet_name, particion["carpeta_archivos"], particion["file_name"],
+                                 particion["usados_rutas"], anidar),
+    }
+    particion["salidas"][clave] = salida
+    try:
+        salida["ws_out"] = particion["wb_out"].create_sheet(title=sheet_name)
+        salida["wb_individual"] = openpyxl.Workbook(write_only=True)
+        salida["ws_individual"] = salida["wb_individual"].create_sheet(title=sheet_name)
+        _abrir_hoja_streaming(salida["ws_out"], header_salida, anchos_salida)
+        _abrir_hoja_streaming(salida["ws_individual"], header_salida, anchos_salida)
+    except Exception as e:
+        progreso.error_grupo(sheet_name, f"Error al procesar el valor '{clave}': {str(e)}")
+        salida["error"] = True
+    return salida
+
+
+def _cerrar_salida_streaming(salida, tablas, encabezados_salida, proyeccion, progreso):
+    """
+    Termina una parte en modo streaming: agrega las tablas, guarda su archivo
+    individual y cierra su hoja del combinado, que queda en su archivo
+    temporal hasta guardar el combinado. Libera los dos escritores.
+    """
+    medidor = progreso.medidor
+    sheet_name = salida["sheet_name"]
+    if not salida["error"]:
+        new_row_count = 1 + salida["filas"]  # encabezado + filas del grupo
+        try:
+            with medidor.etapa("tablas"):
+                _add_tables(tablas, salida["ws_out"], new_row_count, display_name_prefix=sheet_name,
+                            encabezados=encabezados_salida, proyeccion=proyeccion)
+                _add_tables(tablas, salida["ws_individual"], new_row_count, display_name_prefix=sheet_name,
+                            encabezados=encabezados_salida, proyeccion=proyeccion)
+            medidor.contar("tablas", tablas=2 * len(tablas))
+            progreso.crear_carpeta(os.path.dirname(salida["ruta"]))
+            with medidor.etapa("guardado"):
+                salida["wb_individual"].save(salida["ruta"])
+            medidor.contar("guardado", archivos=1)
+            progreso.archivo_escrito(salida["ruta"], grupos_escritos=1)
+        except Exception as e:
+            progreso.error_grupo(sheet_name, f"Error al exportar la hoja {sheet_name}: {str(e)}")
+            salida["error"] = True
+    if "ws_individual" in salida and salida["error"]:
+        _descartar_hojas_solo_escritura([salida["ws_individual"]])
+    if "ws_out" in salida and not salida["ws_out"].closed:
+        try:
+            salida["ws_out"].close()
+        except Exception:
+            pass
+
+
+def _dividir_streaming(archivo_excel, hoja, destinos, progreso, anidar=False, columnas_salida=None,
+                       clasificar=None, max_filas=None, max_mb=None):
+    """
+    Divide la hoja en lecturas secuenciales con memoria acotada.
+
+    El origen se abre en modo solo lectura y cada fila se escribe de inmediato
+    en hojas de solo escritura (la del combinado y la del archivo individual de
+    su grupo, en cada partición de destinos), que openpyxl vuelca a archivos
+    temporales. Solo se mantienen abiertos los escritores de cada grupo, por lo
+    que la memoria no depende del tamaño de la hoja. Se conservan el formato de
+    las celdas, los anchos de columna y las tablas. La cancelación se comprueba
+    cada FILAS_ENTRE_AVISOS filas. Con columnas_salida solo se escriben esas
+    columnas, en ese orden, y no se construyen las celdas a la derecha de la
+    última columna usada. Con clasificar solo se escriben las filas de los
+    valores seleccionados (ver _agrupar_particiones).
+
+    Cada grupo abierto ocupa dos archivos temporales, así que a lo sumo se
+    escriben _grupos_abiertos_streaming() grupos a la vez: los que aparecen
+    cuando ya no quedan escritores libres se saltan y se escriben en una
+    nueva lectura de la hoja, una vez cerrados los de la lectura anterior.
+    Con pocos grupos la hoja se lee una sola vez.
+
+    Como el tamaño de cada grupo no se conoce de antemano, cuando la hoja de un
+    grupo llega al límite de filas de la parte (max_filas, max_mb o el límite
+    de Excel) la parte se guarda y se cierra en ese momento, y las filas
+    siguientes van a una parte nueva "<valor> (2)", con su propia hoja en el
+    combinado y su propio archivo individual. Así cada grupo tiene abierta
+    solo su última parte.
+
+    Returns:
+        Lista de (carpeta_archivos, cantidad_de_grupos, cantidad_de_partes) por partición.
+    """
+    medidor = progreso.medidor
+    with medidor.etapa("carga"):
+        anchos, tablas = leer_formato_hoja(archivo_excel, hoja)
+        wb_src = openpyxl.load_workbook(archivo_excel, read_only=True, data_only=True)
+
+    particiones = []  # estado de escritura por partición
+    try:
+        try:
+            ws_src = wb_src[hoja]
+            header_row = next(ws_src.iter_rows(max_row=1), ())
+            encabezados = [c.value for c in header_row]
+            indices = _indices_particiones(encabezados, [columnas for columnas, _, _ in destinos])
+            proyeccion = _indices_columnas_salida(encabezados, columnas_salida)
+            max_col = max(itertools.chain(proyeccion, *indices)) if proyeccion else None
+            principal = indices[0][0] - 1
+            header_salida = _proyectar_fila(header_row, proyeccion)
+            encabezados_salida = [c.value if c is not None else None for c in header_salida]
+            anchos_salida = _proyectar_anchos(anchos, proyeccion)
+            # La dimensión declarada en la hoja da el total de filas sin recorrerla
+            total_filas = max(ws_src.max_row - 1, 0) if ws_src.max_row else None
+            fraccion_columnas = len(proyeccion) / len(header_row) if proyeccion and header_row else 1.0
+            filas_por_parte = _filas_por_parte(
+                max_filas, max_mb, _estimar_bytes_por_fila(archivo_excel, total_filas, fraccion_columnas)
+            )
+
+            for (columnas, carpeta, ruta_resultado), indices_columnas in zip(destinos, indices):
+                file_name = os.path.splitext(os.path.basename(ruta_resultado))[0]
+                # Las carpetas se crean al guardar: si la selección queda vacía no se escribe nada
+                full_folder_path = os.path.join(carpeta, f"Separados-{file_name}")
+                particiones.append({
+                    "posiciones": tuple(i - 1 for i in indices_columnas),
+                    "ruta_resultado": ruta_resultado,
+                    "file_name": file_name,
+                    "carpeta_archivos": full_folder_path,
+                    "wb_out": openpyxl.Workbook(write_only=True),
+                    "used_sheet_names": {},
+                    "usados_rutas": defaultdict(dict),
+                    "salidas": {},  # clave (valor o _Parte) -> estado de escritura de la parte
+                    "actuales": {},  # valor -> clave de la parte abierta que recibe sus filas
+                    "terminados": set(),  # valores ya escritos por completo en una lectura anterior
+                })
+
+            limite = _grupos_abiertos_streaming()
+            pendientes = True
+            lectura = 0
+            while pendientes:
+                pendientes = False
+                lectura += 1
+                abiertos = 0
+                progreso.etapa("escribiendo", trabajo_total=total_filas, filas_total=total_filas, filas_leidas=0)
+                # Lectura y escritura van intercaladas fila a fila, así que se miden juntas
+                row_idx = 0
+                with medidor.etapa("lectura_y_copia"):
+                    for row_idx, row in enumerate(ws_src.iter_rows(min_row=2, max_col=max_col), start=1):
+                        if row_idx % FILAS_ENTRE_AVISOS == 0:
+                            progreso.comprobar_cancelacion()
+                            progreso.avanzar(FILAS_ENTRE_AVISOS, filas_leidas=FILAS_ENTRE_AVISOS)
+                        if clasificar is not None:
+                            clave_principal = clasificar(row[principal].value if len(row) > principal else None)
+                            if clave_principal is _DESCARTAR:
+                                continue
+                        fila_salida = None
+                        for particion in particiones:
+                            posiciones = particion["posiciones"]
+                            valores = tuple(row[i].value if len(row) > i else None for i in posiciones)
+                            if clasificar is not None:
+                                valores = tuple(clave_principal if i == principal else v for i, v in zip(posiciones, valores))
+                            val = valores[0] if len(valores) == 1 else valores
+                            if val in particion["terminados"]:
+                                continue
+                            if val not in particion["actuales"]:
+                                if abiertos == limite:
+                                    # Sin escritores libres: el grupo se escribe en la próxima lectura
+                                    pendientes = True
+                                    continue
+                                abiertos += 1
+                                clave = particion["actuales"][val] = val
+                                salida = _abrir_salida_streaming(
+                                    particion, clave, header_salida, anchos_salida, anidar, progreso
+                                )
+                            else:
+                                clave = particion["actuales"][val]
+                                salida = particion["salidas"][clave]
+                                if salida["filas"] == filas_por_parte:
+                                    # La parte está completa: se guarda ya, para liberar sus escritores,
+                                    # y las filas siguientes van a una nueva
+                                    _cerrar_salida_streaming(salida, tablas, encabezados_salida, proyeccion, progreso)
+                                    clave = particion["actuales"][val] = _Parte(val, salida["parte"] + 1)
+                                    salida = _abrir_salida_streaming(
+                                        particion, clave, header_salida, anchos_salida, anidar, progreso
+                                    )
+                            if salida["error"]:
+                                continue
+                            if fila_salida is None:
+                                fila_salida = _proyectar_fila(row, proyeccion)
+                            try:
+                                salida["ws_out"].append(_fila_solo_escritura(fila_salida, salida["ws_out"]))
+                                salida["ws_individual"].append(_fila_solo_escritura(fila_salida, salida["ws_individual"]))
+                                salida["filas"] += 1
+                            except Exception as e:
+                                progreso.error_grupo(salida["sheet_name"], f"Error al procesar el valor '{val}': {str(e)}")
+                                salida["error"] = True
+                medidor.contar("lectura_y_copia", filas=row_idx, celdas=row_idx * len(header_salida))
+
+                # Guardar las partes que siguen abiertas para liberar sus escritores
+                progreso.etapa("guardando", trabajo_total=abiertos, grupos_total=abiertos)
+                for particion in particiones:
+                    for clave in particion["actuales"].values():
+                        progreso.comprobar_cancelacion()
+                        progreso.avanzar(1)
+                        _cerrar_salida_streaming(
+                            particion["salidas"][clave], tablas, encabezados_salida, proyeccion, progreso
+                        )
+                    particion["terminados"].update(particion["actuales"])
+                    particion["actuales"].clear()
+            grupos = sum(len(particion["salidas"]) for particion in particiones)
+            medidor.contar("lectura_y_copia", grupos=grupos, lecturas=lectura)
+        finally:
+            wb_src.close()
+        if clasificar is not None:
+            _comprobar_filas_seleccionadas(particiones[0]["salidas"])
+
+        for particion in particiones:
+            progreso.comprobar_cancelacion()
+            progreso.crear_carpeta(particion["carpeta_archivos"])
+            with medidor.etapa("guardado"):
+                particion["wb_out"].save(particion["ruta_resultado"])
+            medidor.contar("guardado", archivos=1)
+            progreso.archivo_escrito(particion["ruta_resultado"])
+    except ProcesoCancelado:
+        _descartar_hojas_solo_escritura(
+            [salida[clave] for particion in particiones for salida in particion["salidas"].values()
+             for clave in ("ws_out", "ws_individual") if clave in salida]
+        )
+        raise
+
+    for particion in particiones:
+        print(f"Se han exportado las ventanas por xlsx separados en la carpeta: {particion['carpeta_archivos']}")
+    return [
+        (particion["carpeta_archivos"], len(particion["salidas"]) - sum(isinstance(k, _Parte) for k in particion["salidas"]),
+         len(particion["salidas"]))
+        for particion in particiones
+    ]
+
+
+def _motor_lectura_valores():
+    """Motor de pandas para leer la hoja: python-calamine si está instalado (mucho más rápido), si no openpyxl."""
+    return "calamine" if importlib.util.find_spec("python_calamine") is not None else None
+
+
+def _comprobar_parquet():
+    """Lanza ImportError con un mensaje claro si no hay biblioteca para escribir Parquet."""
+    if importlib.util.find_spec("pyarrow") is None and importlib.util.find_spec("fastparquet") is None:
+        raise ImportError("Para exportar a Parquet se necesita pyarrow: pip install pyarrow")
+
+
+def _clave_pandas(valor):
+    """Convierte una clave de groupby al valor que daría openpyxl (NaN -> None, 5.0 -> 5, numpy -> Python)."""
+    if isinstance(valor, tuple):
+        return tuple(_clave_pandas(v) for v in valor)
+    if pd.isna(valor):
+        return None
+    if isinstance(valor, float) and valor.is_integer():
+        return int(valor)
+    return valor.item() if type(valor).__module__ == "numpy" else valor
+
+
+def _filas_valores(df):
+    """Filas de df como tuplas de objetos de Python, con las celdas vacías como None."""
+    return list(df.astype(object).where(df.notna(), None).itertuples(index=False, name=None))
+
+
+# Caracteres de control que Excel no admite en un texto (los mismos que rechaza openpyxl)
+_CARACTERES_ILEGALES = re.compile(r'[\000-\010]|[\013-\014]|[\016-\037]')
+
+# Índice en cellXfs (ver _ESTILOS_XLSX_VALORES) del formato de cada tipo de fecha,
+# el mismo que les asigna openpyxl
+_ESTILO_DATETIME, _ESTILO_DATE, _ESTILO_TIME, _ESTILO_TIMEDELTA = 1, 2, 3, 4
+
+_ESTILOS_XLSX_VALORES = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<styleSheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main">'
+    '<numFmts count="3"><numFmt numFmtId="164" formatCode="yyyy-mm-dd h:mm:ss"/>'
+    '<numFmt numFmtId="165" formatCode="yyyy-mm-dd"/><numFmt numFmtId="166" formatCode="[hh]:mm:ss"/></numFmts>'
+    '<fonts count="1"><font><sz val="11"/><name val="Calibri"/><family val="2"/></font></fonts>'
+    '<fills count="2"><fill><patternFill patternType="none"/></fill><fill><patternFill patternType="gray125"/></fill></fills>'
+    '<borders count="1"><border><left/><right/><top/><bottom/><diagonal/></border></borders>'
+    '<cellStyleXfs count="1"><xf numFmtId="0" fontId="0" fillId="0" borderId="0"/></cellStyleXfs>'
+    '<cellXfs count="5"><xf numFmtId="0" fontId="0" fillId="0" borderId="0" xfId="0"/>'
+    '<xf numFmtId="164" fontId="0" fillId="0" borderId="0" xfId="0" applyNumberFormat="1"/>'
+    '<xf numFmtId="165" fontId="0" fillId="0" borderId="0" xfId="0" applyNumberFormat="1"/>'
+    '<xf numFmtId="21" fontId="0" fillId="0" borderId="0" xfId="0" applyNumberFormat="1"/>'
+    '<xf numFmtId="166" fontId="0" fillId="0" borderId="0" xfId="0" applyNumberFormat="1"/></cellXfs>'
+    '<cellStyles count="1"><cellStyle name="Normal" xfId="0" builtinId="0"/></cellStyles>'
+    '</styleSheet>'
+)
+
+
+def _escapar_xml(texto):
+    return texto.replace("&", "&amp;").replace("<", "&lt;").replace(">", "&gt;").replace('"', "&quot;")
+
+
+def _celda_xml(ref, valor, to_excel):
+    """
+    XML de una celda con valor (no None), con los mismos tipos que escribe
+    openpyxl: textos en línea, números, booleanos y fechas como número de
+    serie con su formato. to_excel es openpyxl.utils.datetime.to_excel.
+    """
+    if isinstance(valor, str):
+        texto = valor[:32767]
+        if _CARACTERES_ILEGALES.search(texto):
+            raise ValueError(f"{texto} cannot be used in worksheets.")
+        espacio = ' xml:space="preserve"' if texto.strip() != texto else ''
+        return f'<c r="{ref}" t="inlineStr"><is><t{espacio}>{_escapar_xml(texto)}</t></is></c>'
+    if isinstance(valor, bool):
+        return f'<c r="{ref}" t="b"><v>{int(valor)}</v></c>'
+    if isinstance(valor, numbers.Number):
+        if math.isnan(valor) or math.isinf(valor):
+            return ''
+        return f'<c r="{ref}" t="n"><v>{"%.16g" % valor}</v></c>'
+    if isinstance(valor, datetime.datetime):
+        estilo = _ESTILO_DATETIME
+    elif isinstance(valor, datetime.date):
+        estilo = _ESTILO_DATE
+    elif isinstance(valor, datetime.time):
+        estilo = _ESTILO_TIME
+    elif isinstance(valor, datetime.timedelta):
+        estilo = _ESTILO_TIMEDELTA
+    else:
+        raise ValueError(f"Cannot convert {valor!r} to Excel")
+    if getattr(valor, "tzinfo", None) is not None:
+        raise TypeError("Excel does not support timezones in datetimes.")
+    return f'<c r="{ref}" s="{estilo}" t="n"><v>{"%.16g" % to_excel(valor)}</v></c>'
+
+
+def _hoja_xml_valores(encabezados, filas):
+    """
+    XML (bytes) de una hoja con la fila encabezados y las filas de valores
+    (ver _filas_valores). Los textos van en línea y no en la tabla de textos
+    compartidos del libro, así que el mismo XML sirve para cualquier libro:
+    se arma una vez por grupo y se guarda en el combinado y en el individual.
+    """
+    from openpyxl.utils.datetime import to_excel
+
+    ancho = max(len(encabezados), 1)
+    letras = [get_column_letter(c) for c in range(1, ancho + 1)]
+    partes = [
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+        '<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main">'
+        f'<dimension ref="A1:{letras[-1]}{1 + len(filas)}"/><sheetData>'
+    ]
+    for numero, fila in enumerate(itertools.chain((encabezados,), filas), start=1):
+        partes.append(f'<row r="{numero}">')
+        partes.extend(
+            _celda_xml(f"{letra}{numero}", valor, to_excel)
+            for letra, valor in zip(letras, fila) if valor is not None
+        )
+        partes.append('</row>')
+    partes.append('</sheetData></worksheet>')
+    return "".join(partes).encode("utf-8")
+
+
+class _LibroXlsxValores:
+    """
+    Escribe un .xlsx de solo valores hoja por hoja, directo al zip: cada hoja
+    se agrega ya serializada (ver _hoja_xml_valores) y al cerrar se escriben
+    el libro, las relaciones y los estilos. No queda nada en memoria entre hojas.
+    """
+
+    def __init__(self, ruta):
+        self.ruta = ruta
+        self._zip = zipfile.ZipFile(ruta, "w", zipfile.ZIP_DEFLATED)
+        self._hojas = []
+
+    def agregar_hoja(self, nombre, xml):
+        self._hojas.append(nombre)
+        self._zip.writestr(f"xl/worksheets/sheet{len(self._hojas)}.xml", xml)
+
+    def cerrar(self):
+        hojas = range(1, len(self._hojas) + 1)
+        tipo = "application/vnd.openxmlformats-officedocument.spreadsheetml"
+        relacion = "http://schemas.openxmlformats.org/officeDocument/2006/relationships"
+        self._zip.writestr("[Content_Types].xml", (
+            '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+            '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+            '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+            '<Default Extension="xml" ContentType="application/xml"/>'
+            f'<Override PartName="/xl/workbook.xml" ContentType="{tipo}.sheet.main+xml"/>'
+            f'<Override PartName="/xl/styles.xml" ContentType="{tipo}.styles+xml"/>'
+            + "".join(f'<Override PartName="/xl/worksheets/sheet{n}.xml" ContentType="{tipo}.worksheet+xml"/>'
+                      for n in hojas)
+            + '</Types>'
+        ))
+        self._zip.writestr("_rels/.rels", (
+            '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+            '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+            f'<Relationship Id="rId1" Type="{relacion}/officeDocument" Target="xl/workbook.xml"/>'
+            '</Relationships>'
+        ))
+        self._zip.writestr("xl/workbook.xml", (
+            '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+            '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+            f'xmlns:r="{relacion}"><sheets>'
+            + "".join(f'<sheet name="{_escapar_xml(nombre)}" sheetId="{n}" r:id="rId{n}"/>'
+                      for n, nombre in zip(hojas, self._hojas))
+            + '</sheets></workbook>'
+        ))
+        self._zip.writestr("xl/_rels/workbook.xml.rels", (
+            '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+            '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+            + "".join(f'<Relationship Id="rId{n}" Type="{relacion}/worksheet" Target="worksheets/sheet{n}.xml"/>'
+                      for n in hojas)
+            + f'<Relationship Id="rId{len(self._hojas) + 1}" Type="{relacion}/styles" Target="styles.xml"/>'
+            '</Relationships>'
+        ))
+        self._zip.writestr("xl/styles.xml", _ESTILOS_XLSX_VALORES)
+        self._zip.close()
+        self._zip = None
+
+    def descartar(self):
+        """Si el libro no se terminó, cierra el zip y borra el archivo."""
+        if self._zip is None:
+            return
+        self._zip.close()
+        self._zip = None
+        with contextlib.suppress(OSError):
+            os.remove(self.ruta)
+
+
+def _enteros_como_openpyxl(df, por_valor=True):
+    """
+    Devuelve df con los números enteros como int, igual que los lee openpyxl.
+
+    pandas convierte a float64 las columnas de enteros que tienen celdas
+    vacías o algún decimal, y un 3 del origen se escribiría como 3.0. Las
+    columnas de float con solo valores enteros pasan a Int64 (entero con
+    vacíos) y, con por_valor, en las que mezclan enteros y decimales cada
+    entero se convierte por separado (como en _clave_pandas).
+    """
+    convertidas = {}
+    for posicion, (_, serie) in enumerate(df.items()):
+        if serie.dtype.kind != "f":
+            continue
+        valores = serie.dropna()
+        enteros = valores % 1 == 0
+        if not enteros.any():
+            continue
+        if enteros.all() and valores.abs().max() < 2 ** 53:
+            convertidas[posicion] = serie.astype("Int64")
+        elif por_valor:
+            # map volvería a inferir float64: se arma la columna como object
+            convertidas[posicion] = pd.Series(
+                [int(v) if v == v and v.is_integer() else v for v in serie.tolist()],
+                index=serie.index, dtype=object,
+            )
+    if not convertidas:
+        return df
+    df = df.copy()
+    for posicion, serie in convertidas.items():
+        df.isetitem(posicion, serie)
+    return df
+
+
+def _dividir_valores(archivo_excel, hoja, destinos, progreso, formato="xlsx", anidar=False, columnas_salida=None,
+                     clasificar=None, max_filas=None, max_mb=None):
+    """
+    Divide solo los valores de la hoja, sin formato, con operaciones
+    vectorizadas de pandas.
+
+    La hoja se carga una vez en un DataFrame y cada partición se agrupa con
+    groupby(sort=False, dropna=False): los grupos salen en orden de aparición y
+    las celdas vacías forman su propio grupo, igual que en los otros motores.
+    Cada grupo se escribe como .xlsx, .csv o .parquet; solo con .xlsx se
+    escribe además el combinado con una hoja por grupo. Con columnas_salida
+    solo se cargan esas columnas y las de las particiones (usecols) y se
+    exportan las primeras, en ese orden. Con clasificar solo se exportan las
+    filas de los valores seleccionados (ver _agrupar_particiones). Los grupos
+    más grandes que max_filas o max_mb se escriben en partes (ver
+    _partes_grupos); el límite de filas de Excel solo aplica a .xlsx.
+
+    Returns:
+        Lista de (carpeta_archivos, cantidad_de_grupos, cantidad_de_partes) por partición.
     """
-    for i, src_table in enumerate(ws_src.tables.values()):
-        min_col, _min_row, max_col, _max_row = range_boundaries(src_table.ref)
-        new_ref = f"{get_column_letter(min_col)}1:{get_column_letter(max_col)}{new_row_count}"
+    if formato not in FORMATOS_VALORES:
+        raise ValueError(f"Formato desconocido: {formato}")
+    if formato == "parquet":
+        _comprobar_parquet()
 
-        safe_prefix = re.sub(r'[^A-Za-z0-9_]', '_', display_name_prefix)[:28]
-        display_name = f"{safe_prefix}_{i}" if i > 0 else safe_prefix
+    medidor = progreso.medidor
+    progreso.etapa("cargando")
+    usecols = None
+    if columnas_salida is not None:
+        necesarias = {c for columnas, _, _ in destinos for c in columnas} | set(columnas_salida)
+        usecols = lambda nombre: str(nombre) in necesarias  # noqa: E731
+    with medidor.etapa("carga"):
+        df = pd.read_excel(archivo_excel, sheet_name=hoja, engine=_motor_lectura_valores(), usecols=usecols)
+    medidor.contar("carga", filas=len(df) + 1, celdas=df.size)
+    total_filas = len(df)
 
-        new_table = Table(displayName=display_name, ref=new_ref)
-        if src_table.tableStyleInfo:
-            new_table.tableStyleInfo = TableStyleInfo(
-                name=src_table.tableStyleInfo.name,
-                showFirstColumn=src_table.tableStyleInfo.showFirstColumn,
-                showLastColumn=src_table.tableStyleInfo.showLastColumn,
-                showRowStripes=src_table.tableStyleInfo.showRowStripes,
-                showColumnStripes=src_table.tableStyleInfo.showColumnStripes,
-            )
-        ws_dst.add_table(new_table)
+    indices = _indices_particiones(list(df.columns), [columnas for columnas, _, _ in destinos])
+    proyeccion = _indices_columnas_salida(list(df.columns), columnas_salida)
+    df_salida = df if proyeccion is None else df.iloc[:, [i - 1 for i in proyeccion]]
+    claves_principal = None
+    if clasificar is not None:
+        claves_principal = df.iloc[:, indices[0][0] - 1].map(lambda v: clasificar(_clave_pandas(v)))
+        conservar = claves_principal.map(lambda clave: clave is not _DESCARTAR).to_numpy(dtype=bool)
+        df, df_salida, claves_principal = df[conservar], df_salida[conservar], claves_principal[conservar]
+        _comprobar_filas_seleccionadas(len(df))
+    if formato != "xlsx":
+        # En xlsx 3.0 y 3 son el mismo número; en csv y parquet se notaría la diferencia.
+        # parquet necesita un tipo por columna, así que ahí no se mezclan int y float
+        with medidor.etapa("carga"):
+            df_salida = _enteros_como_openpyxl(df_salida, por_valor=formato == "csv")
 
+    bytes_por_fila = None
+    if max_mb and len(df_salida):
+        if formato == "csv":
+            # El CSV no va comprimido: se mide una muestra de la salida en lugar de usar el tamaño del origen
+            muestra = df_salida.head(1000)
+            bytes_por_fila = len(muestra.to_csv(index=False).encode("utf-8")) / len(muestra)
+        else:
+            # Con usecols no se sabe cuántas columnas tiene el origen: se estima con la fila completa
+            bytes_por_fila = _estimar_bytes_por_fila(archivo_excel, total_filas)
+    filas_por_parte = _filas_por_parte(max_filas, max_mb, bytes_por_fila, limite_excel=formato == "xlsx")
+    # pandas nombra "Unnamed: n" a las columnas sin encabezado; en la salida quedan vacías
+    encabezados = [None if str(c).startswith("Unnamed:") else c for c in df_salida.columns]
+    progreso.comprobar_cancelacion()
 
-def _copy_sheet(ws_src, ws_dst):
-    """Copia todas las celdas, anchos de columna, altos de fila y celdas combinadas de ws_src a ws_dst."""
-    for row in ws_src.iter_rows():
-        for cell in row:
-            _copy_cell(cell, ws_dst, dst_row=cell.row)
+    divisiones = []
+    for numero, ((columnas, carpeta, ruta_resultado), indices_columnas) in enumerate(zip(destinos, indices), start=1):
+        progreso.estado.update(particion=numero, particiones_total=len(destinos))
+        progreso.etapa("agrupando", filas_total=len(df))
+        # La columna principal se agrupa por su clave de selección (ver _clasificador_valores)
+        claves = [
+            claves_principal if claves_principal is not None and i == indices[0][0] else df.iloc[:, i - 1]
+            for i in indices_columnas
+        ]
+        with medidor.etapa("agrupacion"):
+            posiciones = df.groupby(claves[0] if len(claves) == 1 else claves, sort=False, dropna=False).indices
+            # Las posiciones de cada grupo vienen ordenadas: la primera da el orden de aparición
+            orden = sorted(posiciones, key=lambda clave: posiciones[clave][0])
+        medidor.contar("agrupacion", filas=len(df), grupos=len(orden))
 
-    for col_letter, col_dim in ws_src.column_dimensions.items():
-        ws_dst.column_dimensions[col_letter].width = col_dim.width
+        partes = _partes_grupos({clave: posiciones[clave] for clave in orden}, filas_por_parte)
+        claves_partes = list(partes)
+        valores = [
+            _Parte(_clave_pandas(clave.valor), clave.numero) if isinstance(clave, _Parte) else _clave_pandas(clave)
+            for clave in claves_partes
+        ]
+        sheet_names = _nombres_hojas_unicos(valores)
+        file_name = os.path.splitext(os.path.basename(ruta_resultado))[0]
+        full_folder_path = os.path.join(carpeta, f"Separados-{file_name}")
+        rutas = _rutas_individuales(valores, sheet_names, full_folder_path, file_name, anidar, extension=f".{formato}")
+        for ruta in {os.path.dirname(ruta) for ruta in rutas.values()}:
+            progreso.crear_carpeta(ruta)
 
-    for row_idx, row_dim in ws_src.row_dimensions.items():
-        ws_dst.row_dimensions[row_idx].height = row_dim.height
+        progreso.etapa("escribiendo", trabajo_total=len(claves_partes), grupos_total=len(claves_partes))
+        # El combinado se escribe a medida que se serializa cada grupo (ver _LibroXlsxValores)
+        libro_combinado = _LibroXlsxValores(ruta_resultado) if formato == "xlsx" else None
+        try:
+            for clave, valor, sheet_name in zip(claves_partes, valores, sheet_names):
+                progreso.comprobar_cancelacion()
+                grupo = df_salida.take(partes[clave])
+                export_file_path = rutas[valor]
+                try:
+                    with medidor.etapa("guardado"):
+                        if formato == "csv":
+                            # utf-8-sig para que Excel reconozca los acentos al abrir el CSV
+                            grupo.to_csv(export_file_path, index=False, header=encabezados, encoding="utf-8-sig")
+                        elif formato == "parquet":
+                            grupo.to_parquet(export_file_path, index=False)
+                        else:
+                            # Cada grupo se serializa una sola vez para los dos libros
+                            xml = _hoja_xml_valores(encabezados, _filas_valores(grupo))
+                            libro_individual = _LibroXlsxValores(export_file_path)
+                            libro_individual.agregar_hoja(sheet_name, xml)
+                            libro_individual.cerrar()
+                            libro_combinado.agregar_hoja(sheet_name, xml)
+                    medidor.contar("guardado", archivos=1, filas=len(grupo))
+                    progreso.archivo_escrito(export_file_path, 1, grupos_escritos=1)
+                except Exception as e:
+                    progreso.error_grupo(sheet_name, f"Error al exportar la hoja {sheet_name}: {str(e)}")
+                    progreso.avanzar(1)
 
-    for merged_range in ws_src.merged_cells.ranges:
-        ws_dst.merge_cells(str(merged_range))
+            if libro_combinado is not None:
+                progreso.comprobar_cancelacion()
+                with medidor.etapa("guardado"):
+                    libro_combinado.cerrar()
+                medidor.contar("guardado", archivos=1)
+                progreso.archivo_escrito(ruta_resultado)
+        except BaseException:
+            # El combinado a medio escribir no está registrado en progreso: se borra aquí
+            if libro_combinado is not None:
+                libro_combinado.descartar()
+            raise
 
-    # Copiar tablas con el mismo rango (copia completa de la hoja)
-    total_rows = ws_src.max_row
-    _add_tables(ws_src, ws_dst, new_row_count=total_rows, display_name_prefix=ws_dst.title)
+        print(f"Se han exportado las ventanas por {formato} separados en la carpeta: {full_folder_path}")
+        divisiones.append((full_folder_path, len(orden), len(claves_partes)))
+    return divisiones
 
 
-def sanitize_sheet_name(name):
+def _eliminar_salida_parcial(progreso):
     """
-    Sanitiza el nombre de una hoja de Excel para evitar caracteres no válidos.
-    Excel no permite: [ ] * ? : / \
-    También limita la longitud a 31 caracteres.
+    Elimina lo escrito por una división interrumpida: los archivos que registró
+    progreso y las carpetas que creó, si quedaron vacías. No se recorre la
+    carpeta de resultados, que puede tener archivos de otros libros o del usuario.
     """
-    if name is None:
-        return "Sin_nombre"
-
-    # Convertir a string si no lo es
-    name = str(name)
-
-    # Reemplazar caracteres no válidos con guiones bajos
-    invalid_chars = r'[\[\]\*\?:/\\]'
-    sanitized = re.sub(invalid_chars, '_', name)
+    for ruta in reversed(progreso.archivos):
+        try:
+            os.remove(ruta)
+        except OSError:
+            pass
+    for carpeta in reversed(progreso.carpetas):
+        try:
+            os.rmdir(carpeta)
+        except OSError:
+            pass
 
-    # Eliminar caracteres no imprimibles
-    sanitized = ''.join(c for c in sanitized if c.isprintable())
 
-    # Si está vacío después de sanitizar, usar un nombre predeterminado
-    if not sanitized or sanitized.isspace():
-        sanitized = "Hoja_Sin_Nombre"
+def dividir_excel(archivo_excel, hoja, columna, carpeta_resultado, motor="completo", workers=1,
+                  progreso=None, cancelar=None, directorio_salida=None, perfil=None, incremental=True,
+                  anidar=False, formato="xlsx", columnas_salida=None, valores=None, agrupar_resto=False,
+                  max_filas=None, max_mb=None, carpeta_generada=False, valores_como_texto=False):
+    """
+    Divide la hoja indicada en un archivo combinado (una hoja por valor de la
+    columna) y un archivo individual por valor.
 
-    # Limitar a 31 caracteres (límite de Excel)
-    return sanitized[:31]
+    Los resultados se crean en carpeta_resultado, dentro de directorio_salida
+    o, si no se indica, del mismo directorio que el archivo de origen.
 
+    Se puede dividir por varias columnas a la vez pasando una lista en
+    columna: cada elemento es un encabezado o una tupla de encabezados (clave
+    compuesta, p. ej. ("Región", "Distrito")). La hoja se lee una sola vez y
+    cada partición se escribe en su propia subcarpeta "Por <columnas>".
 
-def exportar_ventanas_xlsx(file_path, carpeta_principal):
-    """
-    Exporta cada hoja del archivo Excel a un archivo individual
-    dentro de una subcarpeta de la carpeta principal proporcionada.
-    
     Args:
-        file_path: Ruta al archivo Excel que contiene las hojas a exportar
-        carpeta_principal: Carpeta principal donde se creará la subcarpeta para los archivos individuales
-    
+        archivo_excel: Ruta al archivo Excel de origen
+        hoja: Nombre de la hoja a dividir
+        columna: Nombre (encabezado) de la columna por la que se divide, o
+            lista de columnas y claves compuestas
+        carpeta_resultado: Nombre de la carpeta de resultados
+        motor: "completo" (libro en memoria), "streaming" (memoria acotada) o
+            "valores" (solo valores, sin formato, con pandas)
+        workers: Procesos para los archivos individuales en el motor completo
+        progreso: Función opcional que recibe eventos de avance (ver _Progreso)
+        cancelar: threading.Event opcional; al activarse el proceso se detiene
+            entre grupos y se eliminan los archivos parciales
+        directorio_salida: Directorio donde crear carpeta_resultado
+        perfil: Si es True, guarda un perfil de cProfile de la ejecución junto
+            al reporte (por defecto, según DSD_PERFIL)
+        incremental: En el motor completo, conservar los archivos de grupos
+            que no cambiaron desde la corrida anterior en la misma carpeta y
+            borrar los de grupos que ya no existen. False reescribe todo.
+        anidar: Guardar los archivos individuales de claves compuestas en una
+            subcarpeta por cada nivel de la clave
+        formato: En el motor de valores, "xlsx", "csv" o "parquet". Con csv y
+            parquet no se genera archivo combinado (archivo_combinado es None)
+        columnas_salida: Encabezados de las columnas a incluir en los
+            archivos, en el orden en que deben quedar. Las demás columnas no
+            se copian; las columnas por las que se divide no tienen que estar
+            entre ellas. None exporta todas.
+        valores: Valores de la columna principal (la primera de columna) a
+            exportar, p. ej. los marcados en contar_valores_columna. Las
+            filas con otros valores no se copian. None exporta todos.
+        agrupar_resto: Con valores, reunir las filas de los valores no
+            seleccionados en un grupo "Otros" en lugar de descartarlas
+        max_filas: Máximo de filas de datos por hoja y archivo individual.
+            Los grupos más grandes se escriben en partes "<valor> (2)", etc.
+            En .xlsx siempre se respeta además el límite de filas de Excel.
+        max_mb: Tamaño aproximado máximo de cada archivo individual, estimado
+            con el tamaño medio de las filas del origen (o de la salida, en csv)
+        carpeta_generada: True si carpeta_resultado es un nombre generado
+            (get_default_folder_name) que otra división no va a reutilizar.
+            Si este libro no tiene manifiesto en esa carpeta, no se calculan
+            hashes ni se guarda manifiesto, como con incremental=False.
+        valores_como_texto: Comparar también valores por su texto (p. ej.
+            "1" selecciona el número 1), para los indicados como texto en la
+            línea de comandos
+
     Returns:
-        Ruta a la subcarpeta donde se guardaron los archivos individuales
+        Diccionario con la carpeta principal, el archivo combinado, la carpeta
+        de archivos individuales, la cantidad de grupos y de partes, el
+        detalle de cada partición (particiones), las listas de archivos
+        escritos, conservados sin cambios y eliminados, los grupos que no se
+        pudieron escribir (errores: grupo y mensaje), el total de bytes
+        escritos, las mediciones por etapa y la ruta del reporte JSON de la
+        ejecución (<carpeta>-<archivo>-reporte.json, junto a la carpeta de
+        resultados, para que no se pisen los de varios libros en la misma carpeta).
+
+    Raises:
+        ColumnaNoEncontradaError: Si la columna no existe en el encabezado
+        ProcesoCancelado: Si se activó cancelar antes de terminar
+        ImportError: Si se pidió formato parquet y no está instalado pyarrow
+        SeleccionVaciaError: Si ninguna fila tiene los valores seleccionados
     """
-    # Cargar el archivo xlsx preservando estilos
-    wb_combined = openpyxl.load_workbook(file_path, data_only=True)
+    # Crear la carpeta principal de resultados (por defecto, junto al archivo Excel)
+    if directorio_salida is None:
+        directorio_salida = os.path.dirname(archivo_excel)
+    ruta_carpeta_principal = os.path.join(directorio_salida, carpeta_resultado)
+    nombre_archivo_resultado = os.path.basename(archivo_excel)
+    file_name = os.path.splitext(nombre_archivo_resultado)[0]
+    particiones = _normalizar_particiones(columna)
+    destinos = [
+        (columnas, carpeta, os.path.join(carpeta, nombre_archivo_resultado))
+        for columnas, carpeta in zip(particiones, _carpetas_particiones(ruta_carpeta_principal, particiones))
+    ]
 
-    # Obtener el nombre del archivo sin la extensión
-    file_name = os.path.splitext(os.path.basename(file_path))[0]
+    if motor not in ("completo", "streaming", "valores"):
+        raise ValueError(f"Motor desconocido: {motor}")
+    if motor != "valores":
+        formato = "xlsx"
+    if columnas_salida is not None:
+        columnas_salida = list(dict.fromkeys(columnas_salida))
+        if not columnas_salida:
+            raise ValueError("Se debe indicar al menos una columna para exportar")
+    clasificar = None
+    if valores is not None:
+        valores = list(valores)
+        if not valores and not agrupar_resto:
+            raise ValueError("Se debe seleccionar al menos un valor para exportar")
+        clasificar = _clasificador_valores(valores, agrupar_resto, como_texto=valores_como_texto)
+    if (max_filas is not None and max_filas < 1) or (max_mb is not None and max_mb <= 0):
+        raise ValueError("El máximo de filas y de MB por archivo debe ser mayor que cero")
 
-    # Crear una subcarpeta para almacenar los archivos individuales dentro de la carpeta principal
-    folder_name = f"Separados-{file_name}"
-    full_folder_path = os.path.join(carpeta_principal, folder_name)
-    os.makedirs(full_folder_path, exist_ok=True)
+    if perfil is None:
+        perfil = PERFIL_ACTIVO
+    base_reporte = f"{os.path.normpath(ruta_carpeta_principal)}-{file_name}"
 
-    # Iterar sobre todas las hojas en el archivo xlsx
-    for sheet_name in wb_combined.sheetnames:
-        try:
-            # Generar el nombre de archivo exportado
-            export_file_name = f"{file_name}-{sheet_name}.xlsx"
-            export_file_path = os.path.join(full_folder_path, export_file_name)
+    avance = _Progreso(progreso, cancelar)
+    # En una carpeta con nombre generado no hay corrida anterior con qué comparar
+    # ni una siguiente que aproveche los hashes, salvo que este libro ya tenga ahí
+    # su manifiesto (dos divisiones en el mismo segundo)
+    if carpeta_generada and not any(
+        os.path.isfile(_ruta_manifiesto(carpeta, file_name)) for _, carpeta, _ in destinos
+    ):
+        incremental = False
+    inicio = time.time()
+    inicio_reloj = time.perf_counter()
+    perfilador = cProfile.Profile() if perfil else None
+    if perfilador is not None:
+        perfilador.enable()
+    try:
+        if motor == "streaming":
+            divisiones = _dividir_streaming(
+                archivo_excel, hoja, destinos, avance, anidar=anidar, columnas_salida=columnas_salida,
+                clasificar=clasificar, max_filas=max_filas, max_mb=max_mb
+            )
+        elif motor == "valores":
+            divisiones = _dividir_valores(
+                archivo_excel, hoja, destinos, avance, formato=formato, anidar=anidar, columnas_salida=columnas_salida,
+                clasificar=clasificar, max_filas=max_filas, max_mb=max_mb
+            )
+        else:
+            divisiones = _dividir_completo(
+                archivo_excel, hoja, destinos, avance, workers=workers, incremental=incremental, anidar=anidar,
+                columnas_salida=columnas_salida, clasificar=clasificar, max_filas=max_filas, max_mb=max_mb
+            )
+    except ProcesoCancelado:
+        # SeleccionVaciaError no pasa por aquí: se lanza antes de escribir nada y la
+        # carpeta puede ser compartida con otros libros (cli -j N)
+        _eliminar_salida_parcial(avance)
+        raise
+    finally:
+        if perfilador is not None:
+            perfilador.disable()
+    avance.etapa("terminado")
 
-            # Crear un workbook individual y copiar la hoja con formato
-            wb_individual = openpyxl.Workbook()
-            wb_individual.remove(wb_individual.active)
-            ws_dst = wb_individual.create_sheet(title=sheet_name)
-            _copy_sheet(wb_combined[sheet_name], ws_dst)
-            wb_individual.save(export_file_path)
-        except Exception as e:
-            print(f"Error al exportar la hoja {sheet_name}: {str(e)}")
-            continue
+    resultado = {
+        "carpeta_principal": ruta_carpeta_principal,
+        "archivo_combinado": destinos[0][2] if formato == "xlsx" else None,
+        "carpeta_archivos": divisiones[0][0],
+        "grupos": sum(grupos for _, grupos, _ in divisiones),
+        "partes": sum(partes for _, _, partes in divisiones),
+        "particiones": [
+            {
+                "columnas": list(columnas),
+                "carpeta": carpeta,
+                "archivo_combinado": ruta_resultado if formato == "xlsx" else None,
+                "carpeta_archivos": carpeta_archivos,
+                "grupos": grupos,
+                "partes": partes,
+            }
+            for (columnas, carpeta, ruta_resultado), (carpeta_archivos, grupos, partes) in zip(destinos, divisiones)
+        ],
+        "archivos": list(avance.archivos),
+        "archivos_sin_cambios": list(avance.sin_cambios),
+        "archivos_eliminados": list(avance.eliminados),
+        "errores": list(avance.errores),
+        "bytes_escritos": avance.estado["bytes_escritos"],
+        "segundos": round(time.perf_counter() - inicio_reloj, 3),
+        "rss_max_proceso_mb": _rss_max_proceso_mb(),
+        "etapas": avance.medidor.reporte(),
+        "reporte": f"{base_reporte}-reporte.json",
+    }
+    if perfilador is not None:
+        resultado["perfil"] = f"{base_reporte}-perfil.prof"
+        perfilador.dump_stats(resultado["perfil"])
+
+    reporte = {
+        "archivo": os.path.abspath(archivo_excel),
+        "hoja": hoja,
+        "columnas": [list(columnas) for columnas in particiones],
+        "columnas_salida": columnas_salida,
+        "valores_seleccionados": len(valores) if valores is not None else None,
+        "agrupar_resto": bool(agrupar_resto and valores is not None),
+        "max_filas": max_filas,
+        "max_mb": max_mb,
+        "motor": motor,
+        "formato": formato,
+        "workers": workers,
+        "incremental": incremental and motor == "completo",
+        "inicio": datetime.datetime.fromtimestamp(inicio).isoformat(timespec="seconds"),
+    }
+    listas = ("archivos", "archivos_sin_cambios", "archivos_eliminados")
+    reporte.update((k, v) for k, v in resultado.items() if k not in listas + ("reporte",))
+    reporte["archivos_escritos"] = len(resultado["archivos"])
+    reporte["archivos_sin_cambios"] = len(resultado["archivos_sin_cambios"])
+    reporte["archivos_eliminados"] = len(resultado["archivos_eliminados"])
+    with open(resultado["reporte"], "w", encoding="utf-8") as fh:
+        json.dump(reporte, fh, ensure_ascii=False, indent=2, default=str)
+
+    return resultado
 
-    print(f"Se han exportado las ventanas por xlsx separados en la carpeta: {full_folder_path}")
-    return full_folder_path
 
 def get_default_folder_name():
     """
@@ -183,6 +3029,15 @@ def main(page):
         sheets_dropdown.disabled = True
         columns_dropdown.options.clear()
         columns_dropdown.disabled = True
+        columnas_extra.controls.clear()
+        opciones_columnas.visible = False
+        columnas_salida.controls.clear()
+        opciones_salida.visible = False
+        reiniciar_valores()
+        cerrar_vista()
+        vista_previa.visible = False
+        chk_compuesta.value = False
+        chk_anidar.value = False
         input_carpet.value = ""
         resultados_container.visible = False
         columnas_cargando.visible = False
@@ -201,6 +3056,337 @@ def main(page):
         width=400,
         disabled=True,
     )
+
+    # Vista previa paginada de la hoja elegida: cada página se lee recién al pedirla
+    tabla_vista = ft.DataTable(
+        columns=[ft.DataColumn(ft.Text("Fila"))], rows=[], column_spacing=16,
+        heading_row_height=32, data_row_min_height=28, data_row_max_height=28,
+    )
+    texto_pagina = ft.Text(size=12)
+    vista_cargando = ft.ProgressRing(width=16, height=16, stroke_width=2, visible=False)
+    estado_vista = {"cursor": None, "clave": None, "pagina": 0, "abierta": False}
+    bloqueo_vista = threading.Lock()
+
+    def texto_celda_vista(valor):
+        if valor is None:
+            return ""
+        if isinstance(valor, datetime.datetime) and valor.time() == datetime.time():
+            return valor.strftime("%Y-%m-%d")
+        texto = str(valor)
+        return texto if len(texto) <= 60 else texto[:59] + "…"
+
+    def cerrar_vista():
+        # El cursor mantiene abierto el archivo: se cierra al cambiar de hoja o de archivo
+        with bloqueo_vista:
+            if estado_vista["cursor"] is not None:
+                estado_vista["cursor"].cerrar()
+            estado_vista.update(cursor=None, clave=None, pagina=0)
+        tabla_vista.columns = [ft.DataColumn(ft.Text("Fila"))]
+        tabla_vista.rows = []
+        texto_pagina.value = ""
+
+    def cargar_pagina_vista(archivo_excel, hoja, numero):
+        try:
+            with bloqueo_vista:
+                cursor = estado_vista["cursor"]
+                if estado_vista["clave"] != (archivo_excel, hoja):
+                    if cursor is not None:
+                        cursor.cerrar()
+                    cursor = abrir_vista_previa(archivo_excel, hoja)
+                    estado_vista.update(cursor=cursor, clave=(archivo_excel, hoja))
+                filas = cursor.pagina(numero)
+                if not filas and numero > 0 and cursor.total_paginas:
+                    # Se pidió una página después de la última: mostrar la última
+                    numero = cursor.total_paginas - 1
+                    filas = cursor.pagina(numero)
+                encabezados = cursor.encabezados
+                total = cursor.total_paginas
+                estimadas = cursor.filas_estimadas
+            # Si mientras se leía se eligió otra hoja, la página ya no corresponde
+            if (input_excel.value, sheets_dropdown.value) != (archivo_excel, hoja):
+                return
+            estado_vista["pagina"] = numero
+            ancho = max([len(encabezados)] + [len(valores) for _, valores in filas])
+            tabla_vista.columns = [ft.DataColumn(ft.Text("Fila"))] + [
+                ft.DataColumn(ft.Text(
+                    texto_celda_vista(encabezados[i]) if i < len(encabezados) and encabezados[i] is not None
+                    else get_column_letter(i + 1),
+                    weight=ft.FontWeight.BOLD,
+                ))
+                for i in range(ancho)
+            ]
+            tabla_vista.rows = [
+                ft.DataRow(cells=[ft.DataCell(ft.Text(str(fila) if fila else "", size=12))] + [
+                    ft.DataCell(ft.Text(texto_celda_vista(valores[i] if i < len(valores) else None), size=12))
+                    for i in range(ancho)
+                ])
+                for fila, valores in filas
+            ]
+            if total is not None:
+                texto_pagina.value = f"Página {numero + 1:,} de {max(total, 1):,}"
+            elif estimadas:
+                paginas = max(-(-(estimadas - 1) // FILAS_POR_PAGINA_VISTA), numero + 1)
+                texto_pagina.value = f"Página {numero + 1:,} de ~{paginas:,}"
+            else:
+                texto_pagina.value = f"Página {numero + 1:,}"
+            btn_primera_pagina.disabled = btn_pagina_anterior.disabled = numero == 0
+            btn_pagina_siguiente.disabled = total is not None and numero + 1 >= total
+        except Exception as e:
+            page.snack_bar = ft.SnackBar(
+                content=ft.Text(f"Error al leer la vista previa: {str(e)}"),
+                bgcolor=ft.colors.RED_400
+            )
+            page.snack_bar.open = True
+        finally:
+            vista_cargando.visible = False
+            page.update()
+
+    def mostrar_pagina_vista(numero):
+        if not input_excel.value or not sheets_dropdown.value or numero < 0:
+            return
+        vista_cargando.visible = True
+        page.update()
+        threading.Thread(
+            target=cargar_pagina_vista, args=(input_excel.value, sheets_dropdown.value, numero), daemon=True
+        ).start()
+
+    def on_ir_a_pagina(e):
+        try:
+            numero = int(ir_a_pagina.value) - 1
+        except (TypeError, ValueError):
+            return
+        mostrar_pagina_vista(max(numero, 0))
+
+    def on_vista_change(e):
+        estado_vista["abierta"] = e.data == "true"
+        if estado_vista["abierta"] and estado_vista["clave"] != (input_excel.value, sheets_dropdown.value):
+            mostrar_pagina_vista(0)
+
+    btn_primera_pagina = ft.IconButton(
+        icon=ft.icons.FIRST_PAGE, tooltip="Primera página", on_click=lambda e: mostrar_pagina_vista(0)
+    )
+    btn_pagina_anterior = ft.IconButton(
+        icon=ft.icons.CHEVRON_LEFT, tooltip="Página anterior",
+        on_click=lambda e: mostrar_pagina_vista(estado_vista["pagina"] - 1)
+    )
+    btn_pagina_siguiente = ft.IconButton(
+        icon=ft.icons.CHEVRON_RIGHT, tooltip="Página siguiente",
+        on_click=lambda e: mostrar_pagina_vista(estado_vista["pagina"] + 1)
+    )
+    ir_a_pagina = ft.TextField(
+        label="Ir a la página", width=120, dense=True, keyboard_type=ft.KeyboardType.NUMBER, on_submit=on_ir_a_pagina
+    )
+    vista_previa = ft.ExpansionTile(
+        title=ft.Text("Vista previa de la hoja", size=14),
+        subtitle=ft.Text(f"{FILAS_POR_PAGINA_VISTA} filas por página, leídas a medida que se piden", size=12),
+        controls=[
+            ft.Row([btn_primera_pagina, btn_pagina_anterior, texto_pagina, btn_pagina_siguiente, ir_a_pagina,
+                    vista_cargando]),
+            ft.Container(
+                ft.Column([ft.Row([tabla_vista], scroll=ft.ScrollMode.AUTO)], scroll=ft.ScrollMode.AUTO),
+                height=360,
+            ),
+        ],
+        on_change=on_vista_change,
+        visible=False,
+    )
+
+    # Vista previa de los valores de la columna elegida, con la cantidad de filas de cada uno
+    lista_valores = ft.ListView(height=220, spacing=0)
+    resumen_valores = ft.Text(size=12)
+    chk_otros = ft.Checkbox(
+        label=f'Reunir las filas de los valores no marcados en un grupo "{NOMBRE_GRUPO_OTROS}"', value=False
+    )
+    valores_cargando = ft.Container(
+        content=ft.Row([
+            ft.ProgressRing(width=16, height=16, stroke_width=2),
+            ft.Text("Contando valores...", size=12)
+        ]),
+        visible=False,
+        padding=ft.padding.only(left=10, top=5)
+    )
+
+    def marcar_valores(valor):
+        for checkbox in lista_valores.controls:
+            checkbox.value = valor
+        page.update()
+
+    panel_valores = ft.Column(
+        [
+            resumen_valores,
+            ft.Row([
+                ft.TextButton("Todos", on_click=lambda e: marcar_valores(True)),
+                ft.TextButton("Ninguno", on_click=lambda e: marcar_valores(False)),
+            ]),
+            ft.Container(lista_valores, width=400),
+            chk_otros,
+        ],
+        visible=False
+    )
+    estado_valores = {"total": 0}
+
+    def reiniciar_valores():
+        lista_valores.controls.clear()
+        panel_valores.visible = False
+        chk_otros.value = False
+        estado_valores["total"] = 0
+
+    def cargar_valores(archivo_excel, hoja, columna):
+        try:
+            conteo = contar_valores_columna(archivo_excel, hoja, columna)
+            # Si mientras se contaba se eligió otra columna, el resultado ya no corresponde
+            if (input_excel.value, sheets_dropdown.value, columns_dropdown.value) != (archivo_excel, hoja, columna):
+                return
+            ordenados = sorted(conteo.items(), key=lambda item: -item[1])
+            lista_valores.controls = [
+                ft.Checkbox(label=f"{'(vacías)' if valor is None else valor}  ·  {filas:,} filas", value=True, data=valor)
+                for valor, filas in ordenados[:MAX_VALORES_VISTA]
+            ]
+            estado_valores["total"] = len(conteo)
+            resumen_valores.value = f"{len(conteo):,} valores distintos en {sum(conteo.values()):,} filas."
+            if len(conteo) > MAX_VALORES_VISTA:
+                resumen_valores.value += (
+                    f" Se muestran los {MAX_VALORES_VISTA:,} con más filas; si se desmarca alguno, "
+                    "los que no se muestran también quedan sin marcar."
+                )
+            panel_valores.visible = True
+        except Exception as e:
+            page.snack_bar = ft.SnackBar(
+                content=ft.Text(f"Error al contar los valores: {str(e)}"),
+                bgcolor=ft.colors.RED_400
+            )
+            page.snack_bar.open = True
+        finally:
+            valores_cargando.visible = False
+            btn_ver_valores.disabled = False
+            page.update()
+
+    def ver_valores(e):
+        if not input_excel.value or not sheets_dropdown.value or not columns_dropdown.value:
+            page.snack_bar = ft.SnackBar(content=ft.Text("Por favor selecciona una columna"))
+            page.snack_bar.open = True
+            page.update()
+            return
+        reiniciar_valores()
+        valores_cargando.visible = True
+        btn_ver_valores.disabled = True
+        page.update()
+        threading.Thread(
+            target=cargar_valores, args=(input_excel.value, sheets_dropdown.value, columns_dropdown.value), daemon=True
+        ).start()
+
+    btn_ver_valores = ft.TextButton("Ver valores y cantidad de filas", icon=ft.icons.BAR_CHART, on_click=ver_valores)
+
+    def on_column_change(e):
+        reiniciar_valores()
+        page.update()
+
+    columns_dropdown.on_change = on_column_change
+
+    # Columnas adicionales: cada una genera su propia división en la misma lectura del libro
+    columnas_extra = ft.Row(wrap=True)
+    chk_compuesta = ft.Checkbox(
+        label="Agregar una división por la combinación de la columna elegida y las marcadas", value=False
+    )
+    chk_anidar = ft.Checkbox(label="En la división combinada, crear una subcarpeta por cada nivel", value=False)
+    opciones_columnas = ft.Column(
+        [ft.Text("Dividir también por (opcional):", size=12), columnas_extra, chk_compuesta, chk_anidar],
+        visible=False
+    )
+
+    # Columnas que se copian a los archivos, en el orden de la lista (las flechas las reordenan)
+    columnas_salida = ft.Column(spacing=0)
+
+    def mover_columna_salida(fila, paso):
+        posicion = columnas_salida.controls.index(fila)
+        destino = posicion + paso
+        if 0 <= destino < len(columnas_salida.controls):
+            controles = columnas_salida.controls
+            controles[posicion], controles[destino] = controles[destino], controles[posicion]
+            page.update()
+
+    def fila_columna_salida(column):
+        fila = ft.Row([ft.Checkbox(label=column, value=True, expand=True)])
+        fila.controls.extend([
+            ft.IconButton(icon=ft.icons.ARROW_UPWARD, tooltip="Subir", icon_size=16,
+                          on_click=lambda e: mover_columna_salida(fila, -1)),
+            ft.IconButton(icon=ft.icons.ARROW_DOWNWARD, tooltip="Bajar", icon_size=16,
+                          on_click=lambda e: mover_columna_salida(fila, 1)),
+        ])
+        return fila
+
+    def marcar_columnas_salida(valor):
+        for fila in columnas_salida.controls:
+            fila.controls[0].value = valor
+        page.update()
+
+    opciones_salida = ft.ExpansionTile(
+        title=ft.Text("Columnas a exportar", size=14),
+        subtitle=ft.Text("Por defecto todas, en el orden original", size=12),
+        controls=[
+            ft.Row([
+                ft.TextButton("Todas", on_click=lambda e: marcar_columnas_salida(True)),
+                ft.TextButton("Ninguna", on_click=lambda e: marcar_columnas_salida(False)),
+            ]),
+            ft.Container(columnas_salida, width=400),
+        ],
+        visible=False,
+    )
+    
+    motor_dropdown = ft.Dropdown(
+        label="Modo de procesamiento",
+        width=400,
+        value="completo",
+        options=[
+            ft.dropdown.Option("completo", "Completo (libro en memoria)"),
+            ft.dropdown.Option("streaming", "Streaming (memoria acotada, para hojas muy grandes)"),
+            ft.dropdown.Option("valores", "Solo valores (sin formato, el más rápido)"),
+        ],
+    )
+
+    # El formato de salida solo aplica al modo de solo valores
+    formato_dropdown = ft.Dropdown(
+        label="Formato de salida",
+        width=400,
+        value="xlsx",
+        visible=False,
+        options=[
+            ft.dropdown.Option("xlsx", "Excel (.xlsx)"),
+            ft.dropdown.Option("csv", "CSV (.csv)"),
+            ft.dropdown.Option("parquet", "Parquet (.parquet, requiere pyarrow)"),
+        ],
+    )
+
+    def on_motor_change(e):
+        formato_dropdown.visible = motor_dropdown.value == "valores"
+        page.update()
+
+    motor_dropdown.on_change = on_motor_change
+
+    # Tope por archivo: los grupos más grandes se escriben en partes "<valor> (2)", "<valor> (3)"...
+    input_max_filas = ft.TextField(
+        label="Máximo de filas por archivo (opcional)",
+        hint_text="Sin límite",
+        keyboard_type=ft.KeyboardType.NUMBER,
+        width=195,
+    )
+    input_max_mb = ft.TextField(
+        label="Máximo de MB por archivo (aprox.)",
+        hint_text="Sin límite",
+        keyboard_type=ft.KeyboardType.NUMBER,
+        width=195,
+    )
+    limites_archivo = ft.Row([input_max_filas, input_max_mb], width=400)
+
+    def leer_limite(campo, tipo):
+        """Valor positivo de campo convertido con tipo, None si está vacío. ValueError si no es válido."""
+        texto = (campo.value or "").strip().replace(",", ".")
+        if not texto:
+            return None
+        valor = tipo(texto)
+        if valor <= 0:
+            raise ValueError(texto)
+        return valor
     
     # Crear un contenedor para el campo de texto y el botón de selección
     input_excel = ft.TextField(
@@ -220,12 +3406,11 @@ def main(page):
             sheets_dropdown.options.clear()
             columns_dropdown.options.clear()
             columns_dropdown.disabled = True
+            cerrar_vista()
+            vista_previa.visible = False
             
-            # Cargar el archivo Excel
-            xls = pd.ExcelFile(file_path)
-            
-            # Agregar las hojas al dropdown
-            for sheet in xls.sheet_names:
+            # Leer solo el manifiesto del libro para obtener las hojas
+            for sheet in listar_hojas_excel(file_path):
                 sheets_dropdown.options.append(ft.dropdown.Option(sheet))
             
             # Ocultar indicador de carga y habilitar el dropdown
@@ -255,13 +3440,21 @@ def main(page):
                 
             # Limpiar dropdown de columnas
             columns_dropdown.options.clear()
+            columnas_extra.controls.clear()
+            columnas_salida.controls.clear()
+            reiniciar_valores()
+            cerrar_vista()
             
-            # Cargar las columnas de la hoja seleccionada
-            df = pd.read_excel(input_excel.value, sheet_name=sheets_dropdown.value)
-            
-            # Agregar las columnas al dropdown
-            for column in df.columns:
+            # Leer solo la fila de encabezados de la hoja seleccionada
+            for column in leer_encabezados_hoja(input_excel.value, sheets_dropdown.value):
                 columns_dropdown.options.append(ft.dropdown.Option(column))
+                columnas_extra.controls.append(ft.Checkbox(label=column, value=False))
+                columnas_salida.controls.append(fila_columna_salida(column))
+            opciones_columnas.visible = bool(columnas_extra.controls)
+            opciones_salida.visible = bool(columnas_salida.controls)
+            vista_previa.visible = True
+            if estado_vista["abierta"]:
+                mostrar_pagina_vista(0)
             
             # Ocultar indicador de carga y habilitar el dropdown
             columnas_cargando.visible = False
@@ -301,13 +3494,62 @@ def main(page):
             file_type=ft.FilePickerFileType.CUSTOM
         )
     
+    # Controles de avance, actualizados desde el hilo que ejecuta la división
+    barra_progreso = ft.ProgressBar(width=400)
+    texto_progreso = ft.Text()
+    detalle_progreso = ft.Text(size=12)
+    estado_proceso = {"cancelar": None}
+
+    def cancelar_proceso(e):
+        if estado_proceso["cancelar"] is not None:
+            estado_proceso["cancelar"].set()
+            btn_cancelar.disabled = True
+            texto_progreso.value = "Cancelando, esperando a que termine el grupo en curso..."
+            page.update()
+
+    btn_cancelar = ft.OutlinedButton("Cancelar", icon=ft.icons.CANCEL, on_click=cancelar_proceso)
+
     def mostrar_progreso(mensaje):
+        barra_progreso.value = None
+        texto_progreso.value = mensaje
+        detalle_progreso.value = ""
+        btn_cancelar.disabled = False
         resultados_container.content = ft.Column([
-            ft.ProgressBar(width=400),
-            ft.Text(mensaje)
+            barra_progreso,
+            texto_progreso,
+            detalle_progreso,
+            btn_cancelar
         ])
         resultados_container.visible = True
         page.update()
+
+    def actualizar_progreso(evento):
+        if estado_proceso["cancelar"] is not None and estado_proceso["cancelar"].is_set():
+            return
+        etapas = {
+            "cargando": "Cargando el archivo Excel...",
+            "agrupando": "Agrupando filas...",
+            "escribiendo": "Escribiendo archivos...",
+            "guardando": "Guardando archivos...",
+            "terminado": "Finalizando...",
+        }
+        texto_progreso.value = etapas.get(evento["etapa"], "Procesando archivos...")
+        if evento["particiones_total"] and evento["particiones_total"] > 1:
+            texto_progreso.value += f" (división {evento['particion']} de {evento['particiones_total']})"
+        barra_progreso.value = evento["fraccion"]
+
+        detalles = []
+        if evento["filas_total"]:
+            detalles.append(f"Filas leídas: {evento['filas_leidas']:,} de {evento['filas_total']:,}")
+        if evento["grupos_total"]:
+            detalles.append(f"Grupos escritos: {evento['grupos_escritos']} de {evento['grupos_total']}")
+        if evento["bytes_escritos"]:
+            detalles.append(f"Escrito: {evento['bytes_escritos'] / (1024 * 1024):.1f} MB")
+        if evento["eta_segundos"] is not None:
+            minutos, segundos = divmod(int(evento["eta_segundos"]), 60)
+            detalles.append(f"Tiempo restante estimado: {minutos}:{segundos:02d}")
+        detalle_progreso.value = "  ·  ".join(detalles)
+        page.update()
     
     def mostrar_resultado(titulo, mensajes, es_error=False):
         contenido = [ft.Text(titulo, size=20, weight=ft.FontWeight.BOLD, color=ft.colors.RED if es_error else None)]
@@ -337,9 +3579,49 @@ def main(page):
         else:
             archivo_excel = input_excel.value
             nombre_sede_column = columns_dropdown.value
+
+            # Columnas marcadas además de la elegida: una división por cada una y, opcionalmente, la combinada
+            extras = [c.label for c in columnas_extra.controls if c.value and c.label != nombre_sede_column]
+            if extras:
+                particiones = [nombre_sede_column, *extras]
+                if chk_compuesta.value:
+                    particiones.append((nombre_sede_column, *extras))
+                nombre_sede_column = particiones
+
+            # Columnas a exportar: None si quedaron todas marcadas y en el orden original
+            seleccion = [fila.controls[0].label for fila in columnas_salida.controls if fila.controls[0].value]
+            if columnas_salida.controls and not seleccion:
+                page.snack_bar = ft.SnackBar(content=ft.Text("Por favor marca al menos una columna para exportar"))
+                page.snack_bar.open = True
+                page.update()
+                return
+            originales = [opcion.key for opcion in columns_dropdown.options]
+            columnas_exportar = None if seleccion == originales else seleccion
+
+            # Valores a exportar: solo si en la vista previa se desmarcó alguno
+            valores_exportar = None
+            if panel_valores.visible and any(not checkbox.value for checkbox in lista_valores.controls):
+                valores_exportar = [checkbox.data for checkbox in lista_valores.controls if checkbox.value]
+                if not valores_exportar and not chk_otros.value:
+                    page.snack_bar = ft.SnackBar(content=ft.Text("Por favor marca al menos un valor para exportar"))
+                    page.snack_bar.open = True
+                    page.update()
+                    return
+
+            try:
+                max_filas = leer_limite(input_max_filas, int)
+                max_mb = leer_limite(input_max_mb, float)
+            except ValueError:
+                page.snack_bar = ft.SnackBar(
+                    content=ft.Text("El máximo de filas debe ser un entero y el de MB un número, ambos mayores que cero")
+                )
+                page.snack_bar.open = True
+                page.update()
+                return
             
             # Si no se proporciona un nombre de carpeta, generar uno por defecto
-            carpeta_resultado = input_carpet.value.strip() if input_carpet.value and input_carpet.value.strip() else get_default_folder_name()
+            carpeta_generada = not (input_carpet.value and input_carpet.value.strip())
+            carpeta_resultado = get_default_folder_name() if carpeta_generada else input_carpet.value.strip()
 
             # Verificar si el archivo Excel existe
             if not os.path.isfile(archivo_excel):
@@ -349,110 +3631,99 @@ def main(page):
                     es_error=True
                 )
             else:
-                try:
-                    # Cargar la hoja seleccionada con openpyxl para preservar estilos
-                    wb_src = openpyxl.load_workbook(archivo_excel, data_only=True)
-                    ws_src = wb_src[sheets_dropdown.value]
-
-                    # Obtener la fila de encabezado e identificar el índice de la columna elegida
-                    header_row = list(ws_src.iter_rows(min_row=1, max_row=1))[0]
-                    col_idx = next((c.column for c in header_row if str(c.value) == nombre_sede_column), None)
-
-                    if col_idx is None:
-                        mostrar_resultado(
-                            "Error al procesar el archivo",
-                            ["El nombre de la columna especificado no existe en el archivo Excel. Por favor, verifique el nombre de la columna y vuelva a intentarlo."],
-                            es_error=True
-                        )
-                    else:
-                        # Agrupar filas de datos por valor único de la columna (manteniendo orden de aparición)
-                        groups = defaultdict(list)
-                        seen_values = []
-                        for row in ws_src.iter_rows(min_row=2):
-                            val = row[col_idx - 1].value
-                            if val not in groups:
-                                seen_values.append(val)
-                            groups[val].append(row)
-
-                        # Obtener el directorio donde se encuentra el archivo Excel original
-                        directorio_excel = os.path.dirname(archivo_excel)
-
-                        # Crear la carpeta principal de resultados en la misma ubicación que el archivo Excel
-                        ruta_carpeta_principal = os.path.join(directorio_excel, carpeta_resultado)
-                        if not os.path.exists(ruta_carpeta_principal):
-                            os.makedirs(ruta_carpeta_principal)
-
-                        # Mostrar mensaje de progreso
-                        mostrar_progreso("Procesando archivos...")
-
-                        # Crear un nuevo archivo Excel con openpyxl preservando el formato original
-                        nombre_archivo_resultado = f"{os.path.basename(archivo_excel)}"
-                        ruta_resultado = os.path.join(ruta_carpeta_principal, nombre_archivo_resultado)
-
-                        # Diccionario para llevar registro de nombres de hojas ya utilizados
-                        used_sheet_names = {}
-
-                        wb_out = openpyxl.Workbook()
-                        wb_out.remove(wb_out.active)
-
-                        for corregimiento in seen_values:
-                            try:
-                                # Sanitizar el nombre de la hoja
-                                sheet_name = sanitize_sheet_name(corregimiento)
-
-                                # Manejar duplicados agregando un número
-                                if sheet_name in used_sheet_names:
-                                    used_sheet_names[sheet_name] += 1
-                                    sheet_name = f"{sheet_name}_{used_sheet_names[sheet_name]}"
-                                else:
-                                    used_sheet_names[sheet_name] = 0
+                # Mostrar mensaje de progreso y ejecutar la división en segundo plano
+                estado_proceso["cancelar"] = threading.Event()
+                btn_ejecutar.disabled = True
+                mostrar_progreso("Procesando archivos...")
+                threading.Thread(
+                    target=ejecutar_division,
+                    args=(archivo_excel, sheets_dropdown.value, nombre_sede_column, carpeta_resultado,
+                          motor_dropdown.value, formato_dropdown.value, chk_anidar.value, columnas_exportar,
+                          valores_exportar, chk_otros.value, max_filas, max_mb, carpeta_generada,
+                          estado_proceso["cancelar"]),
+                    daemon=True
+                ).start()
 
-                                ws_out = wb_out.create_sheet(title=sheet_name)
-
-                                # Copiar fila de encabezado con formato
-                                for cell in header_row:
-                                    _copy_cell(cell, ws_out, dst_row=1)
-
-                                # Copiar filas de datos del grupo con formato
-                                for dst_row, src_row in enumerate(groups[corregimiento], start=2):
-                                    for cell in src_row:
-                                        _copy_cell(cell, ws_out, dst_row=dst_row)
-
-                                # Copiar anchos de columna del original
-                                for col_letter, col_dim in ws_src.column_dimensions.items():
-                                    ws_out.column_dimensions[col_letter].width = col_dim.width
-
-                                # Recrear tablas del original con rango ajustado a las filas del grupo
-                                new_row_count = 1 + len(groups[corregimiento])  # encabezado + filas del grupo
-                                _add_tables(ws_src, ws_out, new_row_count=new_row_count, display_name_prefix=sheet_name)
-
-                            except Exception as e:
-                                print(f"Error al procesar el valor '{corregimiento}': {str(e)}")
-                                continue
+    def ejecutar_division(archivo_excel, hoja, columna, carpeta_resultado, motor, formato, anidar, columnas_exportar,
+                          valores_exportar, agrupar_resto, max_filas, max_mb, carpeta_generada, cancelar):
+        try:
+            resultado = dividir_excel(
+                archivo_excel, hoja, columna, carpeta_resultado,
+                motor=motor, workers=EXPORT_WORKERS, progreso=actualizar_progreso, cancelar=cancelar,
+                anidar=bool(anidar), formato=formato or "xlsx", columnas_salida=columnas_exportar,
+                valores=valores_exportar, agrupar_resto=bool(agrupar_resto), max_filas=max_filas, max_mb=max_mb,
+                carpeta_generada=carpeta_generada
+            )
 
-                        wb_out.save(ruta_resultado)
-
-                        # Llamar a la función para exportar las ventanas y obtener la ruta de la carpeta de resultados
-                        # Pasar la carpeta principal como parámetro para que los archivos individuales se creen dentro de ella
-                        carpeta_archivos = exportar_ventanas_xlsx(ruta_resultado, ruta_carpeta_principal)
-
-                        # Mostrar mensaje de completado
-                        mostrar_resultado(
-                            "¡Proceso completado!",
-                            [
-                                f"Las ventanas se han exportado por separado en archivos Excel en:",
-                                f"Carpeta principal: {ruta_carpeta_principal}",
-                                f"1. Archivo combinado: {nombre_archivo_resultado}",
-                                f"2. Archivos individuales: {os.path.basename(carpeta_archivos)}"
-                            ]
-                        )
-                except Exception as e:
-                    # Manejar cualquier error inesperado
-                    mostrar_resultado(
-                        "Error al procesar el archivo",
-                        [f"Ocurrió un error: {str(e)}"],
-                        es_error=True
-                    )
+            # Mostrar mensaje de completado con el resumen de tiempos por etapa
+            etapas = ", ".join(f"{e['etapa']} {e['segundos']:.1f} s" for e in resultado["etapas"])
+            incremental = []
+            if resultado["archivos_sin_cambios"] or resultado["archivos_eliminados"]:
+                incremental.append(
+                    f"Archivos reescritos: {len(resultado['archivos'])} · sin cambios: "
+                    f"{len(resultado['archivos_sin_cambios'])} · eliminados: {len(resultado['archivos_eliminados'])}"
+                )
+            if resultado["partes"] > resultado["grupos"]:
+                incremental.append(
+                    f"Grupos divididos por tamaño: {resultado['grupos']} grupos en {resultado['partes']} archivos"
+                )
+            memoria = (
+                f" · memoria máxima del proceso {resultado['rss_max_proceso_mb']:.0f} MB"
+                if resultado["rss_max_proceso_mb"] else ""
+            )
+            if len(resultado["particiones"]) > 1:
+                detalle = [
+                    f"{i}. Por {' + '.join(p['columnas'])}: {p['grupos']} grupos en {os.path.basename(p['carpeta'])}"
+                    for i, p in enumerate(resultado["particiones"], start=1)
+                ]
+            elif resultado["archivo_combinado"] is None:
+                detalle = [f"Archivos individuales: {os.path.basename(resultado['carpeta_archivos'])}"]
+            else:
+                detalle = [
+                    f"1. Archivo combinado: {os.path.basename(resultado['archivo_combinado'])}",
+                    f"2. Archivos individuales: {os.path.basename(resultado['carpeta_archivos'])}",
+                ]
+            errores = []
+            if resultado["errores"]:
+                errores.append(f"No se pudieron escribir {len(resultado['errores'])} grupos:")
+                errores.extend(error["error"] for error in resultado["errores"][:5])
+            mostrar_resultado(
+                "Proceso completado con errores" if errores else "¡Proceso completado!",
+                [
+                    *errores,
+                    f"Las ventanas se han exportado por separado en archivos Excel en:",
+                    f"Carpeta principal: {resultado['carpeta_principal']}",
+                    *detalle,
+                    *incremental,
+                    f"Tiempo total: {resultado['segundos']:.1f} s{memoria}",
+                    f"Por etapa: {etapas}",
+                    f"Reporte: {os.path.basename(resultado['reporte'])}"
+                ]
+            )
+        except ProcesoCancelado:
+            mostrar_resultado(
+                "Proceso cancelado",
+                ["Se detuvo la división y se eliminaron los archivos parciales."]
+            )
+        except (ImportError, SeleccionVaciaError) as e:
+            mostrar_resultado("Error al procesar el archivo", [str(e)], es_error=True)
+        except ColumnaNoEncontradaError:
+            mostrar_resultado(
+                "Error al procesar el archivo",
+                ["El nombre de la columna especificado no existe en el archivo Excel. Por favor, verifique el nombre de la columna y vuelva a intentarlo."],
+                es_error=True
+            )
+        except Exception as e:
+            # Manejar cualquier error inesperado
+            mostrar_resultado(
+                "Error al procesar el archivo",
+                [f"Ocurrió un error: {str(e)}"],
+                es_error=True
+            )
+        finally:
+            estado_proceso["cancelar"] = None
+            btn_ejecutar.disabled = False
+            page.update()
     
     excel_file_row = ft.Row(
         controls=[
@@ -470,6 +3741,8 @@ def main(page):
         hint_text="Dejar en blanco para generar automáticamente"
     )
 
+    btn_ejecutar = ft.ElevatedButton("Ejecutar Proceso!", on_click=btn_click)
+
     page.add(
         ft.Text("Divisor de Hojas de Excel", size=20, weight=ft.FontWeight.BOLD),
         excel_file_row,
@@ -477,9 +3750,212 @@ def main(page):
         sheets_dropdown,
         columnas_cargando,
         columns_dropdown,
+        vista_previa,
+        btn_ver_valores,
+        valores_cargando,
+        panel_valores,
+        opciones_salida,
+        opciones_columnas,
+        motor_dropdown,
+        formato_dropdown,
+        limites_archivo,
         input_carpet, 
-        ft.ElevatedButton("Ejecutar Proceso!", on_click=btn_click),
+        btn_ejecutar,
         resultados_container
     )
 
-ft.app(target=main)
+    # Con la ventana ya visible, precargar pandas y openpyxl sin bloquear la interfaz
+    _registrar_primer_cuadro()
+    threading.Thread(target=_precargar_dependencias, daemon=True).start()
+
+EXTENSIONES_EXCEL = (".xlsx", ".xlsm")
+
+
+def _expandir_entradas(entradas, recursivo=False):
+    """Convierte archivos y carpetas en la lista de libros Excel a procesar, sin duplicados."""
+    archivos = []
+    for entrada in entradas:
+        if os.path.isdir(entrada):
+            for raiz, carpetas, nombres in os.walk(entrada):
+                carpetas.sort()
+                for nombre in sorted(nombres):
+                    # Ignorar los archivos de bloqueo que Excel crea al abrir un libro
+                    if nombre.lower().endswith(EXTENSIONES_EXCEL) and not nombre.startswith("~$"):
+                        archivos.append(os.path.join(raiz, nombre))
+                if not recursivo:
+                    break
+        else:
+            archivos.append(entrada)
+
+    vistos = set()
+    unicos = []
+    for archivo in archivos:
+        ruta = os.path.abspath(archivo)
+        if ruta not in vistos:
+            vistos.add(ruta)
+            unicos.append(ruta)
+    return unicos
+
+
+def _contar_archivo_cli(archivo_excel, hoja, columna):
+    """Cuenta los valores distintos de la columna para la línea de comandos (nunca lanza excepciones)."""
+    resumen = {"archivo": archivo_excel, "estado": "ok", "columna": columna}
+    try:
+        if not os.path.isfile(archivo_excel):
+            raise FileNotFoundError(f"El archivo no existe: {archivo_excel}")
+        resumen["hoja"] = hoja = hoja or listar_hojas_excel(archivo_excel)[0]
+        conteo = contar_valores_columna(archivo_excel, hoja, columna)
+        resumen["grupos"] = len(conteo)
+        resumen["valores"] = [{"valor": valor, "filas": filas} for valor, filas in conteo.items()]
+    except ColumnaNoEncontradaError as e:
+        resumen.update(estado="error", error=f"La columna '{e}' no existe en la hoja")
+    except Exception as e:
+        resumen.update(estado="error", error=str(e))
+    return resumen
+
+
+def _procesar_archivo_cli(archivo_excel, hoja, columna, carpeta_resultado, directorio_salida, motor, workers,
+                          perfil, incremental, anidar, formato, columnas_salida, valores, agrupar_resto,
+                          max_filas, max_mb, carpeta_generada):
+    """
+    Divide un archivo para la línea de comandos y devuelve su resumen (nunca
+    lanza excepciones). El estado es "ok", "incompleto" si algún grupo no se
+    pudo escribir (detallados en errores) o "error".
+    """
+    resumen = {"archivo": archivo_excel, "estado": "ok"}
+    inicio = time.perf_counter()
+    try:
+        # Los mensajes del motor van a stderr para dejar stdout solo para el resumen JSON
+        with contextlib.redirect_stdout(sys.stderr):
+            if not os.path.isfile(archivo_excel):
+                raise FileNotFoundError(f"El archivo no existe: {archivo_excel}")
+            hoja = hoja or listar_hojas_excel(archivo_excel)[0]
+            resumen["hoja"] = hoja
+            resumen.update(dividir_excel(
+                archivo_excel, hoja, columna, carpeta_resultado,
+                motor=motor, workers=workers, directorio_salida=directorio_salida, perfil=perfil,
+                incremental=incremental, anidar=anidar, formato=formato, columnas_salida=columnas_salida,
+                valores=valores, agrupar_resto=agrupar_resto, max_filas=max_filas, max_mb=max_mb,
+                carpeta_generada=carpeta_generada, valores_como_texto=True
+            ))
+        if resumen["errores"]:
+            # Algunos grupos no se pudieron escribir: el libro cuenta como fallido
+            resumen["estado"] = "incompleto"
+    except ColumnaNoEncontradaError as e:
+        resumen.update(estado="error", error=f"La columna '{e}' no existe en la hoja")
+    except Exception as e:
+        resumen.update(estado="error", error=str(e))
+    resumen["segundos"] = round(time.perf_counter() - inicio, 3)
+    return resumen
+
+
+def cli(argv=None):
+    """
+    Punto de entrada de línea de comandos: divide uno o varios libros sin abrir
+    la interfaz e imprime en stdout un resumen JSON de lo escrito.
+
+    Returns:
+        Código de salida: 0 si todos los archivos se procesaron por completo, 1
+        si alguno falló o quedó incompleto.
+    """
+    parser = argparse.ArgumentParser(
+        prog="data_sheet_divider",
+        description="Divide hojas de Excel en un archivo por cada valor de una columna.",
+    )
+    parser.add_argument("entradas", nargs="+", help="Archivos .xlsx o carpetas que los contienen")
+    parser.add_argument("-c", "--columna", required=True, action="append",
+                        help="Encabezado de la columna por la que se divide; se puede repetir para generar "
+                             "varias divisiones en una sola lectura")
+    parser.add_argument("--compuesta", nargs="+", action="append", metavar="COLUMNA",
+                        help="Agregar una división por la combinación de estas columnas; se puede repetir")
+    parser.add_argument("--anidar", action="store_true",
+                        help="En las divisiones compuestas, crear una subcarpeta por cada nivel de la clave")
+    parser.add_argument("-e", "--exportar", action="append", metavar="COLUMNA",
+                        help="Columna a incluir en los archivos; se repite para varias y el orden se respeta "
+                             "(por defecto, todas)")
+    parser.add_argument("-v", "--valor", action="append", metavar="VALOR",
+                        help="Exportar solo este valor de la primera columna; se repite para varios")
+    parser.add_argument("--otros", action="store_true",
+                        help=f"Con --valor, reunir las filas de los demás valores en un grupo \"{NOMBRE_GRUPO_OTROS}\"")
+    parser.add_argument("--contar", action="store_true",
+                        help="No dividir: mostrar los valores distintos de la primera columna y sus filas")
+    parser.add_argument("--max-filas", type=int, metavar="N",
+                        help="Máximo de filas por archivo; los grupos más grandes se escriben en partes")
+    parser.add_argument("--max-mb", type=float, metavar="MB",
+                        help="Tamaño aproximado máximo de cada archivo individual, en MB")
+    parser.add_argument("-s", "--hoja", help="Hoja a dividir (por defecto, la primera de cada libro)")
+    parser.add_argument("-o", "--salida",
+                        help="Directorio raíz de resultados (por defecto, junto a cada archivo)")
+    parser.add_argument("-n", "--carpeta", default=None,
+                        help="Nombre de la carpeta de resultados (por defecto, Resultados_<fecha>)")
+    parser.add_argument("-m", "--motor", choices=("completo", "streaming", "valores"), default="completo")
+    parser.add_argument("-f", "--formato", choices=FORMATOS_VALORES, default="xlsx",
+                        help="Formato de los archivos en el motor de solo valores")
+    parser.add_argument("-w", "--workers", type=int, default=EXPORT_WORKERS,
+                        help="Procesos por archivo para escribir los archivos individuales")
+    parser.add_argument("-j", "--jobs", type=int, default=1,
+                        help="Cantidad de libros a procesar en paralelo")
+    parser.add_argument("-r", "--recursivo", action="store_true", help="Buscar libros en subcarpetas")
+    parser.add_argument("--perfil", action="store_true", default=None,
+                        help="Guardar un perfil de cProfile de cada división junto a su reporte")
+    parser.add_argument("--forzar", action="store_true",
+                        help="Reescribir todos los archivos aunque no hayan cambiado desde la corrida anterior")
+    args = parser.parse_args(argv)
+
+    archivos = _expandir_entradas(args.entradas, args.recursivo)
+    salida = os.path.abspath(args.salida) if args.salida else None
+    carpeta_resultado = args.carpeta or get_default_folder_name()
+    resumenes = {}
+
+    # Dos libros con el mismo nombre en la misma carpeta de resultados se pisarían entre sí
+    destinos = defaultdict(list)
+    for archivo in archivos:
+        directorio = salida or os.path.dirname(archivo)
+        destinos[(os.path.abspath(directorio), os.path.basename(archivo).lower())].append(archivo)
+    for repetidos in destinos.values():
+        for archivo in repetidos[1:]:
+            resumenes[archivo] = {
+                "archivo": archivo,
+                "estado": "error",
+                "error": f"Otro archivo llamado {os.path.basename(archivo)} usa la misma carpeta de resultados",
+            }
+    pendientes = [a for a in archivos if a not in resumenes]
+
+    columnas = args.columna + [tuple(compuesta) for compuesta in args.compuesta or []]
+    columna = columnas[0] if len(columnas) == 1 else columnas
+    parametros = (args.hoja, columna, carpeta_resultado, salida, args.motor, args.workers, args.perfil,
+                  not args.forzar, args.anidar, args.formato, args.exportar, args.valor, args.otros,
+                  args.max_filas, args.max_mb, args.carpeta is None)
+    if args.contar:
+        # Solo lectura: no se escribe nada, así que tampoco importa que dos libros compartan carpeta
+        resumenes = {archivo: _contar_archivo_cli(archivo, args.hoja, args.columna[0]) for archivo in archivos}
+    elif args.jobs > 1 and len(pendientes) > 1:
+        with ProcessPoolExecutor(max_workers=min(args.jobs, len(pendientes))) as pool:
+            futuros = {pool.submit(_procesar_archivo_cli, archivo, *parametros): archivo for archivo in pendientes}
+            for futuro in as_completed(futuros):
+                resumen = futuro.result()
+                resumenes[resumen["archivo"]] = resumen
+                print(f"{resumen['estado']}: {resumen['archivo']}", file=sys.stderr)
+    else:
+        for archivo in pendientes:
+            resumen = _procesar_archivo_cli(archivo, *parametros)
+            resumenes[archivo] = resumen
+            print(f"{resumen['estado']}: {archivo}", file=sys.stderr)
+
+    resultados = [resumenes[archivo] for archivo in archivos]
+    errores = sum(1 for r in resultados if r["estado"] != "ok")
+    json.dump(
+        {"archivos": resultados, "total": len(resultados), "correctos": len(resultados) - errores, "errores": errores},
+        sys.stdout, ensure_ascii=False, indent=2, default=str,
+    )
+    sys.stdout.write("\n")
+    return 1 if errores or not resultados else 0
+
+
+if __name__ == "__main__":
+    # Necesario para que los procesos trabajadores arranquen en el ejecutable empaquetado
+    multiprocessing.freeze_support()
+    # Con argumentos se ejecuta en modo línea de comandos; sin ellos se abre la interfaz
+    if len(sys.argv) > 1:
+        sys.exit(cli())
+    ft.app(target=main)
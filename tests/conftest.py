@@ -0,0 +1,29 @@
+import os
+import sys
+
+import openpyxl
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import data_sheet_divider as dsd  # noqa: E402
+
+
+@pytest.fixture(autouse=True)
+def cache_vacia():
+    """Cada prueba reescribe sus libros: que no reutilice uno cargado por otra."""
+    dsd._cache_libros.limpiar()
+    yield
+    dsd._cache_libros.limpiar()
+
+
+def guardar_libro(ruta, filas, hoja="Datos", epoch=None):
+    """Guarda filas (la primera es el encabezado) en un libro nuevo y devuelve su ruta como texto."""
+    wb = openpyxl.Workbook()
+    ws = wb.active
+    ws.title = hoja
+    if epoch is not None:
+        wb.epoch = epoch
+    for fila in filas:
+        ws.append(list(fila))
+    wb.save(ruta)
+    return str(ruta)
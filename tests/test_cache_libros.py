@@ -0,0 +1,16 @@
+"""Libros de la caché: las divisiones los leen sin modificarlos."""
+from conftest import dsd, guardar_libro
+
+
+def test_dividir_no_agrega_celdas_al_libro_de_la_cache(tmp_path):
+    filas = [("Sede", "Monto", None, "Nota")]
+    filas += [(f"S{i % 3}", i, None, None if i % 2 else "x") for i in range(12)]
+    origen = guardar_libro(tmp_path / "ventas.xlsx", filas)
+    ws = dsd.cargar_libro(origen)["Datos"]
+    celdas = len(ws._cells)
+
+    dsd.dividir_excel(origen, "Datos", ["Sede", ("Sede", "Monto")], "Res")
+    dsd.dividir_excel(origen, "Datos", "Sede", "Res", incremental=False)
+
+    assert dsd.cargar_libro(origen)["Datos"] is ws
+    assert len(ws._cells) == celdas
@@ -0,0 +1,67 @@
+"""Cancelación: se borra solo lo que escribió la división cancelada."""
+import os
+import threading
+import time
+
+import pytest
+
+from conftest import dsd, guardar_libro
+
+FILAS = [("Sede", "Monto"), ("Norte", 1), ("Sur", 2), ("Este", 3), ("Norte", 4)]
+
+
+def dividir_y_cancelar(origen, motor, etapa="escribiendo"):
+    cancelar = threading.Event()
+
+    def avisar(evento):
+        if evento["etapa"] == etapa:
+            cancelar.set()
+
+    with pytest.raises(dsd.ProcesoCancelado):
+        dsd.dividir_excel(origen, "Datos", "Sede", "Res", motor=motor, progreso=avisar, cancelar=cancelar)
+
+
+@pytest.mark.parametrize("motor", ["completo", "streaming", "valores"])
+def test_no_borra_archivos_ajenos_en_una_carpeta_existente(tmp_path, motor):
+    origen = guardar_libro(tmp_path / "ventas.xlsx", FILAS)
+    os.makedirs(tmp_path / "Res")
+    # Un archivo que el usuario guardó en la carpeta mientras corría la división
+    notas = tmp_path / "Res" / "notas.txt"
+    notas.write_text("no borrar")
+    despues = time.time() + 60
+    os.utime(notas, (despues, despues))
+
+    dividir_y_cancelar(origen, motor)
+
+    assert notas.read_text() == "no borrar"
+    assert os.listdir(tmp_path / "Res") == ["notas.txt"]
+
+
+@pytest.mark.parametrize("motor", ["completo", "streaming", "valores"])
+def test_borra_las_carpetas_que_creo(tmp_path, motor):
+    origen = guardar_libro(tmp_path / "ventas.xlsx", FILAS)
+
+    dividir_y_cancelar(origen, motor)
+
+    assert not os.path.exists(tmp_path / "Res")
+
+
+@pytest.mark.parametrize("motor", ["completo", "streaming", "valores"])
+def test_borra_los_archivos_escritos_antes_de_cancelar(tmp_path, motor, monkeypatch):
+    origen = guardar_libro(tmp_path / "ventas.xlsx", FILAS)
+    os.makedirs(tmp_path / "Res")
+    cancelar = threading.Event()
+    escritos = []
+    archivo_escrito = dsd._Progreso.archivo_escrito
+
+    def escribir_y_cancelar(self, ruta, *args, **kwargs):
+        escritos.append(ruta)
+        archivo_escrito(self, ruta, *args, **kwargs)
+        self.cancelar.set()
+
+    monkeypatch.setattr(dsd._Progreso, "archivo_escrito", escribir_y_cancelar)
+    with pytest.raises(dsd.ProcesoCancelado):
+        dsd.dividir_excel(origen, "Datos", "Sede", "Res", motor=motor, cancelar=cancelar)
+
+    assert escritos
+    assert os.listdir(tmp_path / "Res") == []
@@ -0,0 +1,120 @@
+"""Divisiones repetidas: qué conserva, reescribe y borra el manifiesto de cada libro."""
+import json
+import os
+
+from conftest import dsd, guardar_libro
+
+ENCABEZADO = ("Sede", "Monto")
+FILAS = [("Norte", 1), ("Sur", 2), ("Este", 3), ("Norte", 4), ("Sur", 5)]
+
+
+def dividir(origen, **opciones):
+    return dsd.dividir_excel(origen, "Datos", "Sede", "Res", **opciones)
+
+
+def individual(tmp_path, libro, sede):
+    return str(tmp_path / "Res" / f"Separados-{libro}" / f"{libro}-{sede}.xlsx")
+
+
+def test_sin_cambios_conserva_todos_los_archivos(tmp_path):
+    origen = guardar_libro(tmp_path / "ventas.xlsx", [ENCABEZADO, *FILAS])
+    primera = dividir(origen)
+    segunda = dividir(origen)
+
+    assert len(primera["archivos"]) == 4  # tres sedes y el combinado
+    assert segunda["archivos"] == []
+    assert sorted(segunda["archivos_sin_cambios"]) == sorted(primera["archivos"])
+    assert segunda["archivos_eliminados"] == []
+    assert os.path.isfile(tmp_path / "Res" / "manifiesto-ventas.json")
+
+
+def test_solo_reescribe_el_grupo_que_cambio(tmp_path):
+    origen = guardar_libro(tmp_path / "ventas.xlsx", [ENCABEZADO, *FILAS])
+    dividir(origen)
+    guardar_libro(origen, [ENCABEZADO, *FILAS[:-1], ("Sur", 50)])
+    segunda = dividir(origen)
+
+    assert sorted(segunda["archivos"]) == sorted([individual(tmp_path, "ventas", "Sur"), segunda["archivo_combinado"]])
+    assert sorted(segunda["archivos_sin_cambios"]) == sorted(
+        [individual(tmp_path, "ventas", "Norte"), individual(tmp_path, "ventas", "Este")]
+    )
+
+
+def test_regenera_un_archivo_modificado_a_mano(tmp_path):
+    origen = guardar_libro(tmp_path / "ventas.xlsx", [ENCABEZADO, *FILAS])
+    dividir(origen)
+    guardar_libro(individual(tmp_path, "ventas", "Norte"), [ENCABEZADO, ("Norte", 99), ("Norte", 100)])
+    segunda = dividir(origen)
+
+    assert segunda["archivos"] == [individual(tmp_path, "ventas", "Norte")]
+
+
+def test_borra_los_grupos_que_ya_no_existen(tmp_path):
+    origen = guardar_libro(tmp_path / "ventas.xlsx", [ENCABEZADO, *FILAS])
+    dividir(origen)
+    guardar_libro(origen, [ENCABEZADO, *(fila for fila in FILAS if fila[0] != "Este")])
+    segunda = dividir(origen)
+
+    este = individual(tmp_path, "ventas", "Este")
+    assert segunda["archivos_eliminados"] == [este]
+    assert not os.path.exists(este)
+    assert os.path.isfile(individual(tmp_path, "ventas", "Norte"))
+
+
+def test_no_borra_los_archivos_de_otro_libro_en_la_misma_carpeta(tmp_path):
+    libro_a = guardar_libro(tmp_path / "a.xlsx", [ENCABEZADO, *FILAS])
+    libro_b = guardar_libro(tmp_path / "b.xlsx", [ENCABEZADO, *FILAS])
+    dividir(libro_a)
+    dividir(libro_b)
+    guardar_libro(libro_a, [ENCABEZADO, ("Norte", 1)])
+    resultado = dividir(libro_a)
+
+    assert sorted(resultado["archivos_eliminados"]) == sorted(
+        [individual(tmp_path, "a", "Sur"), individual(tmp_path, "a", "Este")]
+    )
+    for sede in ("Norte", "Sur", "Este"):
+        assert os.path.isfile(individual(tmp_path, "b", sede))
+    # El libro b sigue sin cambios respecto de su propio manifiesto
+    assert dividir(libro_b)["archivos"] == []
+
+
+def test_ignora_rutas_del_manifiesto_fuera_de_los_separados_del_libro(tmp_path):
+    origen = guardar_libro(tmp_path / "ventas.xlsx", [ENCABEZADO, *FILAS])
+    dividir(origen)
+    ruta_manifiesto = tmp_path / "Res" / "manifiesto-ventas.json"
+    manifiesto = json.loads(ruta_manifiesto.read_text(encoding="utf-8"))
+    ajenos = [
+        tmp_path / "fuera.xlsx",
+        tmp_path / "Res" / "Separados-otro" / "otro-Norte.xlsx",
+        tmp_path / "Res" / "Separados-ventas" / ".." / "otro.xlsx",
+    ]
+    for ruta in ajenos:
+        os.makedirs(ruta.parent, exist_ok=True)
+        ruta.write_text("no borrar")
+        manifiesto["grupos"][os.path.relpath(ruta, tmp_path / "Res")] = {"hash": "x"}
+    manifiesto["grupos"][str(tmp_path / "fuera.xlsx")] = {"hash": "x"}
+    ruta_manifiesto.write_text(json.dumps(manifiesto), encoding="utf-8")
+
+    resultado = dividir(origen)
+
+    assert resultado["archivos_eliminados"] == []
+    for ruta in ajenos:
+        assert ruta.read_text() == "no borrar"
+
+
+def test_forzar_reescribe_todo(tmp_path):
+    origen = guardar_libro(tmp_path / "ventas.xlsx", [ENCABEZADO, *FILAS])
+    dividir(origen)
+    segunda = dividir(origen, incremental=False)
+
+    assert len(segunda["archivos"]) == 4
+    assert segunda["archivos_sin_cambios"] == []
+
+
+def test_carpeta_generada_nueva_no_calcula_hashes(tmp_path):
+    origen = guardar_libro(tmp_path / "ventas.xlsx", [ENCABEZADO, *FILAS])
+    resultado = dividir(origen, carpeta_generada=True)
+
+    assert "hashes" not in [etapa["etapa"] for etapa in resultado["etapas"]]
+    assert not os.path.exists(tmp_path / "Res" / "manifiesto-ventas.json")
+    assert len(resultado["archivos"]) == 4
@@ -0,0 +1,39 @@
+"""Grupos divididos en partes por tamaño: cada parte conserva las tablas del original."""
+import warnings
+
+import openpyxl
+import pytest
+from openpyxl.worksheet.table import Table
+
+from conftest import dsd
+
+VALOR_LARGO = "Departamento Administrativo Central"
+
+
+def guardar_libro_con_tabla(ruta, filas):
+    wb = openpyxl.Workbook()
+    ws = wb.active
+    ws.title = "Datos"
+    ws.append(["Sede", "Monto"])
+    for fila in filas:
+        ws.append(list(fila))
+    ws.add_table(Table(displayName="Ventas", ref=f"A1:B{1 + len(filas)}"))
+    wb.save(ruta)
+    return str(ruta)
+
+
+@pytest.mark.parametrize("motor", ["completo", "streaming"])
+def test_partes_de_un_valor_largo_con_tabla(tmp_path, motor):
+    origen = guardar_libro_con_tabla(tmp_path / "ventas.xlsx", [(VALOR_LARGO, i) for i in range(13)])
+    with warnings.catch_warnings():
+        warnings.simplefilter("error")
+        resultado = dsd.dividir_excel(origen, "Datos", "Sede", "Res", motor=motor, max_filas=3, incremental=False)
+
+    assert resultado["errores"] == []
+    assert resultado["partes"] == 5
+    assert len(resultado["archivos"]) == 6  # cinco partes y el combinado
+
+    combinado = openpyxl.load_workbook(resultado["archivo_combinado"])
+    nombres = [nombre.lower() for ws in combinado.worksheets for nombre in ws.tables]
+    assert len(nombres) == 5
+    assert len(set(nombres)) == 5
@@ -0,0 +1,65 @@
+"""Selección de valores: qué filas se exportan y qué pasa si ninguna coincide."""
+import os
+import time
+
+import openpyxl
+import pytest
+
+from conftest import dsd, guardar_libro
+
+ENCABEZADO = ("Clave", "Monto")
+
+
+@pytest.mark.parametrize("motor", ["completo", "streaming", "valores"])
+def test_seleccion_vacia_no_borra_la_carpeta_compartida(tmp_path, motor):
+    libro_a = guardar_libro(tmp_path / "a.xlsx", [ENCABEZADO, ("Sur", 1), ("Este", 2)])
+    libro_b = guardar_libro(tmp_path / "b.xlsx", [ENCABEZADO, ("Norte", 1), ("Sur", 2)])
+    opciones = dict(motor=motor, valores=["Norte"], directorio_salida=str(tmp_path))
+
+    resultado_b = dsd.dividir_excel(libro_b, "Datos", "Clave", "out", **opciones)
+    # Como si b terminara mientras a se está dividiendo (cli -j 2)
+    despues = time.time() + 60
+    for ruta in resultado_b["archivos"]:
+        os.utime(ruta, (despues, despues))
+    with pytest.raises(dsd.SeleccionVaciaError):
+        dsd.dividir_excel(libro_a, "Datos", "Clave", "out", **opciones)
+
+    assert resultado_b["archivos"]
+    for ruta in resultado_b["archivos"]:
+        assert os.path.isfile(ruta)
+    assert not os.path.exists(tmp_path / "out" / "Separados-a")
+
+
+def test_seleccion_vacia_no_crea_la_carpeta(tmp_path):
+    libro = guardar_libro(tmp_path / "a.xlsx", [ENCABEZADO, ("Sur", 1)])
+
+    with pytest.raises(dsd.SeleccionVaciaError):
+        dsd.dividir_excel(libro, "Datos", "Clave", "out", motor="streaming", valores=["Norte"])
+
+    assert not os.path.exists(tmp_path / "out")
+
+
+def test_seleccion_distingue_numeros_de_textos(tmp_path):
+    libro = guardar_libro(tmp_path / "a.xlsx", [ENCABEZADO, (1, 10), ("1", 20), (2, 30)])
+
+    resultado = dsd.dividir_excel(libro, "Datos", "Clave", "out", valores=[1])
+
+    assert resultado["grupos"] == 1
+    assert resultado["partes"] == 1
+    combinado = openpyxl.load_workbook(resultado["archivo_combinado"])
+    assert [fila for fila in combinado.active.iter_rows(min_row=2, values_only=True)] == [(1, 10)]
+
+
+def test_valores_como_texto_de_la_linea_de_comandos(tmp_path):
+    libro = guardar_libro(tmp_path / "a.xlsx", [ENCABEZADO, (1, 10), (2, 30)])
+
+    resultado = dsd.dividir_excel(libro, "Datos", "Clave", "out", valores=["1"], valores_como_texto=True)
+
+    combinado = openpyxl.load_workbook(resultado["archivo_combinado"])
+    assert [fila for fila in combinado.active.iter_rows(min_row=2, values_only=True)] == [(1, 10)]
+
+
+def test_contar_valores_con_filas_vacias(tmp_path):
+    libro = guardar_libro(tmp_path / "a.xlsx", [ENCABEZADO, ("Norte", 1), (None, None), ("Sur", 2), ("Norte", 3)])
+
+    assert dsd.contar_valores_columna(libro, "Datos", "Clave") == {"Norte": 2, None: 1, "Sur": 1}
@@ -0,0 +1,48 @@
+"""Motor de solo valores: los .xlsx escritos directo conservan tipos y formatos de fecha."""
+import datetime
+
+import openpyxl
+
+from conftest import dsd, guardar_libro
+
+# pandas lee las fechas como Timestamp y una columna de booleanos con vacíos como
+# números, así que aquí solo van valores que pandas devuelve tal cual
+ENCABEZADO = ("Clave", "Número", "Texto", "Fecha y hora", "Hora", "Booleano", 5)
+FILAS = [
+    ("A", 1, "  x & <y> ", datetime.datetime(1900, 2, 1, 12, 30), datetime.time(3, 4, 5), True, 2.5),
+    ("B", 3.25, 'q"z', datetime.datetime(2024, 5, 6, 7, 8, 9), datetime.time(0, 0, 1), False, -1),
+    ("A", None, "a\nb", None, None, True, 1e20),
+]
+
+
+def celdas(ws):
+    return [[(c.value, c.number_format) for c in fila] for fila in ws.iter_rows()]
+
+
+def test_xlsx_igual_al_origen(tmp_path):
+    origen = guardar_libro(tmp_path / "ventas.xlsx", [ENCABEZADO, *FILAS])
+    resultado = dsd.dividir_excel(origen, "Datos", "Clave", "Res", motor="valores")
+
+    assert resultado["errores"] == []
+    esperado = celdas(openpyxl.load_workbook(origen)["Datos"])
+    combinado = openpyxl.load_workbook(resultado["archivo_combinado"])
+    assert combinado.sheetnames == ["A", "B"]
+    assert celdas(combinado["A"]) == [esperado[0], esperado[1], esperado[3]]
+    assert celdas(combinado["B"]) == [esperado[0], esperado[2]]
+
+    individual = openpyxl.load_workbook(tmp_path / "Res" / "Separados-ventas" / "ventas-A.xlsx")
+    assert individual.sheetnames == ["A"]
+    assert celdas(individual["A"]) == celdas(combinado["A"])
+
+
+def test_texto_con_caracteres_de_control_es_un_error_del_grupo(tmp_path):
+    origen = guardar_libro(tmp_path / "ventas.xlsx", [("Clave", "Texto"), ("A", "ok"), ("B", "ok")])
+    # Un carácter de control que openpyxl no deja asignar, pero que puede venir en un libro de otra aplicación
+    libro = openpyxl.load_workbook(origen)
+    libro["Datos"]["B3"]._value = "m\x01l"
+    libro.save(origen)
+
+    resultado = dsd.dividir_excel(origen, "Datos", "Clave", "Res", motor="valores")
+
+    assert [error["grupo"] for error in resultado["errores"]] == ["B"]
+    assert openpyxl.load_workbook(resultado["archivo_combinado"]).sheetnames == ["A"]
@@ -0,0 +1,125 @@
+"""Vista previa paginada: debe mostrar lo mismo que openpyxl en modo solo lectura."""
+import datetime
+import random
+
+import openpyxl
+import pytest
+from openpyxl.utils.datetime import CALENDAR_MAC_1904, CALENDAR_WINDOWS_1900
+
+from conftest import dsd, guardar_libro
+
+FILAS_POR_PAGINA = 3
+
+
+def filas_ejemplo(cantidad):
+    """Encabezado con una fecha y filas con textos repetidos, números, fechas, booleanos y huecos."""
+    filas = [("Sede", "Monto", datetime.datetime(2024, 1, 1), "Activo", None, "Nota")]
+    inicio = datetime.datetime(2023, 12, 30, 8, 30)
+    for i in range(cantidad):
+        if i % 11 == 5:
+            filas.append(())  # fila vacía: no aparece en la vista previa
+            continue
+        filas.append((
+            f"Sede {i % 4}",
+            i * 1.25 if i % 3 else i,
+            inicio + datetime.timedelta(days=i, minutes=i) if i % 5 else None,
+            i % 2 == 0,
+            None,
+            "ñandú" if i % 7 == 0 else None,
+        ))
+    return filas
+
+
+def filas_openpyxl(ruta, hoja="Datos"):
+    """(número de fila, valores sin las celdas vacías del final) de cada fila, como en la vista previa."""
+    wb = openpyxl.load_workbook(ruta, read_only=True, data_only=True)
+    try:
+        filas = []
+        for numero, fila in enumerate(wb[hoja].iter_rows(values_only=True), start=1):
+            filas.append((numero, recortar(fila)))
+        return filas
+    finally:
+        wb.close()
+
+
+def recortar(valores):
+    valores = list(valores)
+    while valores and valores[-1] is None:
+        valores.pop()
+    return valores
+
+
+def paginas_esperadas(ruta):
+    encabezado, *resto = filas_openpyxl(ruta)
+    filas = [(numero, valores) for numero, valores in resto if valores]
+    return encabezado[1], [filas[i:i + FILAS_POR_PAGINA] for i in range(0, len(filas), FILAS_POR_PAGINA)]
+
+
+def normalizar(pagina):
+    return [(numero, recortar(valores)) for numero, valores in pagina]
+
+
+@pytest.mark.parametrize("epoch", [CALENDAR_WINDOWS_1900, CALENDAR_MAC_1904])
+def test_paginas_en_cualquier_orden_igual_que_openpyxl(tmp_path, epoch):
+    ruta = guardar_libro(tmp_path / "libro.xlsx", filas_ejemplo(60), epoch=epoch)
+    encabezados, esperadas = paginas_esperadas(ruta)
+    orden = list(range(len(esperadas)))
+    random.Random(7).shuffle(orden)
+
+    with dsd.abrir_vista_previa(ruta, "Datos", filas_por_pagina=FILAS_POR_PAGINA) as vista:
+        assert recortar(vista.encabezados) == encabezados
+        for numero in orden:
+            assert normalizar(vista.pagina(numero)) == esperadas[numero], f"página {numero}"
+        assert vista.pagina(len(esperadas)) == []
+        assert vista.total_paginas == len(esperadas)
+
+
+def test_fechas_con_calendario_1904(tmp_path):
+    fecha = datetime.datetime(2024, 2, 29, 12, 0)
+    ruta = guardar_libro(tmp_path / "libro.xlsx", [("Fecha",), (fecha,)], epoch=CALENDAR_MAC_1904)
+
+    with dsd.abrir_vista_previa(ruta, "Datos") as vista:
+        assert vista.pagina(0) == [(2, [fecha])]
+
+
+def test_posicion_de_cada_pagina_al_avanzar(tmp_path):
+    ruta = guardar_libro(tmp_path / "libro.xlsx", filas_ejemplo(40))
+    _, esperadas = paginas_esperadas(ruta)
+
+    with dsd.abrir_vista_previa(ruta, "Datos", filas_por_pagina=FILAS_POR_PAGINA) as vista:
+        # Saltar directo a una página lejana anota dónde empieza cada una de las anteriores
+        ultima = len(esperadas) - 1
+        assert normalizar(vista.pagina(ultima)) == esperadas[ultima]
+        for numero in range(ultima):
+            assert normalizar(vista.pagina(numero)) == esperadas[numero]
+            assert vista.pagina(numero)[0][0] == esperadas[numero][0][0]
+
+
+def test_volver_a_una_pagina_que_salio_de_la_cache(tmp_path):
+    ruta = guardar_libro(tmp_path / "libro.xlsx", filas_ejemplo(80))
+    _, esperadas = paginas_esperadas(ruta)
+    assert len(esperadas) > dsd.PAGINAS_EN_CACHE_VISTA + 2
+
+    with dsd.abrir_vista_previa(ruta, "Datos", filas_por_pagina=FILAS_POR_PAGINA) as vista:
+        primera = vista.pagina(0)
+        for numero in range(1, dsd.PAGINAS_EN_CACHE_VISTA + 2):
+            vista.pagina(numero)
+        assert 0 not in vista._paginas
+        assert vista.pagina(0) == primera
+        assert normalizar(vista.pagina(4)) == esperadas[4]
+
+
+def test_textos_compartidos_se_leen_hasta_el_indice_pedido(tmp_path):
+    filas = [("Texto",)] + [(f"valor {i}",) for i in range(50)]
+    ruta = guardar_libro(tmp_path / "libro.xlsx", filas)
+
+    with dsd.abrir_vista_previa(ruta, "Datos", filas_por_pagina=5) as vista:
+        assert vista.pagina(0) == [(i + 2, [f"valor {i}"]) for i in range(5)]
+        assert len(vista._textos._textos) < len(filas)
+        assert vista.pagina(9) == [(i + 2, [f"valor {i}"]) for i in range(45, 50)]
+
+
+def test_hoja_inexistente(tmp_path):
+    ruta = guardar_libro(tmp_path / "libro.xlsx", [("A",), (1,)])
+    with pytest.raises(ValueError):
+        dsd.abrir_vista_previa(ruta, "Otra")